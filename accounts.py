@@ -0,0 +1,132 @@
+"""Login accounts stored in the users table of tasks.db.
+
+Passwords are kept as salted scrypt hashes (PBKDF2-SHA256 on Python builds
+without scrypt), encoded with their parameters so the cost can be raised
+later: a hash made with a lower cost is upgraded on the next login.
+Accounts are looked up through the unique username index.
+
+Accounts from the old plaintext credentials.txt are moved into the table
+(and the file removed) the first time the login window needs them.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from task_store import DuplicateUsernameError  # noqa: F401  (re-exported)
+
+CREDENTIALS_FILE = 'credentials.txt'
+
+# scrypt cost. Time and memory (128 * r * n bytes, 16 MiB here) grow
+# linearly with n, a power of two; 2**14 takes roughly 50-70 ms.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+# Used only when hashlib was built without scrypt
+PBKDF2_ITERATIONS = 600000
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, HASH_BYTES)
+
+
+def hash_password(password):
+    """Return an encoded, salted hash: 'scrypt$n$r$p$salt$hash' or
+    'pbkdf2_sha256$iterations$salt$hash'"""
+    salt = os.urandom(SALT_BYTES)
+    if hasattr(hashlib, 'scrypt'):
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}'
+    digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+    return f'pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}'
+
+
+def verify_password(password, encoded):
+    """Check a password against an encoded hash in constant time"""
+    scheme, *fields = encoded.split('$')
+    if scheme == 'scrypt':
+        n, r, p, salt, expected = fields
+        digest = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    elif scheme == 'pbkdf2_sha256':
+        iterations, salt, expected = fields
+        digest = _pbkdf2(password, base64.b64decode(salt), int(iterations))
+    else:
+        raise ValueError(f"unknown password hash scheme {scheme!r}")
+    return hmac.compare_digest(digest, base64.b64decode(expected))
+
+
+def needs_rehash(encoded):
+    """True if a hash was made with other parameters than the current ones"""
+    if hasattr(hashlib, 'scrypt'):
+        return not encoded.startswith(f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$')
+    return not encoded.startswith(f'pbkdf2_sha256${PBKDF2_ITERATIONS}$')
+
+
+# Verified against when the username is unknown, so a failed login takes
+# as long whether or not the account exists
+_dummy_hash = None
+
+
+def register(store, username, password):
+    """Create an account; raises DuplicateUsernameError if the name is taken"""
+    if not username or not password:
+        raise ValueError("username and password are required")
+    store.add_user(username, hash_password(password))
+
+
+def authenticate(store, username, password):
+    """Return True if the username exists and the password matches"""
+    global _dummy_hash
+    encoded = store.get_password_hash(username)
+    if encoded is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password('')
+        verify_password(password, _dummy_hash)
+        return False
+    if not verify_password(password, encoded):
+        return False
+    if needs_rehash(encoded):
+        store.set_password_hash(username, hash_password(password))
+    return True
+
+
+def import_credentials(store, path=CREDENTIALS_FILE):
+    """Move 'username,password' lines from the old plaintext file into the
+    users table, then delete the file; returns how many accounts were added"""
+    if not os.path.exists(path):
+        return 0
+    users = []
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            username, _, password = line.partition(',')
+            users.append((username, hash_password(password)))
+    added = store.add_users(users)
+    os.remove(path)
+    return added
+
+
+def calibrate(target_ms, password='calibrate'):
+    """Largest scrypt n whose hash takes at most target_ms here (at least 2**10)"""
+    n = 2 ** 10
+    while True:
+        start = time.perf_counter()
+        _scrypt(password, os.urandom(SALT_BYTES), n * 2, SCRYPT_R, SCRYPT_P)
+        if (time.perf_counter() - start) * 1000 > target_ms:
+            return n
+        n *= 2
@@ -0,0 +1,104 @@
+"""Measure the task cache: load time, memory per task and read latencies.
+
+Generates a database with taskgen (or uses --db), loads it into the
+TaskCache the way the window does, a batch at a time, and compares the
+cached reads with the SQL they replace:
+
+    get_task            one task by id
+    get_tasks           100 tasks by id
+    statistics          the statistics panel counts
+
+Memory is what tracemalloc sees allocated by the load, divided by the
+number of tasks.
+
+    python benchmarks/bench_cache.py [--rows 1000000] [--db tasks.db] [--runs 50]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import taskgen  # noqa: E402
+from task_store import TaskStore  # noqa: E402
+
+
+def median_ms(function, runs):
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        function(i)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def load(store):
+    """Load the whole cache in batches; returns (seconds, batches, longest batch)"""
+    start = time.perf_counter()
+    batches, longest, last_id = 0, 0.0, 0
+    while True:
+        batch_start = time.perf_counter()
+        last_id = store.load_cache(last_id, max_tasks=None)
+        longest = max(longest, time.perf_counter() - batch_start)
+        batches += 1
+        if last_id is None:
+            return time.perf_counter() - start, batches, longest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db', help="copy of an existing database to use instead")
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tasks.db')
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            start = time.perf_counter()
+            taskgen.build(path, args.rows, today=date.today())
+            print(f"generated {args.rows} tasks in {time.perf_counter() - start:.1f}s")
+        store = TaskStore(path)
+
+        seconds, batches, longest = load(store)
+        print(f"loaded {len(store.cache)} tasks in {seconds:.2f}s ({batches} batches, "
+              f"longest {longest * 1000:.0f} ms)")
+        # Again, traced: replacing the cache frees the first copy
+        tracemalloc.start()
+        load(store)
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        cache = store.cache
+        print(f"memory: {allocated / 2 ** 20:.0f} MiB, {allocated / len(cache):.0f} bytes per task")
+
+        ids = list(cache.tasks)
+        rng = random.Random(1)
+        picks = [rng.choice(ids) for _ in range(args.runs)]
+        groups = [rng.sample(ids, 100) for _ in range(args.runs)]
+        today = date.today().isoformat()
+        cases = [
+            ('get_task', lambda i: store.get_task(picks[i])),
+            ('get_tasks', lambda i: store.get_tasks(groups[i])),
+            ('statistics', lambda i: store.statistics(today)),
+        ]
+        print(f'{"read":<20}{"SQL ms":>10}{"cache ms":>10}')
+        for name, function in cases:
+            cache.loaded = False
+            sql = median_ms(function, args.runs)
+            cache.loaded = True
+            cached = median_ms(function, args.runs)
+            print(f'{name:<20}{sql:>10.3f}{cached:>10.3f}')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
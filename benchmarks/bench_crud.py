@@ -0,0 +1,113 @@
+"""Compare CRUD latency of a connection-per-call baseline against TaskStore.
+
+The baseline reproduces what TaskManager used to do: open
+sqlite3.connect('tasks.db') for every operation. Runs against a
+throw-away database, never the real tasks.db.
+
+    python benchmarks/bench_crud.py [--rows 2000] [--ops 500]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_store import TaskStore  # noqa: E402
+
+
+def timed(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def seed(path, rows):
+    store = TaskStore(path)
+    with store.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO tasks (title, description, due_date, priority, status, categories)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((f'seed {i}', 'seeded task', '2024-01-01', 'Medium', 'Pending', 'bench')
+              for i in range(rows)))
+    store.close()
+
+
+def bench_baseline(path, ops):
+    def connect():
+        return sqlite3.connect(path)
+
+    def add(i):
+        with connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM tasks WHERE title = ?', (f'base {i}',))
+            cursor.fetchone()
+            cursor.execute('''
+                INSERT INTO tasks (title, description, due_date, priority, status, categories)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (f'base {i}', 'd', '2024-01-01', 'Low', 'Pending', 'bench'))
+
+    def read(i):
+        with connect() as conn:
+            conn.execute('SELECT * FROM tasks WHERE title = ?', (f'base {i}',)).fetchall()
+
+    def update(i):
+        with connect() as conn:
+            task_id = conn.execute('SELECT id FROM tasks WHERE title = ?', (f'base {i}',)).fetchone()[0]
+            conn.execute('UPDATE tasks SET status = ? WHERE id = ?', ('Complete', task_id))
+
+    def delete(i):
+        with connect() as conn:
+            conn.execute('DELETE FROM tasks WHERE title = ?', (f'base {i}',))
+
+    return {name: timed(fn, ops) for name, fn in
+            (('add', add), ('read', read), ('update', update), ('delete', delete))}
+
+
+def bench_store(path, ops):
+    store = TaskStore(path)
+    ids = {}
+
+    def add(i):
+        ids[i] = store.add_task(f'store {i}', 'd', '2024-01-01', 'Low', 'Pending', 'bench')
+
+    def read(i):
+        store.get_task(ids[i])
+
+    def update(i):
+        store.update_task(ids[i], f'store {i}', 'd', '2024-01-01', 'Low', 'Complete', 'bench')
+
+    def delete(i):
+        store.delete_task(ids[i])
+
+    results = {name: timed(fn, ops) for name, fn in
+               (('add', add), ('read', read), ('update', update), ('delete', delete))}
+    store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--ops', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed(path, args.rows)
+        baseline = bench_baseline(path, args.ops)
+        store = bench_store(path, args.ops)
+
+    print(f'{"op":<8}{"baseline ms":>14}{"TaskStore ms":>14}{"speedup":>10}')
+    for op in baseline:
+        print(f'{op:<8}{baseline[op]:>14.3f}{store[op]:>14.3f}{baseline[op] / store[op]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
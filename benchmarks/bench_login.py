@@ -0,0 +1,80 @@
+"""Time logins against a large users table.
+
+Seeds a throw-away database with --users accounts (all sharing one
+precomputed hash, so seeding does not take --users times the hash cost)
+and reports median latencies of:
+
+    lookup          the unique username index lookup alone
+    login           accounts.authenticate: lookup plus password verification
+    unknown user    authenticate with a username that does not exist
+    linear scan     the old check, (username, password) in a list of tuples
+
+The hash cost is pinned with --n (a scrypt power of two) or measured for
+this machine with --target-ms, so runs are comparable across machines.
+
+    python benchmarks/bench_login.py [--users 100000] [--runs 20] [--n 16384 | --target-ms 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import accounts  # noqa: E402
+from task_store import TaskStore  # noqa: E402
+
+
+def median_ms(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=20)
+    cost = parser.add_mutually_exclusive_group()
+    cost.add_argument('--n', type=int, help=f"scrypt cost (default: {accounts.SCRYPT_N})")
+    cost.add_argument('--target-ms', type=float, help="pick the scrypt cost that takes about this long")
+    args = parser.parse_args()
+
+    if args.n:
+        accounts.SCRYPT_N = args.n
+    elif args.target_ms:
+        accounts.SCRYPT_N = accounts.calibrate(args.target_ms)
+    print(f"scrypt n={accounts.SCRYPT_N} r={accounts.SCRYPT_R} p={accounts.SCRYPT_P}")
+
+    password = 'correct horse'
+    # The last account is the one logged into, the worst case for a scan
+    target = f'user{args.users - 1}'
+    encoded = accounts.hash_password(password)
+    plaintext = [(f'user{i}', password) for i in range(args.users)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(os.path.join(tmp, 'tasks.db'))
+        start = time.perf_counter()
+        store.add_users((username, encoded) for username, _ in plaintext)
+        print(f"{store.count_users()} users seeded in {time.perf_counter() - start:.1f}s")
+
+        assert accounts.authenticate(store, target, password)
+        results = [
+            ('lookup', lambda: store.get_password_hash(target)),
+            ('login', lambda: accounts.authenticate(store, target, password)),
+            ('unknown user', lambda: accounts.authenticate(store, 'nobody', password)),
+            ('linear scan', lambda: (target, password) in plaintext),
+        ]
+        print(f'{"operation":<16}{"median ms":>12}')
+        for name, function in results:
+            print(f'{name:<16}{median_ms(function, args.runs):>12.3f}')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
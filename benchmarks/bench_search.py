@@ -0,0 +1,83 @@
+"""Time search-box queries against a large synthetic task table.
+
+    python benchmarks/bench_search.py [--rows 500000] [--limit 200]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_store import TaskStore  # noqa: E402
+
+WORDS = ('report', 'invoice', 'meeting', 'groceries', 'review', 'deploy', 'dentist',
+         'budget', 'garden', 'laundry', 'email', 'backup', 'homework', 'flight', 'taxes')
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'po', 'da', 'fe', 'gu', 'hi')
+CATEGORIES = ('work', 'home', 'school', 'errands', 'health', 'finance')
+PRIORITIES = ('High', 'Medium', 'Low')
+
+# Terms as they appear while typing, from one character to a full word
+TERMS = ('r', 're', 'rep', 'report', 'tax', 'home', 'gard', 'zzz', 'budget fin', 'deploy work')
+
+
+def vocabulary(rng, size=20000):
+    """Common task words plus a long tail of synthetic ones"""
+    words = set(WORDS)
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda w: (w not in WORDS, w))
+
+
+def seed(store, rows, rng):
+    vocab = vocabulary(rng)
+    # Zipf-like weights: the first words are far more frequent than the tail
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+
+    def generate():
+        for i in range(rows):
+            words = rng.choices(vocab, cum_weights=weights, k=8)
+            yield (f'{words[0]} {words[1]} {words[2]} #{i}',
+                   ' '.join(words[3:]),
+                   f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                   rng.choice(PRIORITIES),
+                   'Pending',
+                   ', '.join(rng.sample(CATEGORIES, 2)))
+
+    with store.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO tasks (title, description, due_date, priority, status, categories)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', generate())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(os.path.join(tmp, 'bench.db'))
+        start = time.perf_counter()
+        seed(store, args.rows, random.Random(42))
+        print(f'seeded {args.rows} tasks in {time.perf_counter() - start:.1f}s')
+
+        print(f'{"term":<14}{"matches":>10}{"median ms":>12}')
+        for term in TERMS:
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = store.search_tasks(term, limit=args.limit)
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f'{term:<14}{len(rows):>10}{statistics.median(samples):>12.2f}')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Load test of the HTTP API (task_server.py), entirely on localhost.
+
+Generates a database with taskgen (or copies --db), starts `task_cli.py
+serve` on a free port in a subprocess and keeps --clients keep-alive
+connections busy for --seconds, each sending a mix of requests:
+
+    list        GET /tasks at a random offset
+    list_304    GET /tasks?offset=0 with the ETag of its last answer
+    search      GET /tasks?q=<word>
+    sorted      GET /tasks?sort=due_date
+    stats       GET /stats
+    get         GET /tasks/<id>
+    update      PATCH /tasks/<id> with another status
+    add         POST /tasks
+
+--read-only leaves out update and add. Then GET /tasks.ndjson streams
+every task once. Prints requests per second, latency percentiles per
+kind and the status codes seen; --output writes the same as JSON.
+
+    python benchmarks/bench_server.py [--rows 100000] [--clients 16] [--seconds 10] [--readers 4]
+                                      [--read-only]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import taskgen  # noqa: E402
+
+# Relative frequency of each kind of request
+MIX = {'list': 25, 'list_304': 20, 'search': 15, 'sorted': 5, 'stats': 10, 'get': 15,
+       'update': 7, 'add': 3}
+WORDS = ('review', 'budget', 'call', 'pay', 'dentist', 're', 'tax return', 'server')
+STATUSES = ('Pending', 'In Progress', 'Complete')
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+
+    async def request(self, method, path, body=None, headers=()):
+        """(status, headers, body bytes)"""
+        data = b'' if body is None else json.dumps(body).encode()
+        lines = [f'{method} {path} HTTP/1.1', 'Host: localhost', f'Content-Length: {len(data)}']
+        lines.extend(f'{name}: {value}' for name, value in headers)
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + data)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            return status, response_headers, b''.join(chunks)
+        length = int(response_headers.get('content-length', 0))
+        return status, response_headers, await self.reader.readexactly(length)
+
+    def close(self):
+        self.writer.close()
+
+
+async def worker(number, port, deadline, total, mix, samples, codes):
+    rng = random.Random(number)
+    kinds, weights = zip(*mix.items())
+    client = await Client.connect(port)
+    etag = None
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body, headers = 'GET', None, None, ()
+            if kind == 'list':
+                path = f'/tasks?offset={rng.randrange(max(1, total - 200))}&limit=200'
+            elif kind == 'list_304':
+                path = '/tasks?offset=0&limit=200'
+                headers = [('If-None-Match', etag)] if etag else ()
+            elif kind == 'search':
+                path = '/tasks?q=' + rng.choice(WORDS).replace(' ', '+')
+            elif kind == 'sorted':
+                path = '/tasks?sort=due_date'
+            elif kind == 'stats':
+                path = '/stats'
+            elif kind == 'get':
+                path = f'/tasks/{rng.randint(1, total)}'
+            elif kind == 'update':
+                method, path = 'PATCH', f'/tasks/{rng.randint(1, total)}'
+                body = {'status': rng.choice(STATUSES)}
+            else:
+                method, path = 'POST', '/tasks'
+                body = {'title': f'load test {number}-{rng.random()}', 'priority': 'Low',
+                        'categories': 'load test'}
+            start = time.perf_counter()
+            status, response_headers, _ = await client.request(method, path, body, headers)
+            samples[kind].append((time.perf_counter() - start) * 1000)
+            codes[f'{kind} {status}'] += 1
+            if kind == 'list_304':
+                etag = response_headers.get('etag', etag)
+    finally:
+        client.close()
+
+
+async def load(port, total, clients, seconds, mix):
+    samples, codes = defaultdict(list), Counter()
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(number, port, deadline, total, mix, samples, codes)
+                           for number in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    client = await Client.connect(port)
+    stream_start = time.perf_counter()
+    status, _, body = await client.request('GET', '/tasks.ndjson')
+    stream_seconds = time.perf_counter() - stream_start
+    client.close()
+    return samples, codes, elapsed, (status, body.count(b'\n'), stream_seconds, len(body))
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def start_server(path, readers):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'task_cli.py'), '--db', path, 'serve',
+         '--port', '0', '--readers', str(readers)],
+        stderr=subprocess.PIPE, text=True)
+    line = server.stderr.readline()
+    match = re.search(r':(\d+)$', line.strip())
+    if not match:
+        server.kill()
+        raise SystemExit(f"server did not start: {line}{server.stderr.read()}")
+    return server, int(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--db', help="copy of an existing database to use instead")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--read-only', action='store_true', help="send no updates or adds")
+    parser.add_argument('--output', '-o', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tasks.db')
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            start = time.perf_counter()
+            taskgen.build(path, args.rows, today=date.today())
+            print(f"generated {args.rows} tasks in {time.perf_counter() - start:.1f}s")
+        total = args.rows
+        mix = {kind: weight for kind, weight in MIX.items()
+               if not (args.read_only and kind in ('update', 'add'))}
+        server, port = start_server(path, args.readers)
+        try:
+            samples, codes, elapsed, stream = asyncio.run(
+                load(port, total, args.clients, args.seconds, mix))
+        finally:
+            server.terminate()
+            server.wait()
+
+    count = sum(len(times) for times in samples.values())
+    print(f"{count} requests in {elapsed:.1f}s from {args.clients} clients: "
+          f"{count / elapsed:.0f} requests/s ({args.readers} readers)")
+    print(f'{"request":<12}{"count":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+    results = {}
+    for kind in MIX:
+        times = sorted(samples.get(kind, ()))
+        if not times:
+            continue
+        results[kind] = {'count': len(times),
+                         'p50_ms': round(statistics.median(times), 3),
+                         'p95_ms': round(percentile(times, 0.95), 3),
+                         'p99_ms': round(percentile(times, 0.99), 3)}
+        result = results[kind]
+        print(f'{kind:<12}{result["count"]:>8}{result["p50_ms"]:>10.2f}'
+              f'{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}')
+    print("status codes: " + ', '.join(f'{key}: {value}' for key, value in sorted(codes.items())))
+    status, lines, seconds, size = stream
+    print(f"stream: status {status}, {lines} tasks, {size / 2 ** 20:.1f} MiB in {seconds:.2f}s "
+          f"({lines / seconds:.0f} tasks/s)")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'clients': args.clients, 'readers': args.readers, 'rows': total,
+                       'read_only': args.read_only,
+                       'seconds': round(elapsed, 2), 'requests_per_s': round(count / elapsed, 1),
+                       'requests': results, 'status_codes': dict(codes),
+                       'stream': {'status': status, 'tasks': lines,
+                                  'tasks_per_s': round(lines / seconds)}},
+                      file, indent=2)
+            file.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Measure cold start: time to first paint and time to interactive.
+
+Every run starts a fresh process and times milestones from the moment it
+was spawned (task_manager.py records them when TASKMANAGER_STARTUP_REPORT
+is set):
+
+    login window    first paint of the login window of task_manager.py,
+                    or of a packaged build given with --exe
+    task window     first paint of the TaskManager window, and time to
+                    interactive: the first page of tasks on screen
+    eager imports   the task window again, with tkcalendar, smtplib and
+                    email imported up front as they used to be
+
+Needs a display. Runs against a throw-away database, never the real tasks.db.
+
+    python benchmarks/bench_startup.py [--runs 5] [--rows 10000] [--exe PATH]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_search import seed  # noqa: E402
+from task_store import TaskStore  # noqa: E402
+
+REPORT_ENV = 'TASKMANAGER_STARTUP_REPORT'
+
+
+def read_marks(path):
+    marks = {}
+    if os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                name, timestamp = line.split()
+                marks[name] = float(timestamp)
+    return marks
+
+
+def child(eager):
+    """Open the task window in this process and close it once interactive"""
+    if eager:
+        import email.mime.multipart  # noqa: F401
+        import email.mime.text  # noqa: F401
+        import smtplib  # noqa: F401
+        import tkcalendar  # noqa: F401
+    import tkinter as tk
+    import task_manager
+
+    root = tk.Tk()
+    app = task_manager.TaskManager(root)
+
+    def check():
+        if {'first_paint', 'interactive'} <= set(read_marks(os.environ[REPORT_ENV])):
+            app.close()
+        else:
+            root.after(10, check)
+
+    root.after(10, check)
+    root.mainloop()
+
+
+def run(command, cwd, timeout):
+    """Run command once and return its milestones in ms since spawn"""
+    report = os.path.join(cwd, 'startup.txt')
+    if os.path.exists(report):
+        os.remove(report)
+    env = dict(os.environ, **{REPORT_ENV: report})
+    spawned = time.time()
+    subprocess.run(command, cwd=cwd, env=env, timeout=timeout, check=True)
+    return {name: (timestamp - spawned) * 1000 for name, timestamp in read_marks(report).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--exe', help="packaged build to time instead of task_manager.py")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--child', choices=('lazy', 'eager'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child == 'eager')
+        return
+
+    login = [args.exe] if args.exe else [sys.executable, os.path.join(ROOT, 'task_manager.py')]
+    scenarios = [
+        ('login window', login, 'login_paint', None),
+        ('task window', [sys.executable, __file__, '--child', 'lazy'],
+         'first_paint', 'interactive'),
+        ('eager imports', [sys.executable, __file__, '--child', 'eager'],
+         'first_paint', 'interactive'),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(os.path.join(tmp, 'tasks.db'))
+        seed(store, args.rows, random.Random(42))
+        store.close()
+
+        print(f'{"scenario":<16}{"first paint ms":>16}{"interactive ms":>16}')
+        for name, command, paint, interactive in scenarios:
+            results = [run(command, tmp, args.timeout) for _ in range(args.runs)]
+            paint_ms = statistics.median(r[paint] for r in results)
+            line = f'{name:<16}{paint_ms:>16.0f}'
+            if interactive:
+                line += f'{statistics.median(r[interactive] for r in results):>16.0f}'
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+"""Benchmark suite: how the task list's main paths scale with its size.
+
+For each size a database is generated with taskgen (same seed and
+reference date, same tasks) and every case is timed several times; the
+median and 95th percentile go into a JSON report. Data-layer cases run headless and
+stand for what the window does on the worker thread:
+
+    load_tasks          count and first page of the task list
+    load_tasks_sorted   the same, sorted by due date
+    scroll_page         the next page of a sorted list, deep into it, seeking
+                        from the page above (lists of one page skip it)
+    filter_tasks:TERM   first page of search results for a term
+    filter_category     first page of the largest category
+    update_statistics   statistics panel counts and category counts
+    add_task            insert and read back one task
+    update_task         update and read back one task
+    delete_task         move one task to the recycle bin
+    bulk_complete       mark up to 100 open tasks complete in one statement,
+                        fewer on small lists so every run has its own
+
+With --gui the Treeview paths are timed too (render the first page,
+scroll a page, patch one row), on $DISPLAY or on a virtual display
+started with Xvfb; without either they are reported as skipped.
+
+    python benchmarks/bench_suite.py run [--sizes 1000,10000,100000] [--output base.json]
+    python benchmarks/bench_suite.py compare base.json new.json [--threshold 0.2]
+
+compare exits with status 1 if any case got slower by more than the
+threshold (and by more than --min-ms, to ignore noise on tiny timings),
+and refuses (status 2) reports generated from another seed or date.
+Databases of a million tasks take minutes to generate; --cache-dir keeps
+them between runs.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import taskgen  # noqa: E402
+from migrations import SCHEMA_VERSION  # noqa: E402
+from task_store import PAGE_SIZE, TaskStore  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+TERMS = ('review', 're', 'passport online')
+XVFB_DISPLAY = ':99'
+
+
+def measure(fn, repeat, setup=None):
+    """Time fn(i) for i in range(repeat), each after an untimed setup(i) if
+    given; returns a result dict in ms"""
+    samples = []
+    for i in range(repeat):
+        if setup is not None:
+            setup(i)
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'min_ms': round(samples[0], 4),
+        'runs': repeat,
+    }
+
+
+def database(size, seed, today, cache_dir, tmp):
+    """Path to a fresh copy of the generated database for size"""
+    name = f'tasks-{size}-seed{seed}-{today.isoformat()}-v{SCHEMA_VERSION}.db'
+    source = os.path.join(cache_dir or tmp, name)
+    if not os.path.exists(source):
+        start = time.perf_counter()
+        taskgen.build(source + '.partial', size, seed, today)
+        os.replace(source + '.partial', source)
+        print(f"generated {size} tasks in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    # The cases write, so every run gets its own copy
+    path = os.path.join(tmp, f'run-{size}.db')
+    shutil.copyfile(source, path)
+    return path
+
+
+# ----------------------------------------------------------------------
+# Cases
+# ----------------------------------------------------------------------
+def data_cases(store, today, repeat):
+    results = {}
+    top_category = store.category_counts()
+    top_category = max(top_category, key=lambda row: row[1])[0] if top_category else None
+
+    results['load_tasks'] = measure(lambda i: store.task_pages('').prefetch(), repeat)
+    results['load_tasks_sorted'] = measure(
+        lambda i: store.task_pages('', sort='due_date').prefetch(), repeat)
+
+    # Each run reads one of the deepest pages into a fresh list whose page
+    # above is already there, as when scrolling down a page at a time
+    page_count = -(-len(store.task_pages('', sort='due_date')) // PAGE_SIZE)
+    if page_count > 1:
+        scrolled = {}
+
+        def scroll_to_page_above(i):
+            scrolled['pages'] = store.task_pages('', sort='due_date')
+            scrolled['page'] = page_count - 1 - i % (page_count - 1)
+            scrolled['pages'][(scrolled['page'] - 1) * PAGE_SIZE]
+        results['scroll_page'] = measure(
+            lambda i: scrolled['pages'][scrolled['page'] * PAGE_SIZE], repeat,
+            setup=scroll_to_page_above)
+
+    for term in TERMS:
+        results[f'filter_tasks:{term}'] = measure(
+            lambda i: store.task_pages(term).prefetch(), repeat)
+    if top_category:
+        results['filter_category'] = measure(
+            lambda i: store.task_pages('', top_category).prefetch(), repeat)
+
+    def stats(i):
+        store.statistics(today.isoformat())
+        store.category_counts()
+    results['update_statistics'] = measure(stats, repeat)
+
+    added = []
+
+    def add(i):
+        task_id = store.add_task(f'bench add {i}', 'benchmark task', today, 'High', 'Pending', 'work')
+        added.append(store.get_task(task_id))
+    results['add_task'] = measure(add, repeat)
+
+    def update(i):
+        task = added[i]
+        store.update_task(task[0], task[1], task[2], task[3], 'Low', 'In Progress', 'work, home')
+        store.get_task(task[0])
+    results['update_task'] = measure(update, repeat)
+
+    results['delete_task'] = measure(lambda i: store.delete_tasks([added[i][0]]), repeat)
+
+    # Every run completes tasks that are still open
+    open_ids = [row[0] for row in store.execute(
+        "SELECT id FROM tasks WHERE status != 'Complete' LIMIT ?", (100 * repeat,))]
+    batch = min(100, len(open_ids) // repeat)
+    if batch:
+        results['bulk_complete'] = measure(
+            lambda i: store.update_tasks(open_ids[i * batch:(i + 1) * batch], status='Complete'),
+            repeat)
+        results['bulk_complete']['tasks'] = batch
+    return results
+
+
+def gui_cases(store, repeat):
+    import tkinter as tk
+    from tkinter import ttk
+    from virtual_list import VirtualTaskList
+
+    root = tk.Tk()
+    root.geometry('1000x700')
+    columns = ('Title', 'Description', 'Due Date', 'Priority', 'Status', 'Categories')
+    tree = ttk.Treeview(root, columns=columns, show='headings')
+    scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    task_list = VirtualTaskList(tree, scrollbar)
+    root.update()
+
+    results = {}
+    try:
+        def render_first_page(i):
+            task_list.set_rows(store.task_pages('').prefetch())
+            root.update_idletasks()
+        results['gui_render_first_page'] = measure(render_first_page, repeat)
+
+        def scroll_page(i):
+            task_list._scroll_by(task_list.visible_count())
+            root.update_idletasks()
+        results['gui_scroll_page'] = measure(scroll_page, repeat)
+
+        def update_row(i):
+            task = task_list.rows[task_list.first]
+            task_list.update_row(task[:5] + (('Complete' if i % 2 else 'Pending'),) + task[6:])
+            root.update_idletasks()
+        results['gui_update_row'] = measure(update_row, repeat)
+    finally:
+        root.destroy()
+    return results
+
+
+def start_display():
+    """Make sure there is an X display; returns (Xvfb process or None, reason
+    the GUI cases cannot run or None)"""
+    if os.environ.get('DISPLAY'):
+        return None, None
+    if not shutil.which('Xvfb'):
+        return None, "no $DISPLAY and Xvfb is not installed"
+    xvfb = subprocess.Popen(['Xvfb', XVFB_DISPLAY, '-screen', '0', '1280x1024x24'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    if xvfb.poll() is not None:
+        return None, "Xvfb failed to start"
+    os.environ['DISPLAY'] = XVFB_DISPLAY
+    return xvfb, None
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    today = args.today
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'today': today.isoformat(),
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    xvfb, gui_skipped = start_display() if args.gui else (None, "not requested (--gui)")
+    if gui_skipped:
+        report['meta']['gui_skipped'] = gui_skipped
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in args.sizes:
+                store = TaskStore(database(size, args.seed, today, args.cache_dir, tmp))
+                try:
+                    results = data_cases(store, today, args.repeat)
+                    if not gui_skipped:
+                        results.update(gui_cases(store, args.repeat))
+                finally:
+                    store.close()
+                report['results'][str(size)] = results
+                print_results(size, results)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+        print(f"results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+def print_results(size, results):
+    print(f"\n{size} tasks", file=sys.stderr)
+    print(f'{"case":<28}{"median ms":>12}{"p95 ms":>12}', file=sys.stderr)
+    for name, result in results.items():
+        print(f'{name:<28}{result["median_ms"]:>12.3f}{result["p95_ms"]:>12.3f}', file=sys.stderr)
+
+
+# ----------------------------------------------------------------------
+# Comparison
+# ----------------------------------------------------------------------
+def compare(args):
+    with open(args.base) as file:
+        base = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    for key in ('seed', 'today'):
+        if base['meta'].get(key) != new['meta'].get(key):
+            print(f"cannot compare: {args.base} has {key} {base['meta'].get(key)} "
+                  f"but {args.new} has {new['meta'].get(key)}", file=sys.stderr)
+            return 2
+
+    regressions = 0
+    print(f'{"size":>8}  {"case":<28}{"base ms":>10}{"new ms":>10}{"change":>9}')
+    for size, cases in new['results'].items():
+        for name, result in cases.items():
+            old = base['results'].get(size, {}).get(name)
+            if old is None:
+                continue
+            before, after = old['median_ms'], result['median_ms']
+            change = (after - before) / before if before else 0.0
+            flag = ''
+            if change > args.threshold and after - before > args.min_ms:
+                flag = '  REGRESSION'
+                regressions += 1
+            elif change < -args.threshold and before - after > args.min_ms:
+                flag = '  faster'
+            print(f'{size:>8}  {name:<28}{before:>10.3f}{after:>10.3f}{change:>+9.0%}{flag}')
+    if regressions:
+        print(f"\n{regressions} case(s) slower by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the suite and write a JSON report")
+    run_parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                            type=lambda text: [int(size) for size in text.split(',')],
+                            help="comma-separated task counts (default: %(default)s)")
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--today', type=date.fromisoformat, default=taskgen.TODAY,
+                            help="reference date for due dates and statistics "
+                                 "(default: %(default)s)")
+    run_parser.add_argument('--repeat', type=int, default=20)
+    run_parser.add_argument('--gui', action='store_true', help="also time the Treeview paths")
+    run_parser.add_argument('--cache-dir', help="keep generated databases here between runs")
+    run_parser.add_argument('--output', '-o', help="JSON report file (default: stdout)")
+    run_parser.set_defaults(run=run)
+
+    compare_parser = commands.add_parser('compare', help="compare two JSON reports")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help="relative slowdown that counts as a regression (default: 0.2)")
+    compare_parser.add_argument('--min-ms', type=float, default=0.05,
+                                help="ignore changes smaller than this many ms (default: 0.05)")
+    compare_parser.set_defaults(run=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Seeded generator of realistic task databases for the benchmarks.
+
+The same seed, row count and reference date always produce the same
+tasks; the date defaults to a fixed one, not today, so datasets generated
+on different days match. The distributions are meant to look like a real task list:
+
+    titles      a verb and an object ("Review budget report"), numbered
+                only when the same title comes up again
+    categories  0-3 per task from a pool of 40, a few used far more often
+                than the rest
+    due dates   15% none; the others mostly within a few weeks of today,
+                with a tail of long-overdue and far-future dates
+    status      old tasks are mostly Complete, upcoming ones mostly open
+
+    python benchmarks/taskgen.py 100000 /tmp/tasks-100k.db [--seed 42] [--today 2025-01-01]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_store import TaskStore  # noqa: E402
+
+VERBS = ('Review', 'Call', 'Email', 'Buy', 'Fix', 'Plan', 'Write', 'Book', 'Pay', 'Clean',
+         'Update', 'Prepare', 'Submit', 'Schedule', 'Check', 'Organize', 'Renew', 'Order',
+         'Draft', 'Finish', 'Send', 'Read', 'Cancel', 'Return', 'Test', 'Deploy', 'Backup',
+         'Research', 'Print', 'Sign')
+OBJECTS = ('budget report', 'dentist', 'groceries', 'car insurance', 'flight tickets',
+           'rent', 'kitchen', 'project proposal', 'tax return', 'team meeting', 'invoice',
+           'presentation', 'garden', 'laundry', 'birthday gift', 'passport', 'library books',
+           'homework', 'doctor appointment', 'server update', 'database backup', 'newsletter',
+           'quarterly review', 'gym membership', 'phone bill', 'holiday plans', 'blog post',
+           'code review', 'release notes', 'client contract', 'expense claims', 'bike repair',
+           'parents', 'plumber', 'vet appointment', 'school forms', 'electricity bill',
+           'photos', 'resume', 'bookshelf')
+QUALIFIERS = ('', '', '', '', ' for Monday', ' before Friday', ' again', ' (urgent)',
+              ' for next week', ' with Sam', ' with the team', ' online')
+CATEGORIES = ('work', 'home', 'personal', 'errands', 'finance', 'health', 'family', 'school',
+              'shopping', 'travel', 'urgent', 'someday', 'calls', 'email', 'reading', 'garden',
+              'car', 'pets', 'fitness', 'projects', 'bills', 'admin', 'meetings', 'ideas',
+              'learning', 'house', 'kids', 'friends', 'volunteering', 'music', 'cooking',
+              'photos', 'taxes', 'insurance', 'clients', 'release', 'infra', 'hiring',
+              'marketing', 'support')
+DESCRIPTION_WORDS = ('need', 'to', 'the', 'before', 'after', 'call', 'check', 'with', 'and',
+                     'for', 'next', 'week', 'ask', 'about', 'price', 'form', 'online', 'send',
+                     'copy', 'remember', 'receipt', 'details', 'in', 'email', 'notes', 'list')
+# Default reference date for due dates
+TODAY = date(2025, 1, 1)
+PRIORITIES = ('High', 'Medium', 'Low')
+PRIORITY_WEIGHTS = (20, 50, 30)
+CATEGORY_COUNTS = (0, 1, 2, 3)
+CATEGORY_COUNT_WEIGHTS = (20, 50, 25, 5)
+# Zipf-like: the first categories are used far more than the last ones
+CATEGORY_WEIGHTS = tuple(itertools.accumulate(1 / (rank + 1) for rank in range(len(CATEGORIES))))
+
+
+def due_date(rng, today):
+    """Due date of one task, or None"""
+    kind = rng.random()
+    if kind < 0.15:
+        return None
+    if kind < 0.65:
+        days = round(rng.gauss(5, 10))      # coming up soon, some just overdue
+    elif kind < 0.85:
+        days = -rng.randint(1, 365)         # long overdue or long done
+    else:
+        days = rng.randint(30, 365)         # far future
+    return today + timedelta(days=days)
+
+
+def status(rng, due, today):
+    roll = rng.random()
+    if due is not None and due < today - timedelta(days=14):
+        return 'Complete' if roll < 0.8 else 'Pending'
+    if roll < 0.1:
+        return 'Complete'
+    return 'In Progress' if roll < 0.25 else 'Pending'
+
+
+def generate(rows, seed=42, today=None):
+    """Yield rows tuples in TASK_COLUMNS order"""
+    rng = random.Random(seed)
+    today = today or TODAY
+    seen = {}
+    for _ in range(rows):
+        base = f'{rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(QUALIFIERS)}'
+        copies = seen.get(base, 0)
+        seen[base] = copies + 1
+        title = base if not copies else f'{base} #{copies + 1}'
+        words = rng.randint(0, 25) if rng.random() > 0.3 else 0
+        description = ' '.join(rng.choices(DESCRIPTION_WORDS, k=words))
+        due = due_date(rng, today)
+        count = rng.choices(CATEGORY_COUNTS, CATEGORY_COUNT_WEIGHTS)[0]
+        categories = set()
+        while len(categories) < count:
+            categories.add(rng.choices(CATEGORIES, cum_weights=CATEGORY_WEIGHTS)[0])
+        yield (title,
+               description,
+               due.isoformat() if due else None,
+               rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+               status(rng, due, today),
+               ', '.join(sorted(categories)))
+
+
+def build(path, rows, seed=42, today=None):
+    """Create a task database at path with rows generated tasks"""
+    store = TaskStore(path)
+    with store.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO tasks (title, description, due_date, priority, status, categories)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', generate(rows, seed, today))
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--today', type=date.fromisoformat, default=TODAY,
+                        help="reference date (default: %(default)s)")
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    start = time.perf_counter()
+    build(args.path, args.rows, args.seed, args.today)
+    print(f"{args.rows} tasks written to {args.path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,18 @@
+import argparse
 import os
 import sys
 import shutil
 import subprocess
 
+# PyInstaller options per build profile. 'onefile' is a single executable
+# that unpacks itself to a temp dir on every launch. 'onedir' is the
+# fast-start profile: a folder that starts straight from disk, without UPX
+# so DLLs don't have to be decompressed when they load.
+PROFILES = {
+    'onefile': ['--onefile'],
+    'onedir': ['--onedir', '--noupx'],
+}
+
 def clean_build():
     """Clean build directories"""
     dirs_to_clean = ['build', 'dist']
@@ -19,7 +29,7 @@ def install_requirements():
     """Install required packages"""
     subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'])
 
-def build_executable():
+def build_executable(profile='onefile'):
     """Build the executable using PyInstaller"""
     # PyInstaller command with options
     pyinstaller_path = os.path.join(os.path.dirname(sys.executable), 'Scripts', 'pyinstaller.exe')
@@ -34,7 +44,7 @@ def build_executable():
         pyinstaller_path,
         '--name=TaskManager',
         '--windowed',
-        '--onefile',
+        *PROFILES[profile],
         '--clean',
         '--add-data=tasks.db;.',  # Include database file
         'task_manager.py'
@@ -59,7 +69,12 @@ def create_distribution():
             shutil.copy2(file, 'dist')
 
 def main():
-    print("Starting build process...")
+    parser = argparse.ArgumentParser(description="Build the TaskManager executable")
+    parser.add_argument('--profile', choices=PROFILES, default='onefile',
+                        help="onefile (single executable) or onedir (fast start)")
+    args = parser.parse_args()
+
+    print(f"Starting build process ({args.profile})...")
     
     print("Cleaning previous build...")
     clean_build()
@@ -68,13 +83,16 @@ def main():
     install_requirements()
     
     print("Building executable...")
-    build_executable()
+    build_executable(args.profile)
     
     print("Creating distribution package...")
     create_distribution()
     
     print("Build completed successfully!")
-    print("The executable can be found in the 'dist' directory.")
+    if args.profile == 'onedir':
+        print("The application folder can be found in 'dist/TaskManager'.")
+    else:
+        print("The executable can be found in the 'dist' directory.")
 
 if __name__ == '__main__':
     main()
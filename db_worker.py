@@ -0,0 +1,97 @@
+"""Background thread for database work.
+
+Tk is single-threaded, so anything that can block on disk (a slow or
+network-synced tasks.db, a lock held by another process) runs here
+instead of on the event loop. Jobs run one at a time in submission order
+on a dedicated thread, which gets its own connection from the TaskStore
+pool. Results are handed back to the Tk thread by polling a queue with
+root.after, so callbacks may touch widgets freely.
+"""
+import queue
+import threading
+
+POLL_MS = 15
+
+
+class DBWorker:
+    def __init__(self, root, on_busy=None, poll_ms=POLL_MS):
+        """on_busy(bool) is called on the Tk thread when work starts and stops"""
+        self.root = root
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = 0
+        self._visible = 0       # pending jobs that show as busy
+        self._polling = False
+        self._thread = threading.Thread(target=self._work, name='db-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, job, *args, callback=None, errback=None, quiet=False):
+        """Run job(*args) on the worker thread.
+
+        callback(result) or errback(exception) is then called on the Tk
+        thread. Without an errback, exceptions are re-raised there. Quiet
+        jobs, such as periodic checks, do not make the worker show as busy.
+        """
+        self._requests.put((job, args, callback, errback, quiet))
+        self._pending += 1
+        if not quiet:
+            self._visible += 1
+            if self._visible == 1 and self.on_busy:
+                self.on_busy(True)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def post(self, handler, value):
+        """Call handler(value) on the Tk thread; for use from inside a job,
+        e.g. to report progress"""
+        self._results.put((handler, value, None, False))
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def stop(self, timeout=2.0):
+        """Finish queued jobs and stop the thread"""
+        self._requests.put(None)
+        self._thread.join(timeout)
+
+    def _work(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            job, args, callback, errback, quiet = request
+            try:
+                result = job(*args)
+            except Exception as e:
+                self._results.put((errback, e, 'error', quiet))
+            else:
+                self._results.put((callback, result, 'done', quiet))
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    handler, value, kind, quiet = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if kind is not None:
+                    # A job finished; posted messages do not count
+                    self._pending -= 1
+                    if not quiet:
+                        self._visible -= 1
+                        if self._visible == 0 and self.on_busy:
+                            self.on_busy(False)
+                if kind == 'error' and handler is None:
+                    raise value
+                if handler is not None:
+                    handler(value)
+        finally:
+            # Keep polling even if a callback raised
+            if self._pending:
+                self.root.after(self.poll_ms, self._poll)
+            else:
+                self._polling = False
@@ -0,0 +1,225 @@
+"""Outgoing mail, sent from the outbox table by a background thread.
+
+Windows only queue a message (one INSERT) and return; a MailSender thread
+delivers the outbox in order over a single SMTP session, which is kept
+open for IDLE_SECONDS so a burst of messages pays for the connection,
+STARTTLS and login once. Temporary failures (no connection, 4xx replies)
+are retried with exponential backoff, permanent 5xx replies fail the
+message at once. Messages survive a restart: whatever is still pending
+is sent the next time a sender runs.
+
+The server is configured through environment variables, so the sender can
+be pointed at a local stand-in, e.g. for Python 3.11:
+
+    python -m smtpd -n -c DebuggingServer localhost:1025
+    TASKMANAGER_SMTP_HOST=localhost TASKMANAGER_SMTP_PORT=1025 \\
+        TASKMANAGER_SMTP_STARTTLS=0 TASKMANAGER_SMTP_USER= python task_manager.py
+
+or `python -m aiosmtpd -n -l localhost:1025` on newer versions.
+"""
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+SMTP_TIMEOUT = 10
+# How long an unused session is kept open
+IDLE_SECONDS = 30
+# A session unused for longer is checked with NOOP before reuse
+NOOP_AFTER_SECONDS = 5
+# Delay before the second attempt, doubled for each one after it
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 600
+MAX_ATTEMPTS = 6
+
+
+def smtp_settings():
+    """Server settings from TASKMANAGER_SMTP_* environment variables"""
+    env = os.environ.get
+    user = env('TASKMANAGER_SMTP_USER', 'your_email@example.com')
+    return {
+        'host': env('TASKMANAGER_SMTP_HOST', 'smtp.example.com'),
+        'port': int(env('TASKMANAGER_SMTP_PORT', '587')),
+        'starttls': env('TASKMANAGER_SMTP_STARTTLS', '1') not in ('0', 'no', 'false'),
+        'user': user,
+        'password': env('TASKMANAGER_SMTP_PASSWORD', 'your_password'),
+        'sender': env('TASKMANAGER_SMTP_FROM', user or 'taskmanager@localhost'),
+    }
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed attempts"""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def is_permanent(error):
+    """True for failures that retrying will not fix: 5xx replies"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def describe(error):
+    if isinstance(error, smtplib.SMTPResponseException):
+        message = error.smtp_error
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', 'replace')
+        return f"{error.smtp_code} {message}"
+    return str(error) or type(error).__name__
+
+
+class MailSender:
+    def __init__(self, store, settings=None, on_status=None):
+        """
+        on_status(message_id, status, detail) is called on the sender
+        thread with status 'sent', 'retry' (detail says when) or 'failed'.
+        """
+        self.store = store
+        self.settings = settings or smtp_settings()
+        self.on_status = on_status
+        self._smtp = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mail-sender', daemon=True)
+            self._thread.start()
+        return self
+
+    def send(self, recipient, subject, body):
+        """Queue a message and return its outbox id without waiting"""
+        message_id = self.store.queue_mail(recipient, subject, body)
+        self.start()
+        self._wake.set()
+        return message_id
+
+    def stop(self, timeout=SMTP_TIMEOUT):
+        """Stop after the message being sent; the rest stays queued"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Sender thread
+    # ------------------------------------------------------------------
+    def _run(self):
+        try:
+            while not self._stopping:
+                self._wake.clear()
+                self._drain()
+                if self._stopping:
+                    break
+                self._wake.wait(self._next_wait())
+        finally:
+            self._disconnect()
+            self.store.release()
+
+    def _drain(self):
+        """Send every message that is due"""
+        due = self.store.due_mail(time.time())
+        for position, (message_id, recipient, subject, body, attempts) in enumerate(due):
+            if self._stopping:
+                return
+            try:
+                smtp = self._session()
+            except (smtplib.SMTPException, OSError) as e:
+                # No usable server: everything still due waits for its retry
+                for message_id, _, _, _, attempts in due[position:]:
+                    self._failed(message_id, attempts + 1, e)
+                return
+            try:
+                smtp.send_message(self._message(recipient, subject, body))
+            except (smtplib.SMTPException, OSError) as e:
+                # Refused recipients or data leave the session usable
+                if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                                      smtplib.SMTPDataError)):
+                    self._disconnect()
+                self._failed(message_id, attempts + 1, e)
+            else:
+                self.store.mark_mail_sent(message_id)
+                self._report(message_id, 'sent', '')
+            self._last_used = time.monotonic()
+
+    def _next_wait(self):
+        """Seconds until the next retry or the idle session closes, or None"""
+        waits = []
+        next_attempt = self.store.next_mail_time()
+        if next_attempt is not None:
+            waits.append(max(0.0, next_attempt - time.time()))
+        if self._smtp is not None:
+            idle = IDLE_SECONDS - (time.monotonic() - self._last_used)
+            if idle <= 0:
+                self._disconnect()
+            else:
+                waits.append(idle)
+        if not waits:
+            # Nothing to do until send(); give the connection back meanwhile
+            self.store.release()
+            return None
+        return min(waits)
+
+    def _failed(self, message_id, attempts, error):
+        detail = describe(error)
+        if is_permanent(error) or attempts >= MAX_ATTEMPTS:
+            self.store.fail_mail(message_id, detail)
+            self._report(message_id, 'failed', detail)
+        else:
+            delay = retry_delay(attempts)
+            self.store.retry_mail(message_id, detail, time.time() + delay)
+            self._report(message_id, 'retry', f"{detail}; retrying in {delay}s")
+
+    def _report(self, message_id, status, detail):
+        if self.on_status:
+            self.on_status(message_id, status, detail)
+
+    # ------------------------------------------------------------------
+    # SMTP session
+    # ------------------------------------------------------------------
+    def _message(self, recipient, subject, body):
+        message = EmailMessage()
+        message['From'] = self.settings['sender']
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body)
+        return message
+
+    def _session(self):
+        """The open SMTP session, or a new one. A session that sat idle is
+        checked with NOOP first, since the server may have dropped it."""
+        if self._smtp is not None:
+            if time.monotonic() - self._last_used < NOOP_AFTER_SECONDS:
+                return self._smtp
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+        settings = self.settings
+        smtp = smtplib.SMTP(settings['host'], settings['port'], timeout=SMTP_TIMEOUT)
+        try:
+            if settings['starttls']:
+                smtp.starttls()
+            if settings['user']:
+                smtp.login(settings['user'], settings['password'])
+        except BaseException:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
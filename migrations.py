@@ -0,0 +1,430 @@
+"""Versioned schema migrations for tasks.db.
+
+The schema version lives in PRAGMA user_version. Each migration runs in
+its own transaction together with the version bump, so an interrupted
+upgrade resumes where it stopped. Migrations only ever get appended to
+MIGRATIONS; never edit one that has shipped.
+"""
+import sqlite3
+from datetime import date, datetime
+
+# Columns covered by the full-text index behind the search box
+FTS_COLUMNS = ('title', 'description', 'priority', 'categories')
+
+# Columns recorded by the task_events journal (task_store.TASK_COLUMNS),
+# then the repeat rule as well from journal_recurrence on
+JOURNAL_COLUMNS = ('title', 'description', 'due_date', 'priority', 'status', 'categories')
+JOURNAL_RULE_COLUMNS = JOURNAL_COLUMNS + ('recurrence',)
+
+# Sort order for the priority column; anything else ranks 0
+PRIORITY_RANKS = {'High': 3, 'Medium': 2, 'Low': 1}
+
+# Due date formats written by older versions (tkcalendar's default M/d/yy)
+LEGACY_DATE_FORMATS = ('%m/%d/%y', '%m/%d/%Y')
+
+
+def create_tables(cursor):
+    # Tasks table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            due_date TEXT,
+            priority TEXT,
+            status TEXT DEFAULT 'Pending',
+            categories TEXT
+        )
+    ''')
+    # Recycle bin table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS deleted_tasks (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            due_date TEXT,
+            priority TEXT,
+            status TEXT,
+            categories TEXT,
+            deleted_date TEXT
+        )
+    ''')
+
+
+def create_fts(cursor):
+    """FTS5 index over tasks and the triggers that keep it in sync"""
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'").fetchone()
+    try:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                {', '.join(FTS_COLUMNS)},
+                content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4 5'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search falls back to a table scan
+        return
+
+    new_cols = ', '.join('new.' + c for c in FTS_COLUMNS)
+    old_cols = ', '.join('old.' + c for c in FTS_COLUMNS)
+    cols = ', '.join(FTS_COLUMNS)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF {cols} ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO tasks_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    ''')
+    if not exists:
+        # Index tasks that were created before the index existed
+        cursor.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+def create_counters(cursor):
+    """Total/completed counters, the triggers that maintain them and the
+    open-tasks due date index used by the statistics panel"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    # Seed from the existing rows the first time only
+    cursor.execute('''
+        INSERT OR IGNORE INTO task_counters (name, value)
+        SELECT 'total', COUNT(*) FROM tasks
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO task_counters (name, value)
+        SELECT 'completed', COUNT(*) FROM tasks WHERE status = 'Complete'
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_counters_ai AFTER INSERT ON tasks BEGIN
+            UPDATE task_counters SET value = value + 1 WHERE name = 'total';
+            UPDATE task_counters SET value = value + 1
+            WHERE name = 'completed' AND new.status = 'Complete';
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_counters_ad AFTER DELETE ON tasks BEGIN
+            UPDATE task_counters SET value = value - 1 WHERE name = 'total';
+            UPDATE task_counters SET value = value - 1
+            WHERE name = 'completed' AND old.status = 'Complete';
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_counters_au AFTER UPDATE OF status ON tasks
+        WHEN (old.status IS 'Complete') != (new.status IS 'Complete') BEGIN
+            UPDATE task_counters
+            SET value = value + (new.status IS 'Complete') - (old.status IS 'Complete')
+            WHERE name = 'completed';
+        END
+    ''')
+    # Open tasks by due date, for the due today/this week/overdue counts
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_due
+        ON tasks(due_date) WHERE status != 'Complete'
+    ''')
+
+
+def index_title_status_due_date(cursor):
+    """Unique titles, status and due date indexes, ISO due dates"""
+    # Older databases may hold duplicate titles; keep the first and
+    # suffix the others with their id so the unique index can be built
+    cursor.execute('''
+        UPDATE tasks SET title = title || ' (' || id || ')'
+        WHERE id NOT IN (SELECT MIN(id) FROM tasks GROUP BY title)
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_title ON tasks(title)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)')
+
+    # Due dates compare as text, so store them all as YYYY-MM-DD
+    cursor.execute('''
+        UPDATE tasks SET due_date = date(due_date)
+        WHERE date(due_date) IS NOT NULL AND due_date != date(due_date)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)')
+
+
+def add_priority_rank(cursor):
+    """Integer priority ordinal, derived from the priority text and indexed"""
+    ranks = ' '.join(f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANKS.items())
+    cursor.execute(f'''
+        ALTER TABLE tasks ADD COLUMN priority_rank INTEGER
+        GENERATED ALWAYS AS (CASE priority {ranks} ELSE 0 END) VIRTUAL
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_priority_rank ON tasks(priority_rank, id)')
+
+
+def index_deleted_date_add_settings(cursor):
+    """Recycle bin index by deletion time, and a table of user settings"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_deleted_tasks_deleted_date
+        ON deleted_tasks(deleted_date, id)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            name TEXT PRIMARY KEY,
+            value
+        ) WITHOUT ROWID
+    ''')
+
+
+def category_names(row):
+    """Table-valued expression yielding the comma-separated parts of
+    row.categories as JSON array values (json_quote escapes everything
+    except the commas)"""
+    return f"""json_each('[' || replace(json_quote({row}.categories), ',', '","') || ']')"""
+
+
+def normalize_categories(cursor):
+    """categories and task_categories tables, filled from tasks.categories
+    and kept in step with it by triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    ''')
+    # Keyed by category first: the tasks of one category are an index range
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_categories (
+            category_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            PRIMARY KEY (category_id, task_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_task_categories_task ON task_categories(task_id)
+    ''')
+
+    def link(row):
+        return f'''
+            INSERT OR IGNORE INTO categories (name)
+            SELECT trim(j.value) FROM {category_names(row)} j WHERE trim(j.value) != '';
+            INSERT OR IGNORE INTO task_categories (category_id, task_id)
+            SELECT c.id, {row}.id FROM {category_names(row)} j
+            JOIN categories c ON c.name = trim(j.value);
+        '''
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_categories_ai AFTER INSERT ON tasks BEGIN
+            {link('new')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_categories_au AFTER UPDATE OF categories ON tasks
+        WHEN old.categories IS NOT new.categories BEGIN
+            DELETE FROM task_categories WHERE task_id = old.id;
+            {link('new')}
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_categories_ad AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_categories WHERE task_id = old.id;
+        END
+    ''')
+
+    # Existing tasks
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO categories (name)
+        SELECT trim(j.value) FROM tasks t, {category_names('t')} j
+        WHERE trim(j.value) != ''
+        ORDER BY t.id
+    ''')
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO task_categories (category_id, task_id)
+        SELECT c.id, t.id FROM tasks t, {category_names('t')} j
+        JOIN categories c ON c.name = trim(j.value)
+    ''')
+
+
+def create_users(cursor):
+    """Login accounts, looked up by the unique username index"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            created TEXT DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
+
+
+def create_outbox(cursor):
+    """Outgoing mail, sent by a background thread and retried until delivered"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created TEXT DEFAULT (datetime('now', 'localtime')),
+            sent TEXT
+        )
+    ''')
+    # The sender only ever looks for pending mail that is due
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_outbox_pending
+        ON outbox(next_attempt) WHERE status = 'pending'
+    ''')
+
+
+def index_sort_columns(cursor):
+    """Indexes for sorting the task list by status and categories, and by
+    due date with tasks without one first. NULLs are indexed as '' so
+    (key, id) comparisons for keyset paging never meet a NULL."""
+    for column in ('due_date', 'status', 'categories'):
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_tasks_sort_{column}
+            ON tasks(ifnull({column}, ''))
+        ''')
+
+
+def task_image(row, columns=JOURNAL_COLUMNS):
+    """JSON array of a task's values of columns"""
+    return 'json_array(' + ', '.join(f'{row}.{column}' for column in columns) + ')'
+
+
+def create_event_triggers(cursor, columns):
+    """Triggers journaling every insert, delete and change to columns of tasks"""
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_events_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_events (task_id, kind, new)
+            VALUES (new.id, 'insert', {task_image('new', columns)});
+        END
+    ''')
+    changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in columns)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_events_au AFTER UPDATE ON tasks
+        WHEN {changed} BEGIN
+            INSERT INTO task_events (task_id, kind, old, new)
+            VALUES (new.id, 'update', {task_image('old', columns)}, {task_image('new', columns)});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_events_ad AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_events (task_id, kind, old)
+            VALUES (old.id, 'delete', {task_image('old', columns)});
+        END
+    ''')
+
+
+def create_task_events(cursor):
+    """Append-only journal of every change to tasks, written by triggers in
+    the transaction that makes the change, and a link from recycle bin
+    entries back to the task they were"""
+    # AUTOINCREMENT: sequence numbers are never reused, even after old
+    # events are pruned
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            old TEXT,
+            new TEXT,
+            created TEXT DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
+    create_event_triggers(cursor, JOURNAL_COLUMNS)
+    cursor.execute('ALTER TABLE deleted_tasks ADD COLUMN task_id INTEGER')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_deleted_tasks_task ON deleted_tasks(task_id)
+    ''')
+
+
+def add_recurrence(cursor):
+    """Repeat rules of recurring tasks (recurrence.py), kept with the task
+    in the recycle bin too, and an index of the recurring tasks by due date"""
+    cursor.execute('ALTER TABLE tasks ADD COLUMN recurrence TEXT')
+    cursor.execute('ALTER TABLE deleted_tasks ADD COLUMN recurrence TEXT')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_recurring ON tasks(due_date)
+        WHERE recurrence IS NOT NULL
+    ''')
+
+
+def legacy_iso_date(value):
+    """An old due date as YYYY-MM-DD, or None if it cannot be read"""
+    value = value.strip()
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        pass
+    for pattern in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, pattern).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def normalize_legacy_due_dates(cursor):
+    """Due dates that date() could not read (index_title_status_due_date
+    left them as they were) converted from M/d/yy, or cleared if they are
+    not dates at all, in tasks and in the recycle bin"""
+    for table in ('tasks', 'deleted_tasks'):
+        rows = cursor.execute(f'''
+            SELECT id, due_date FROM {table}
+            WHERE due_date IS NOT NULL AND due_date IS NOT date(due_date)
+        ''').fetchall()
+        cursor.executemany(f'UPDATE {table} SET due_date = ? WHERE id = ?',
+                           [(legacy_iso_date(due_date), row_id) for row_id, due_date in rows])
+
+
+def journal_recurrence(cursor):
+    """Journal repeat rules with the other task columns, so changing one
+    moves the journal on (ETags, other instances) and can be undone;
+    images gain the rule as an extra last value"""
+    for name in ('task_events_ai', 'task_events_au', 'task_events_ad'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    create_event_triggers(cursor, JOURNAL_RULE_COLUMNS)
+
+
+MIGRATIONS = (
+    create_tables,
+    create_fts,
+    create_counters,
+    index_title_status_due_date,
+    add_priority_rank,
+    index_deleted_date_add_settings,
+    normalize_categories,
+    create_users,
+    create_outbox,
+    index_sort_columns,
+    create_task_events,
+    add_recurrence,
+    normalize_legacy_due_dates,
+    journal_recurrence,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(store):
+    """Upgrade the store's database to SCHEMA_VERSION, in place"""
+    version = schema_version(store.conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"{store.path} has schema version {version}, "
+                           f"newer than this program supports ({SCHEMA_VERSION})")
+    for number in range(version, SCHEMA_VERSION):
+        with store.transaction() as cursor:
+            MIGRATIONS[number](cursor)
+            cursor.execute(f'PRAGMA user_version = {number + 1}')
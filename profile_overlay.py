@@ -0,0 +1,125 @@
+"""Live view of the profiling numbers (see profiling.py).
+
+A small always-on-top window, toggled with F12, that redraws the action
+latencies and the most expensive SQL statements every REFRESH_MS while it
+is shown. "Dump..." saves everything, the recent statement log included,
+as JSON to attach to a bug report.
+"""
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, messagebox
+
+from profiling import PROFILER, PROFILE_ENV
+
+REFRESH_MS = 500
+# Statements listed, most total time first
+TOP_STATEMENTS = 12
+SQL_WIDTH = 70
+
+
+def format_snapshot(snapshot):
+    """Plain-text tables of a Profiler.snapshot()"""
+    lines = [f'{"action":<18}{"count":>7}{"p50 ms":>10}{"p95 ms":>10}{"max ms":>10}']
+    for name, action in sorted(snapshot['actions'].items()):
+        lines.append(f'{name:<18}{action["count"]:>7}{action["p50_ms"]:>10.2f}'
+                     f'{action["p95_ms"]:>10.2f}{action["max_ms"]:>10.2f}')
+    if not snapshot['actions']:
+        lines.append('(no actions yet)')
+    lines.append('')
+    lines.append(f'{"total ms":>10}{"count":>8}{"mean ms":>10}{"max ms":>10}  sql')
+    for statement in snapshot['statements']:
+        sql = statement['sql']
+        if len(sql) > SQL_WIDTH:
+            sql = sql[:SQL_WIDTH - 3] + '...'
+        lines.append(f'{statement["total_ms"]:>10.1f}{statement["count"]:>8}'
+                     f'{statement["mean_ms"]:>10.3f}{statement["max_ms"]:>10.2f}  {sql}')
+    return '\n'.join(lines)
+
+
+class ProfileOverlay:
+    def __init__(self, root, profiler=PROFILER):
+        self.root = root
+        self.profiler = profiler
+        self.window = None
+        self._after_id = None
+        self._text = None
+
+    def toggle(self, *args):
+        if not self.profiler.enabled:
+            messagebox.showinfo("Profiling",
+                                f"Profiling is off. Start the app with {PROFILE_ENV}=1 "
+                                f"to record timings.")
+            return
+        if self.window is None or not self.window.winfo_exists():
+            self._build()
+        elif self.window.winfo_viewable():
+            self.hide()
+            return
+        else:
+            self.window.deiconify()
+            self.window.lift()
+        self.refresh()
+
+    def hide(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self.window.withdraw()
+
+    def refresh(self):
+        """Redraw the numbers, and again in REFRESH_MS while shown"""
+        self._after_id = None
+        text = format_snapshot(self.profiler.snapshot(TOP_STATEMENTS))
+        # Redraw only on change, so an idle overlay does no Tk work
+        if text != self._text:
+            self._text = text
+            self.text.config(state=tk.NORMAL)
+            self.text.delete('1.0', tk.END)
+            self.text.insert('1.0', text)
+            self.text.config(state=tk.DISABLED)
+        self._after_id = self.root.after(REFRESH_MS, self.refresh)
+
+    def reset(self):
+        self.profiler.reset()
+        self.refresh_now()
+
+    def refresh_now(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self.refresh()
+
+    def dump(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="Save profile", defaultextension='.json',
+            initialfile=f'taskmanager-profile-{datetime.now():%Y%m%d-%H%M%S}.json',
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.profiler.dump(path)
+        except OSError as e:
+            messagebox.showerror("File Error", f"Failed to save the profile: {str(e)}",
+                                 parent=self.window)
+
+    # ------------------------------------------------------------------
+    # Window
+    # ------------------------------------------------------------------
+    def _build(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Profile")
+        self.window.attributes('-topmost', True)
+        self.window.protocol('WM_DELETE_WINDOW', self.hide)
+        self.window.bind('<F12>', self.toggle)
+
+        container = ttk.Frame(self.window, padding="5")
+        container.pack(fill=tk.BOTH, expand=True)
+        actions = ttk.Frame(container)
+        actions.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(actions, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(actions, text="Dump...", command=self.dump).pack(side=tk.LEFT)
+
+        self.text = tk.Text(container, width=110, height=26, font=('Courier', 9),
+                            wrap=tk.NONE, state=tk.DISABLED)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self._text = None
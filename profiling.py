@@ -0,0 +1,264 @@
+"""Opt-in timing of the hot paths, for "the app is slow" reports.
+
+Profiling is off unless TASKMANAGER_PROFILE is set, and costs nothing
+then: connections are plain sqlite3 connections and spans are no-ops.
+When it is on:
+
+    statements  every SQL statement a TaskStore connection runs, with its
+                call count and the time spent executing it and fetching
+                its rows (sqlite3 only offers a trace callback, which says
+                when a statement starts but not how long it takes, so the
+                cursor calls are timed; the trace callback keeps the log of
+                recent statements, trigger bodies included)
+    actions     latency histograms of UI actions (add, update, delete,
+                search keystroke, stats refresh, list render), measured
+                from the click or keystroke to the result on screen
+
+F12 in the task window shows the live numbers (profile_overlay.py).
+
+    TASKMANAGER_PROFILE=1 python task_manager.py
+    TASKMANAGER_PROFILE=profile.json python task_manager.py   # dumped on exit
+"""
+import bisect
+import json
+import os
+import platform
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+PROFILE_ENV = 'TASKMANAGER_PROFILE'
+# Upper bounds of the histogram buckets, in ms; one more bucket holds the rest
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# Latest samples kept per action for the percentiles
+RECENT_SAMPLES = 1000
+# Statements kept in the trace log
+TRACE_LENGTH = 200
+
+
+class Histogram:
+    """Latency counts in BUCKETS_MS buckets, plus the recent samples"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return 0.0
+        samples = sorted(self.recent)
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def summary(self):
+        labels = [f'<={bound}' for bound in BUCKETS_MS] + [f'>{BUCKETS_MS[-1]}']
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'buckets_ms': {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+
+class StatementStats:
+    __slots__ = ('count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+
+class Span:
+    """One timed action; done() records it"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = time.perf_counter()
+
+    def done(self):
+        self.profiler.record_action(self.name, (time.perf_counter() - self.start) * 1000)
+
+
+class NullSpan:
+    def done(self):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler:
+    def __init__(self, enabled=False, dump_path=None):
+        self.enabled = enabled
+        # File the numbers are written to when the app exits, if any
+        self.dump_path = dump_path
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_env(cls):
+        """Off, on ('1'), or on and dumped to the file the variable names"""
+        value = os.environ.get(PROFILE_ENV, '').strip()
+        if value.lower() in ('', '0', 'no', 'false'):
+            return cls()
+        return cls(True, None if value.lower() in ('1', 'yes', 'true') else value)
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.actions = {}
+            # Keyed by the SQL text as passed in, normalized when reported
+            self.statements = {}
+            self.trace = deque(maxlen=TRACE_LENGTH)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def start(self, name):
+        """Start timing an action; call done() on the result when it finishes"""
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def record_action(self, name, ms):
+        with self._lock:
+            histogram = self.actions.get(name)
+            if histogram is None:
+                histogram = self.actions[name] = Histogram()
+            histogram.add(ms)
+
+    def statement(self, sql):
+        """The StatementStats a cursor adds its timings to"""
+        stats = self.statements.get(sql)
+        if stats is None:
+            with self._lock:
+                stats = self.statements.setdefault(sql, StatementStats())
+        return stats
+
+    def time_statement(self, stats, ms, executed=False):
+        with self._lock:
+            if executed:
+                stats.count += 1
+            stats.total_ms += ms
+            stats.max_ms = max(stats.max_ms, ms)
+
+    def trace_statement(self, sql):
+        """sqlite3 trace callback"""
+        self.trace.append((time.time(), threading.current_thread().name, sql))
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def snapshot(self, statements=None):
+        """The numbers so far as a JSON-serializable dict; statements limits
+        the statement list to the most expensive ones"""
+        with self._lock:
+            actions = {name: histogram.summary() for name, histogram in self.actions.items()}
+            queries = [(' '.join(sql.split()), stats.count, stats.total_ms, stats.max_ms)
+                       for sql, stats in self.statements.items()]
+            trace = list(self.trace)
+        queries.sort(key=lambda query: query[2], reverse=True)
+        return {
+            'meta': {
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'seconds': round(time.time() - self.started, 1),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+            },
+            'actions': actions,
+            'statements': [
+                {'sql': sql, 'count': count, 'total_ms': round(total, 3),
+                 'mean_ms': round(total / count, 3) if count else 0.0,
+                 'max_ms': round(longest, 3)}
+                for sql, count, total, longest in queries[:statements]
+            ],
+            'trace': [
+                {'time': datetime.fromtimestamp(when).isoformat(timespec='milliseconds'),
+                 'thread': thread, 'sql': ' '.join(sql.split())}
+                for when, thread, sql in trace
+            ],
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+            file.write('\n')
+
+
+# ----------------------------------------------------------------------
+# Timed connections
+# ----------------------------------------------------------------------
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that adds the time of each call to its statement's stats"""
+    _stats = None
+
+    def execute(self, sql, parameters=()):
+        stats = self._stats = PROFILER.statement(sql)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            PROFILER.time_statement(stats, (time.perf_counter() - start) * 1000, executed=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        stats = self._stats = PROFILER.statement(sql)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            PROFILER.time_statement(stats, (time.perf_counter() - start) * 1000, executed=True)
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._stats is not None:
+                PROFILER.time_statement(self._stats, (time.perf_counter() - start) * 1000)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        return self._fetch(super().__next__)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose statements all run on ProfiledCursors"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """sqlite3.connect factory for new connections"""
+    return ProfiledConnection if PROFILER.enabled else sqlite3.Connection
+
+
+PROFILER = Profiler.from_env()
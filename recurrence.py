@@ -0,0 +1,131 @@
+"""Repeat rules for recurring tasks.
+
+A rule is stored once, as JSON in tasks.recurrence, and the task's
+due_date is always its current occurrence. Completing the task moves
+due_date on to the next occurrence (or completes it for good once the
+series has ended), so a series is never stored as one row per date.
+
+Occurrences are numbered from the rule's start date and computed
+directly, so occurrences() can start at any date without walking the
+series from the beginning; it is a generator, and only the dates of the
+window asked for are ever produced.
+"""
+import calendar
+import json
+from collections import namedtuple
+from datetime import date, timedelta
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+UNITS = {'daily': ('day', 'days'), 'weekly': ('week', 'weeks'), 'monthly': ('month', 'months')}
+
+# start, until: dates; until and count (occurrences in all) may be None
+Rule = namedtuple('Rule', 'freq interval start until count')
+
+
+def make_rule(freq, interval=1, start=None, until=None, count=None):
+    """A validated Rule; start, until accept dates or ISO strings"""
+    if freq not in FREQUENCIES:
+        raise ValueError(f"repeat must be one of {', '.join(FREQUENCIES)}")
+    interval = int(interval)
+    if interval < 1:
+        raise ValueError("a task cannot repeat more often than every 1 " + UNITS[freq][0])
+    if start is None:
+        raise ValueError("a repeating task needs a due date")
+    start = as_date(start)
+    until = as_date(until) if until else None
+    if until is not None and until < start:
+        raise ValueError("the repeat end date is before the due date")
+    if count is not None:
+        count = int(count)
+        if count < 1:
+            raise ValueError("a task has to repeat at least once")
+    return Rule(freq, interval, start, until, count)
+
+
+def as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def dumps(rule):
+    """The JSON stored in tasks.recurrence, or None for no rule"""
+    if rule is None:
+        return None
+    return json.dumps({'freq': rule.freq, 'interval': rule.interval,
+                       'start': rule.start.isoformat(),
+                       'until': rule.until.isoformat() if rule.until else None,
+                       'count': rule.count}, separators=(',', ':'))
+
+
+def loads(text):
+    if not text:
+        return None
+    data = json.loads(text)
+    return Rule(data['freq'], data['interval'], date.fromisoformat(data['start']),
+                date.fromisoformat(data['until']) if data.get('until') else None,
+                data.get('count'))
+
+
+def describe(rule):
+    """E.g. 'Every 2 weeks, 10 times' or 'Monthly until 2026-12-31'"""
+    if rule.interval == 1:
+        text = rule.freq.capitalize()
+    else:
+        text = f"Every {rule.interval} {UNITS[rule.freq][1]}"
+    if rule.count is not None:
+        text += f", {rule.count} time{'s' if rule.count != 1 else ''}"
+    if rule.until is not None:
+        text += f" until {rule.until.isoformat()}"
+    return text
+
+
+# ----------------------------------------------------------------------
+# Occurrences
+# ----------------------------------------------------------------------
+def add_months(day, months):
+    """day moved by whole months, on the last day of shorter months"""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def nth(rule, n):
+    """Date of occurrence n, counting from 0 at the start date, ignoring
+    until and count"""
+    if rule.freq == 'monthly':
+        return add_months(rule.start, n * rule.interval)
+    step = rule.interval * (7 if rule.freq == 'weekly' else 1)
+    return rule.start + timedelta(days=n * step)
+
+
+def index_before(rule, day):
+    """How many occurrences fall before day (until and count aside)"""
+    if day <= rule.start:
+        return 0
+    if rule.freq == 'monthly':
+        months = (day.year - rule.start.year) * 12 + day.month - rule.start.month
+        n = months // rule.interval
+        # Clamping to the month end can put occurrence n either side of day
+        while n > 0 and nth(rule, n - 1) >= day:
+            n -= 1
+        while nth(rule, n) < day:
+            n += 1
+        return n
+    step = rule.interval * (7 if rule.freq == 'weekly' else 1)
+    return -(-(day - rule.start).days // step)
+
+
+def occurrences(rule, start=None, end=None):
+    """Dates of the occurrences on or after start and before end, lazily;
+    without end, until the series ends (forever if it never does)"""
+    n = index_before(rule, start) if start is not None else 0
+    while rule.count is None or n < rule.count:
+        day = nth(rule, n)
+        if (end is not None and day >= end) or (rule.until is not None and day > rule.until):
+            return
+        yield day
+        n += 1
+
+
+def next_after(rule, day):
+    """The first occurrence after day, or None once the series has ended"""
+    return next(occurrences(rule, day + timedelta(days=1)), None)
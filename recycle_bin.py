@@ -0,0 +1,152 @@
+"""Recycle bin window.
+
+One Toplevel is built on first use and hidden rather than destroyed when
+closed, so reopening it only reloads the rows. deleted_tasks is paged
+through a VirtualTaskList, most recently deleted first, and restore and
+permanent delete act on the whole (extended) selection in one transaction.
+"""
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from virtual_list import VirtualTaskList
+
+COLUMNS = ('Title', 'Description', 'Due Date', 'Priority', 'Status', 'Categories', 'Deleted')
+COLUMN_WIDTHS = (150, 200, 90, 70, 80, 100, 130)
+MAX_RETENTION_DAYS = 3650
+
+
+class RecycleBin:
+    def __init__(self, root, store, worker, on_restored=None, on_error=None):
+        """
+        on_restored() is called after tasks were moved back to the task
+        list; on_error(action) returns an errback for worker jobs.
+        """
+        self.root = root
+        self.store = store
+        self.worker = worker
+        self.on_restored = on_restored
+        self.on_error = on_error
+        self.window = None
+
+    def show(self):
+        if self.window is None or not self.window.winfo_exists():
+            self._build()
+        else:
+            self.window.deiconify()
+            self.window.lift()
+        self.reload()
+
+    def reload(self):
+        """Fetch the first page of the recycle bin and the retention setting"""
+        self.worker.submit(lambda: self.store.deleted_pages().prefetch(),
+                           callback=self._show_rows,
+                           errback=self._error("load the recycle bin"))
+        self.worker.submit(self.store.get_setting, 'retention_days',
+                           callback=self.retention_var.set,
+                           errback=self._error("load the retention setting"))
+
+    def refresh(self):
+        """Reload if the window is open, e.g. after the retention purge"""
+        if self.window is not None and self.window.winfo_exists() and self.window.winfo_viewable():
+            self.reload()
+
+    # ------------------------------------------------------------------
+    # Window
+    # ------------------------------------------------------------------
+    def _build(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Recycle Bin")
+        self.window.geometry("900x450")
+        # Keep the window around for next time
+        self.window.protocol('WM_DELETE_WINDOW', self.window.withdraw)
+
+        container = ttk.Frame(self.window, padding="10")
+        container.pack(fill=tk.BOTH, expand=True)
+
+        # Actions
+        actions = ttk.Frame(container)
+        actions.pack(fill=tk.X, pady=(0, 10))
+        ttk.Button(actions, text="Restore", command=self.restore_selected).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(actions, text="Delete Permanently",
+                   command=self.delete_selected).pack(side=tk.LEFT)
+        self.count_label = ttk.Label(actions, text="")
+        self.count_label.pack(side=tk.LEFT, padx=10)
+
+        # Retention policy
+        self.retention_var = tk.StringVar()
+        ttk.Label(actions, text="days (0 = forever)").pack(side=tk.RIGHT)
+        retention = ttk.Spinbox(actions, from_=0, to=MAX_RETENTION_DAYS, width=5,
+                                textvariable=self.retention_var, command=self.save_retention)
+        retention.pack(side=tk.RIGHT, padx=5)
+        retention.bind('<Return>', lambda event: self.save_retention())
+        retention.bind('<FocusOut>', lambda event: self.save_retention())
+        ttk.Label(actions, text="Keep deleted tasks for").pack(side=tk.RIGHT)
+
+        # Deleted tasks
+        tree_frame = ttk.Frame(container)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(tree_frame, columns=COLUMNS, show='headings',
+                            selectmode='extended', style='Custom.Treeview')
+        for column, width in zip(COLUMNS, COLUMN_WIDTHS):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.list = VirtualTaskList(tree, scrollbar)
+
+    def _show_rows(self, rows):
+        if not self.window.winfo_exists():
+            return
+        self.list.set_rows(rows)
+        self.count_label.config(text=f"{len(rows)} deleted task(s)")
+
+    def _error(self, action):
+        return self.on_error(action) if self.on_error else None
+
+    # ------------------------------------------------------------------
+    # Actions
+    # ------------------------------------------------------------------
+    def restore_selected(self):
+        ids = sorted(self.list.selected_ids)
+        if not ids:
+            messagebox.showwarning("Warning", "Please select tasks to restore!", parent=self.window)
+            return
+
+        def restored(count):
+            self.list.selected_ids.clear()
+            self.reload()
+            if self.on_restored:
+                self.on_restored()
+            messagebox.showinfo("Success", f"♻️ Restored {count} task(s)!", parent=self.window)
+
+        self.worker.submit(self.store.restore_deleted, ids,
+                           callback=restored, errback=self._error("restore tasks"))
+
+    def delete_selected(self):
+        ids = sorted(self.list.selected_ids)
+        if not ids:
+            messagebox.showwarning("Warning", "Please select tasks to delete!", parent=self.window)
+            return
+        if not messagebox.askyesno("Confirm Delete",
+                                   f"Permanently delete {len(ids)} task(s)? This cannot be undone.",
+                                   parent=self.window):
+            return
+
+        def deleted(count):
+            self.list.selected_ids.clear()
+            self.reload()
+
+        self.worker.submit(self.store.delete_permanently, ids,
+                           callback=deleted, errback=self._error("delete tasks"))
+
+    def save_retention(self):
+        try:
+            days = int(self.retention_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Retention must be a number of days!", parent=self.window)
+            return
+        days = max(0, min(MAX_RETENTION_DAYS, days))
+        self.retention_var.set(days)
+        self.worker.submit(self.store.set_setting, 'retention_days', days,
+                           errback=self._error("save the retention setting"))
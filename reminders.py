@@ -0,0 +1,226 @@
+"""Due-date reminders.
+
+Open tasks due today or tomorrow are loaded with one range scan of the
+open-due-date index into a min-heap of (fire time, task) events: "due"
+at the start of the due date and "overdue" at the start of the day after.
+A single root.after sleeps until the earliest event, so nothing runs
+between deadlines. At midnight the window moves on a day and is reloaded.
+
+Edits update the heap incrementally. Changed tasks push new events;
+stale ones (the task was completed, deleted or re-dated) are recognised
+and skipped when they reach the top. Reminders that fall due together are
+shown as one notification, on the desktop where a notifier command
+exists and as a small in-app popup otherwise.
+"""
+import heapq
+import itertools
+import shutil
+import subprocess
+import sys
+import time
+import tkinter as tk
+from datetime import date, datetime, timedelta
+from tkinter import ttk
+
+# Days of due dates held in the heap, starting today
+HORIZON_DAYS = 2
+# Longest single sleep, so a suspended machine or a clock change is
+# noticed within this time
+MAX_SLEEP_MS = 15 * 60 * 1000
+# Titles listed in one notification
+MAX_TITLES = 5
+TOAST_MS = 8000
+
+DUE = 'due'
+OVERDUE = 'overdue'
+RELOAD = 'reload'
+
+
+def day_start(day):
+    """Unix time of local midnight at the start of day"""
+    return datetime.combine(day, datetime.min.time()).timestamp()
+
+
+def describe(kind, titles):
+    heading = "Due today" if kind == DUE else "Overdue"
+    text = ', '.join(titles[:MAX_TITLES])
+    if len(titles) > MAX_TITLES:
+        text += f" and {len(titles) - MAX_TITLES} more"
+    return f"{heading} ({len(titles)})", text
+
+
+def desktop_notify(title, message):
+    """Show a desktop notification if this platform has a notifier command;
+    returns False if not"""
+    if sys.platform == 'darwin' and shutil.which('osascript'):
+        # Passed as arguments, so quotes in titles need no escaping
+        command = ['osascript', '-e', 'on run argv',
+                   '-e', 'display notification (item 2 of argv) with title (item 1 of argv)',
+                   '-e', 'end run', title, message]
+    elif shutil.which('notify-send'):
+        command = ['notify-send', '--app-name=Task Manager', title, message]
+    else:
+        return False
+    try:
+        subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return True
+
+
+def show_toast(root, title, message, duration_ms=TOAST_MS):
+    """A small borderless popup in the corner of root; click to dismiss"""
+    toast = tk.Toplevel(root)
+    toast.overrideredirect(True)
+    toast.attributes('-topmost', True)
+    frame = ttk.Frame(toast, padding=10, relief=tk.SOLID, borderwidth=1)
+    frame.pack()
+    ttk.Label(frame, text=title, font=('Segoe UI', 11, 'bold')).pack(anchor=tk.W)
+    ttk.Label(frame, text=message, wraplength=300).pack(anchor=tk.W)
+    toast.update_idletasks()
+    x = root.winfo_rootx() + root.winfo_width() - toast.winfo_reqwidth() - 20
+    y = root.winfo_rooty() + root.winfo_height() - toast.winfo_reqheight() - 20
+    toast.geometry(f'+{max(x, 0)}+{max(y, 0)}')
+    for widget in (toast, frame, *frame.winfo_children()):
+        widget.bind('<Button-1>', lambda event: toast.destroy())
+    toast.after(duration_ms, toast.destroy)
+    root.bell()
+
+
+class ReminderScheduler:
+    def __init__(self, root, store, worker, notify=None, on_error=None):
+        """
+        notify(title, message) shows a reminder; by default on the
+        desktop, falling back to an in-app popup. on_error(action)
+        returns an errback for worker jobs.
+        """
+        self.root = root
+        self.store = store
+        self.worker = worker
+        self.notify = notify or self.default_notify
+        self.on_error = on_error
+        self._heap = []
+        self._sequence = itertools.count()
+        # task id -> [due_date, title] of the tasks the heap is for; events
+        # for any other due date are stale
+        self._tasks = {}
+        # (task id, due_date, kind) already shown, so a reload does not repeat them
+        self._shown = set()
+        self._today = None
+        self._horizon = None
+        self._after_id = None
+        self._loaded_once = False
+
+    def default_notify(self, title, message):
+        if not desktop_notify(title, message):
+            show_toast(self.root, title, message)
+
+    def reload(self):
+        """Rebuild the heap from the database, e.g. after an import"""
+        self.worker.submit(self._load, date.today(), callback=self._loaded,
+                           errback=self.on_error("load reminders") if self.on_error else None)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def task_changed(self, task):
+        """Update reminders for an added or edited task row"""
+        task_id, title, due_date, status = task[0], task[1], task[3], task[5]
+        if self._today is None:
+            return  # not loaded yet; the load will include it
+        in_window = (status != 'Complete' and due_date
+                     and self._today.isoformat() <= due_date < self._horizon.isoformat())
+        if not in_window:
+            # Its events go stale
+            self._tasks.pop(task_id, None)
+            return
+        current = self._tasks.get(task_id)
+        if current is not None and current[0] == due_date:
+            current[1] = title
+            return
+        self._add(task_id, title, due_date)
+        self._schedule()
+
+    def tasks_removed(self, task_ids):
+        for task_id in task_ids:
+            self._tasks.pop(task_id, None)
+
+    # ------------------------------------------------------------------
+    # Heap
+    # ------------------------------------------------------------------
+    def _load(self, today):
+        """Worker thread: the window's tasks, and on first load the overdue count"""
+        overdue = 0 if self._loaded_once else self.store.count_overdue(today.isoformat())
+        rows = self.store.open_due_between(today.isoformat(),
+                                           (today + timedelta(days=HORIZON_DAYS)).isoformat())
+        return today, overdue, rows
+
+    def _loaded(self, result):
+        today, overdue, rows = result
+        self._loaded_once = True
+        self._today = today
+        self._horizon = today + timedelta(days=HORIZON_DAYS)
+        self._heap = []
+        self._tasks = {}
+        yesterday = (today - timedelta(days=1)).isoformat()
+        self._shown = {key for key in self._shown if key[1] >= yesterday}
+        for task_id, title, due_date in rows:
+            self._add(task_id, title, due_date)
+        # Move the window on at midnight
+        self._push(day_start(today + timedelta(days=1)), RELOAD, None, None)
+        if overdue:
+            self.notify(f"Overdue ({overdue})",
+                        f"{overdue} open task{'s are' if overdue != 1 else ' is'} past due")
+        self._schedule()
+
+    def _add(self, task_id, title, due_date):
+        try:
+            due = date.fromisoformat(due_date)
+        except ValueError:
+            return
+        self._tasks[task_id] = [due_date, title]
+        for kind, fire_at in ((DUE, day_start(due)), (OVERDUE, day_start(due + timedelta(days=1)))):
+            if (task_id, due_date, kind) not in self._shown:
+                self._push(fire_at, kind, task_id, due_date)
+
+    def _push(self, fire_at, kind, task_id, due_date):
+        heapq.heappush(self._heap, (fire_at, next(self._sequence), kind, task_id, due_date))
+
+    def _schedule(self):
+        """One timer, for the earliest event"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if not self._heap:
+            return
+        delay_ms = int((self._heap[0][0] - time.time()) * 1000)
+        self._after_id = self.root.after(max(0, min(delay_ms, MAX_SLEEP_MS)), self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        now = time.time()
+        due = {DUE: [], OVERDUE: []}
+        reload = False
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, kind, task_id, due_date = heapq.heappop(self._heap)
+            if kind == RELOAD:
+                reload = True
+                continue
+            current = self._tasks.get(task_id)
+            key = (task_id, due_date, kind)
+            if current is None or current[0] != due_date or key in self._shown:
+                continue  # stale
+            self._shown.add(key)
+            due[kind].append(current[1])
+        for kind, titles in due.items():
+            if titles:
+                self.notify(*describe(kind, titles))
+        if reload:
+            self.reload()
+        else:
+            self._schedule()
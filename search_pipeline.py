@@ -0,0 +1,145 @@
+"""Search-as-you-type pipeline between the search box and the task store.
+
+Keystrokes are debounced through root.after so a fast typist triggers one
+query instead of one per character. Queries run on the DB worker thread
+when one is given; results that arrive after a newer search has started
+are dropped, and when the new term only extends the previous one the
+earlier result set is narrowed in memory.
+"""
+import logging
+
+from profiling import PROFILER
+
+SEARCH_DEBOUNCE_MS = 150
+# Larger result sets are cheaper to re-query through the index than to
+# filter in Python
+NARROW_LIMIT = 5000
+
+log = logging.getLogger(__name__)
+
+
+class SearchPipeline:
+    def __init__(self, root, search, render, matches, delay_ms=SEARCH_DEBOUNCE_MS,
+                 worker=None, on_error=None):
+        """
+        search(term) returns the rows for a term, render(rows) displays
+        them and matches(row, term) tells whether a row belongs to the
+        results for term. With a db_worker.DBWorker, search runs on its
+        thread and on_error(exception) reports a search that failed there.
+        """
+        self.root = root
+        self.worker = worker
+        self.search = search
+        self.render = render
+        self.matches = matches
+        self.delay_ms = delay_ms
+        self.on_error = on_error
+
+        self._after_id = None
+        self._pending_term = None
+        self._generation = 0
+        self._last_term = None
+        self._last_rows = None
+        # profiling spans of the keystrokes not yet answered on screen
+        self._keystrokes = []
+
+        self.stats = {
+            'keystrokes': 0,   # terms submitted
+            'skipped': 0,      # refreshes replaced before they ran
+            'stale': 0,        # results dropped because a newer search started
+            'unchanged': 0,    # refreshes skipped because the term did not change
+            'narrowed': 0,     # refreshes served from the previous results
+            'queries': 0,      # refreshes that went to the database
+        }
+
+    def submit(self, term):
+        """Schedule a refresh for term, replacing any refresh still waiting"""
+        self.stats['keystrokes'] += 1
+        if PROFILER.enabled:
+            self._keystrokes.append(PROFILER.start('search keystroke'))
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self.stats['skipped'] += 1
+        self._generation += 1
+        self._pending_term = term
+        self._after_id = self.root.after(self.delay_ms, self._run, self._generation)
+
+    def flush(self):
+        """Run a waiting refresh right away"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._run(self._generation)
+
+    def invalidate(self):
+        """Forget cached results, e.g. after tasks were added or changed"""
+        self._last_term = None
+        self._last_rows = None
+
+    def _run(self, generation):
+        self._after_id = None
+        term = self._pending_term
+
+        if term == self._last_term:
+            self.stats['unchanged'] += 1
+            self._answered()
+            return
+
+        rows = self._narrow(term)
+        if rows is not None:
+            self.deliver(generation, term, rows)
+            return
+
+        self.stats['queries'] += 1
+        if self.worker is None:
+            self.deliver(generation, term, self.query(term))
+        else:
+            self.worker.submit(self.query, term,
+                               callback=lambda rows: self.deliver(generation, term, rows),
+                               errback=lambda error: self.failed(generation, error))
+
+    def query(self, term):
+        """Run search(term); small results are loaded whole so they can be narrowed"""
+        rows = self.search(term)
+        if len(rows) <= NARROW_LIMIT:
+            return list(rows)
+        # Fetch the first page here rather than while rendering
+        return rows.prefetch()
+
+    def deliver(self, generation, term, rows):
+        """Render results unless a newer search has been started since"""
+        if generation != self._generation:
+            self.stats['stale'] += 1
+            return
+        self._last_term = term
+        self._last_rows = rows
+        self.render(rows)
+        self._answered()
+        log.debug('search %r: %d rows, stats %s', term, len(rows), self.stats)
+
+    def failed(self, generation, error):
+        """A search on the worker raised: forget the previous results so the
+        next keystroke queries again, and report it unless it is stale"""
+        self.invalidate()
+        if generation != self._generation:
+            self.stats['stale'] += 1
+            return
+        self._answered()
+        if self.on_error is None:
+            log.error('search failed: %s', error)
+        else:
+            self.on_error(error)
+
+    def _answered(self):
+        """The list now shows the results for every keystroke so far"""
+        for span in self._keystrokes:
+            span.done()
+        self._keystrokes = []
+
+    def _narrow(self, term):
+        """Filter the previous results if term only extends the previous term"""
+        last = self._last_term
+        if (not isinstance(self._last_rows, list) or not last or not last.strip()
+                or not term.startswith(last) or len(self._last_rows) > NARROW_LIMIT):
+            return None
+        self.stats['narrowed'] += 1
+        return [row for row in self._last_rows if self.matches(row, term)]
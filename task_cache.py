@@ -0,0 +1,152 @@
+"""In-process copy of the tasks table, kept current by write-through.
+
+TaskStore loads every task once (in batches, on the worker thread) into
+TaskRecords keyed by id, with secondary indexes by status, by priority
+and by due date of the open tasks. From then on each committed write
+made through the store is applied here as well, so reading tasks back
+by id and the statistics panel counts are dictionary lookups instead of
+SQL.
+
+Records are tuples with named fields and no instance dict, so they stand
+in anywhere a row from task_store.TASK_SELECT can (the virtual list,
+matches(), Treeview values). The few distinct priority, status, due date
+and categories strings are shared between records rather than held once
+per task.
+
+Searching and the category filter stay on the FTS5 and task_categories
+indexes: a Python scan of a million records takes about a second where
+the index answers in milliseconds.
+"""
+import threading
+from collections import namedtuple
+
+# A task row, as returned by TASK_SELECT; namedtuple classes have
+# __slots__ = (), so a record costs what the tuple costs
+TaskRecord = namedtuple('TaskRecord',
+                        ('id', 'title', 'description', 'due_date', 'priority', 'status',
+                         'categories'))
+
+COMPLETE = 'Complete'
+
+
+def is_open(record):
+    """Counted by the due date statistics; matches status != 'Complete' in SQL"""
+    return record.status is not None and record.status != COMPLETE
+
+
+class TaskCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.tasks = {}           # id -> TaskRecord
+            self.by_status = {}       # status -> set of ids
+            self.by_priority = {}     # priority -> set of ids
+            self.open_by_due = {}     # due date -> set of ids of open tasks
+            self._shared = {}
+            # Set once every task has been loaded; until then readers use SQL
+            self.loaded = False
+
+    def __len__(self):
+        return len(self.tasks)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def add_rows(self, rows):
+        """Add or replace tasks from TASK_SELECT rows"""
+        with self._lock:
+            for row in rows:
+                self._put(self._record(row))
+
+    def update(self, ids, fields):
+        """Set the same fields on the cached tasks with these ids"""
+        with self._lock:
+            for task_id in ids:
+                record = self.tasks.get(task_id)
+                if record is not None:
+                    self._put(self._record(record._replace(**fields)))
+
+    def remove(self, ids):
+        with self._lock:
+            for task_id in ids:
+                record = self.tasks.pop(task_id, None)
+                if record is not None:
+                    self._unindex(record)
+
+    def remove_status(self, status):
+        """Drop every task with a status, e.g. after clearing completed tasks"""
+        with self._lock:
+            for task_id in list(self.by_status.get(status, ())):
+                self._unindex(self.tasks.pop(task_id))
+
+    def _record(self, row):
+        shared = self._shared.setdefault
+        task_id, title, description, due_date, priority, status, categories = row
+        # Titles and descriptions are mostly unique; only empty descriptions are shared
+        return TaskRecord(task_id, title,
+                          shared(description, description) if not description else description,
+                          shared(due_date, due_date), shared(priority, priority),
+                          shared(status, status), shared(categories, categories))
+
+    def _put(self, record):
+        old = self.tasks.get(record.id)
+        if old is not None:
+            self._unindex(old)
+        self.tasks[record.id] = record
+        self.by_status.setdefault(record.status, set()).add(record.id)
+        self.by_priority.setdefault(record.priority, set()).add(record.id)
+        if record.due_date is not None and is_open(record):
+            self.open_by_due.setdefault(record.due_date, set()).add(record.id)
+
+    def _unindex(self, record):
+        for index, key in ((self.by_status, record.status),
+                           (self.by_priority, record.priority),
+                           (self.open_by_due, record.due_date)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(record.id)
+                if not ids:
+                    del index[key]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get(self, task_id):
+        return self.tasks.get(task_id)
+
+    def get_many(self, ids):
+        """Cached tasks with these ids, in id order"""
+        tasks = self.tasks
+        return [tasks[task_id] for task_id in sorted(set(ids)) if task_id in tasks]
+
+    def all(self):
+        with self._lock:
+            return [self.tasks[task_id] for task_id in sorted(self.tasks)]
+
+    def count(self, status=None, priority=None):
+        """Number of tasks, or of those with a status and/or priority"""
+        with self._lock:
+            if status is None and priority is None:
+                return len(self.tasks)
+            if priority is None:
+                return len(self.by_status.get(status, ()))
+            if status is None:
+                return len(self.by_priority.get(priority, ()))
+            return len(self.by_status.get(status, set()) & self.by_priority.get(priority, set()))
+
+    def due_counts(self, today, tomorrow, week_end):
+        """(overdue, due today, due before week_end) counts of open tasks;
+        the arguments are ISO dates, compared as text like in SQL"""
+        overdue = due_today = due_week = 0
+        with self._lock:
+            for due_date, ids in self.open_by_due.items():
+                if due_date < today:
+                    overdue += len(ids)
+                elif due_date < week_end:
+                    due_week += len(ids)
+                    if due_date < tomorrow:
+                        due_today += len(ids)
+        return overdue, due_today, due_week
@@ -0,0 +1,327 @@
+"""Command-line interface to tasks.db, for scripts, cron jobs and servers.
+
+Uses the same TaskStore as the window but never imports tkinter,
+tkcalendar or smtplib, so it starts quickly and runs without a display.
+
+    python task_cli.py add "Pay rent" --due 2024-07-01 --priority High --repeat monthly
+    python task_cli.py list --status Pending
+    python task_cli.py search rent --json
+    python task_cli.py update 12 --status Complete
+    python task_cli.py delete 12
+    python task_cli.py list --category work
+    python task_cli.py categories
+    python task_cli.py stats
+    python task_cli.py agenda --days 14
+    python task_cli.py purge --completed
+    python task_cli.py purge --expired
+    python task_cli.py export tasks.csv
+    python task_cli.py serve --port 8080
+
+Lists are printed as tab-separated id, title, due date, priority, status
+and categories, or as one JSON object per line with --json.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+import recurrence
+import task_io
+from task_store import (DB_PATH, PRIORITIES, STATUSES, TASK_COLUMNS, DuplicateTitleError,
+                        TaskStore, iso_date)
+
+
+# Labels of the statistics panel
+STAT_LABELS = {
+    'total': "Total Tasks",
+    'completed': "Completed",
+    'pending': "Pending",
+    'due_today': "Due Today",
+    'due_week': "Due This Week",
+    'overdue': "Overdue",
+}
+
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates; an empty string clears the date"""
+    if value == '':
+        return ''
+    try:
+        return iso_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def print_tasks(tasks, as_json=False):
+    for task in tasks:
+        if as_json:
+            print(json.dumps(dict(zip(('id',) + TASK_COLUMNS, task)), ensure_ascii=False))
+        else:
+            task_id, title, description, due_date, priority, status, categories = task
+            print('\t'.join(str(value or '') for value in
+                            (task_id, title, due_date, priority, status, categories)))
+
+
+def repeat_rule(args, due_date, current=None):
+    """The recurrence.Rule the --repeat options ask for, given the task's
+    due date and current rule (kept when no option changes it); raises
+    ValueError for impossible rules"""
+    if args.repeat == 'none':
+        return None
+    changed = (args.repeat, args.every, args.until, args.times) != (None,) * 4
+    if not changed:
+        return current
+    if args.repeat is None and current is None:
+        raise ValueError("--every, --until and --times need --repeat")
+    freq = args.repeat or current.freq
+    if current is not None and (freq != current.freq or due_date != current.start.isoformat()):
+        # Count occurrences from the current one
+        current = current._replace(start=due_date, count=None)
+    interval = args.every if args.every is not None else (current.interval if current else 1)
+    until = args.until if args.until is not None else (current.until if current else None)
+    count = args.times if args.times is not None else (current.count if current else None)
+    start = (current.start if current else due_date) or None
+    return recurrence.make_rule(freq, interval, start, until or None, count)
+
+
+def fail(message):
+    print(f"error: {message}", file=sys.stderr)
+    return 1
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+def cmd_add(store, args):
+    try:
+        rule = repeat_rule(args, args.due_date)
+        task_id = store.add_task(args.title, args.description, args.due_date,
+                                 args.priority, args.status, args.categories, rule)
+    except DuplicateTitleError:
+        return fail(f"a task titled {args.title!r} already exists")
+    except ValueError as error:
+        return fail(error)
+    print(task_id)
+    return 0
+
+
+def cmd_list(store, args):
+    tasks = store.iter_tasks(args.status, args.category)
+    if args.limit is not None:
+        tasks = islice(tasks, args.limit)
+    print_tasks(tasks, args.json)
+    return 0
+
+
+def cmd_search(store, args):
+    print_tasks(store.search_tasks(args.term, args.limit, category=args.category), args.json)
+    return 0
+
+
+def cmd_categories(store, args):
+    for name, count in store.category_counts():
+        print(f"{name}\t{count}")
+    return 0
+
+
+def cmd_update(store, args):
+    task = store.get_task(args.id)
+    if task is None:
+        return fail(f"no task with id {args.id}")
+    fields = dict(zip(TASK_COLUMNS, task[1:]))
+    for name in TASK_COLUMNS:
+        value = getattr(args, name)
+        if value is not None:
+            fields[name] = value
+    try:
+        current = store.get_rule(args.id)
+        rule = repeat_rule(args, fields['due_date'], current)
+        with store.transaction():
+            if rule != current:
+                store.set_rule(args.id, rule)
+            store.update_task(args.id, *(fields[name] for name in TASK_COLUMNS))
+    except DuplicateTitleError:
+        return fail(f"a task titled {fields['title']!r} already exists")
+    except ValueError as error:
+        return fail(error)
+    return 0
+
+
+def cmd_delete(store, args):
+    missing = [task_id for task_id in args.ids if store.get_task(task_id) is None]
+    if missing:
+        return fail(f"no task with id {', '.join(map(str, missing))}")
+    store.delete_tasks(args.ids)
+    return 0
+
+
+def cmd_stats(store, args):
+    stats = store.statistics(args.date or date.today().isoformat())
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        for name, value in stats.items():
+            print(f"{STAT_LABELS[name]}: {value}")
+    return 0
+
+
+def cmd_agenda(store, args):
+    start = date.fromisoformat(args.start or date.today().isoformat())
+    end = start + timedelta(days=args.days)
+    entries = sorted([(due_date, task_id, title) for task_id, title, due_date
+                      in store.open_due_between(start.isoformat(), end.isoformat())] +
+                     [(due_date, task_id, title) for task_id, title, due_date
+                      in store.recurring_occurrences(start, end)])
+    for due_date, task_id, title in entries:
+        print(f"{due_date}\t{task_id}\t{title}")
+    return 0
+
+
+def cmd_purge(store, args):
+    if not (args.completed or args.deleted or args.expired):
+        return fail("nothing to purge, give --completed, --deleted or --expired")
+    if args.completed:
+        count = store.clear_completed()
+        print(f"{count} completed task(s) cleared", file=sys.stderr)
+    if args.deleted:
+        before = None
+        if args.older_than is not None:
+            cutoff = datetime.now() - timedelta(days=args.older_than)
+            before = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+        count = store.purge_deleted(before)
+        print(f"{count} recycle bin entr{'y' if count == 1 else 'ies'} removed", file=sys.stderr)
+    if args.expired:
+        count = store.purge_expired(limit=None)
+        print(f"{count} expired recycle bin entr{'y' if count == 1 else 'ies'} removed",
+              file=sys.stderr)
+    return 0
+
+
+def cmd_serve(store, args):
+    # asyncio is only imported when serving
+    import task_server
+    return task_server.serve(store, args.host, args.port, args.readers)
+
+
+# ----------------------------------------------------------------------
+# Argument parsing
+# ----------------------------------------------------------------------
+def add_task_fields(parser, defaults):
+    """Task field options; with defaults=False every field is optional and unset"""
+    parser.add_argument('-d', '--description', dest='description',
+                        default='' if defaults else None)
+    parser.add_argument('--due', dest='due_date', type=parse_date,
+                        help="due date as YYYY-MM-DD ('' clears it)")
+    parser.add_argument('-p', '--priority', dest='priority', choices=PRIORITIES,
+                        default='Medium' if defaults else None)
+    parser.add_argument('-s', '--status', dest='status', choices=STATUSES,
+                        default='Pending' if defaults else None)
+    parser.add_argument('-c', '--categories', dest='categories',
+                        default='' if defaults else None,
+                        help="comma-separated categories")
+    parser.add_argument('--repeat', choices=recurrence.FREQUENCIES + ('none',),
+                        help="repeat from the due date; completing moves the task on "
+                             "to the next date")
+    parser.add_argument('--every', type=int, metavar='N',
+                        help="with --repeat, every N days, weeks or months (default 1)")
+    parser.add_argument('--until', type=parse_date, metavar='DATE',
+                        help="with --repeat, no occurrences after DATE ('' clears it)")
+    parser.add_argument('--times', type=int, metavar='N',
+                        help="with --repeat, N occurrences in all")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='taskmanager', description="Manage tasks in tasks.db")
+    parser.add_argument('--db', default=os.environ.get('TASKMANAGER_DB', DB_PATH),
+                        help="database file (default: $TASKMANAGER_DB or tasks.db)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="add a task and print its id")
+    add.add_argument('title')
+    add_task_fields(add, defaults=True)
+    add.set_defaults(run=cmd_add)
+
+    list_ = commands.add_parser('list', help="list tasks in id order")
+    list_.add_argument('-s', '--status', choices=STATUSES)
+    list_.add_argument('-c', '--category', help="only tasks in this category")
+    list_.add_argument('-n', '--limit', type=int)
+    list_.add_argument('--json', action='store_true', help="one JSON object per line")
+    list_.set_defaults(run=cmd_list)
+
+    search = commands.add_parser('search', help="full-text search, best matches first")
+    search.add_argument('term')
+    search.add_argument('-n', '--limit', type=int)
+    search.add_argument('-c', '--category', help="only tasks in this category")
+    search.add_argument('--json', action='store_true', help="one JSON object per line")
+    search.set_defaults(run=cmd_search)
+
+    update = commands.add_parser('update', help="change some fields of a task")
+    update.add_argument('id', type=int)
+    update.add_argument('-t', '--title', dest='title')
+    add_task_fields(update, defaults=False)
+    update.set_defaults(run=cmd_update)
+
+    delete = commands.add_parser('delete', help="move tasks to the recycle bin")
+    delete.add_argument('ids', type=int, nargs='+', metavar='id')
+    delete.set_defaults(run=cmd_delete)
+
+    categories = commands.add_parser('categories', help="list categories with task counts")
+    categories.set_defaults(run=cmd_categories)
+
+    stats = commands.add_parser('stats', help="print the statistics panel counts")
+    stats.add_argument('--date', type=parse_date, help="count as of this date (default: today)")
+    stats.add_argument('--json', action='store_true')
+    stats.set_defaults(run=cmd_stats)
+
+    agenda = commands.add_parser('agenda', help="open tasks due in the coming days, "
+                                                "with each occurrence of repeating tasks")
+    agenda.add_argument('--from', dest='start', type=parse_date, help="first day (default: today)")
+    agenda.add_argument('--days', type=int, default=7)
+    agenda.set_defaults(run=cmd_agenda)
+
+    purge = commands.add_parser('purge', help="clear completed tasks or empty the recycle bin")
+    purge.add_argument('--completed', action='store_true', help="clear completed tasks")
+    purge.add_argument('--deleted', action='store_true', help="empty the recycle bin")
+    purge.add_argument('--older-than', type=int, metavar='DAYS',
+                       help="with --deleted, only entries deleted more than DAYS days ago")
+    purge.add_argument('--expired', action='store_true',
+                       help="apply the recycle bin retention setting (default 30 days)")
+    purge.set_defaults(run=cmd_purge)
+
+    import_ = commands.add_parser('import', help="add tasks from a CSV or NDJSON file")
+    task_io.add_arguments(import_)
+    import_.add_argument('--batch-size', type=int, default=task_io.BATCH_SIZE)
+    import_.set_defaults(run=task_io.run_import)
+
+    export = commands.add_parser('export', help="write all tasks to a CSV or NDJSON file")
+    task_io.add_arguments(export)
+    export.set_defaults(run=task_io.run_export)
+
+    serve = commands.add_parser('serve', help="serve tasks over an HTTP/JSON API (see task_server.py)")
+    serve.add_argument('--host', default='127.0.0.1',
+                       help="address to listen on (default: %(default)s, this machine only)")
+    serve.add_argument('--port', type=int, default=8080, help="0 picks a free port")
+    serve.add_argument('--readers', type=int, default=4,
+                       help="threads answering reads, each with its own connection")
+    serve.set_defaults(run=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = TaskStore(args.db)
+    try:
+        return args.run(store, args)
+    except BrokenPipeError:
+        # Output piped into e.g. head; silence the error on interpreter exit
+        sys.stdout = open(os.devnull, 'w')
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
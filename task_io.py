@@ -0,0 +1,252 @@
+"""Bulk import and export of tasks as CSV or NDJSON (JSON Lines).
+
+Rows are streamed end to end: files are read through generators, inserted
+in executemany batches inside a single transaction, and exported straight
+from the database cursor, so memory use does not grow with the file size.
+Titles are deduplicated by the unique title index (INSERT OR IGNORE), both
+against existing tasks and within the file.
+
+    python task_io.py import tasks.csv
+    python task_io.py export tasks.ndjson --db tasks.db
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from task_store import DB_PATH, PRIORITIES, STATUSES, TASK_COLUMNS, TaskStore, iso_date
+
+FORMATS = ('csv', 'ndjson')
+BATCH_SIZE = 1000
+# Number of rejected rows whose reason is kept for the report
+MAX_ERRORS = 20
+# Statuses written by older versions, and the status each one stands for
+LEGACY_STATUSES = {'Incomplete': 'Pending'}
+
+
+def detect_format(path, format=None):
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    return 'csv'
+
+
+def _open(path, mode):
+    """Open a file, with '-' meaning stdin/stdout"""
+    if path == '-':
+        return (sys.stdin if 'r' in mode else sys.stdout), False
+    return open(path, mode, newline='', encoding='utf-8'), True
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+def read_csv(file):
+    """Yield one dict per CSV row, with headers like 'Due Date' read as 'due_date'"""
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    keys = [name.strip().lower().replace(' ', '_') for name in header]
+    for row in reader:
+        yield dict(zip(keys, row))
+
+
+def read_ndjson(file):
+    """Yield one dict per non-empty line"""
+    for number, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"line {number}: {e}")
+            continue
+        yield record if isinstance(record, dict) else ValueError(f"line {number}: not an object")
+
+
+def validate(records, report):
+    """Yield task tuples in TASK_COLUMNS order, counting rejected records in report"""
+    for number, record in enumerate(records, start=1):
+        report['read'] += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            yield task_values(record)
+        except ValueError as e:
+            report['invalid'] += 1
+            if len(report['errors']) < MAX_ERRORS:
+                report['errors'].append(f"record {number}: {e}")
+
+
+def task_values(record):
+    title = str(record.get('title') or '').strip()
+    if not title:
+        raise ValueError("title is required")
+    priority = str(record.get('priority') or 'Medium').strip()
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}, not {priority!r}")
+    status = str(record.get('status') or 'Pending').strip()
+    status = LEGACY_STATUSES.get(status, status)
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}, not {status!r}")
+    categories = record.get('categories') or ''
+    if isinstance(categories, (list, tuple)):
+        categories = ', '.join(str(c) for c in categories)
+    return (
+        title,
+        str(record.get('description') or ''),
+        iso_date(record.get('due_date')),
+        priority,
+        status,
+        str(categories).strip(),
+    )
+
+
+# ----------------------------------------------------------------------
+# Import / export
+# ----------------------------------------------------------------------
+def new_report():
+    return {'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0,
+            'errors': [], 'seconds': 0.0, 'rows_per_second': 0.0}
+
+
+def import_tasks(store, path, format=None, batch_size=BATCH_SIZE, progress=None):
+    """Import tasks from a CSV or NDJSON file in one transaction.
+
+    progress(report) is called after every batch. Returns the final
+    report with read/inserted/duplicates/invalid counts and throughput.
+    """
+    format = detect_format(path, format)
+    report = new_report()
+    start = time.perf_counter()
+
+    def update_rate():
+        report['seconds'] = time.perf_counter() - start
+        if report['seconds']:
+            report['rows_per_second'] = report['read'] / report['seconds']
+
+    file, close = _open(path, 'r')
+    try:
+        records = read_csv(file) if format == 'csv' else read_ndjson(file)
+        rows = validate(records, report)
+        columns = ', '.join(TASK_COLUMNS)
+        with store.transaction() as cursor:
+            last_id = store.last_task_id()
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                # The unique title index drops duplicates, in the file or already stored
+                cursor.executemany(f'''
+                    INSERT OR IGNORE INTO tasks ({columns}) VALUES (?, ?, ?, ?, ?, ?)
+                ''', batch)
+                report['inserted'] += cursor.rowcount
+                report['duplicates'] += len(batch) - cursor.rowcount
+                update_rate()
+                if progress:
+                    progress(dict(report))
+            store.tasks_added_after(last_id)
+    finally:
+        if close:
+            file.close()
+
+    update_rate()
+    return report
+
+
+def export_tasks(store, path, format=None, progress=None, progress_every=10000):
+    """Write every task to a CSV or NDJSON file and return the number written"""
+    format = detect_format(path, format)
+    count = 0
+    file, close = _open(path, 'w')
+    try:
+        if format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(TASK_COLUMNS)
+        for task in store.iter_tasks():
+            if task[5] in LEGACY_STATUSES:
+                # Written as the import reads it back
+                task = task[:5] + (LEGACY_STATUSES[task[5]],) + task[6:]
+            if format == 'csv':
+                writer.writerow(task[1:])
+            else:
+                file.write(json.dumps(dict(zip(TASK_COLUMNS, task[1:])), ensure_ascii=False) + '\n')
+            count += 1
+            if progress and count % progress_every == 0:
+                progress(count)
+    finally:
+        if close:
+            file.close()
+    return count
+
+
+def format_report(report):
+    text = (f"{report['inserted']} imported, {report['duplicates']} duplicate titles skipped, "
+            f"{report['invalid']} invalid "
+            f"({report['read']} rows in {report['seconds']:.1f}s, "
+            f"{report['rows_per_second']:.0f} rows/s)")
+    for error in report['errors']:
+        text += f"\n  {error}"
+    return text
+
+
+# ----------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------
+def add_arguments(parser):
+    """Arguments shared with the taskmanager command line"""
+    parser.add_argument('file', help="file to read or write, '-' for stdin/stdout")
+    parser.add_argument('--format', choices=FORMATS,
+                        help="file format (default: from the file extension)")
+
+
+def run_import(store, args):
+    def progress(report):
+        print(f"\r{report['read']} rows, {report['rows_per_second']:.0f} rows/s",
+              end='', file=sys.stderr, flush=True)
+
+    report = import_tasks(store, args.file, args.format, args.batch_size, progress)
+    print(file=sys.stderr)
+    print(format_report(report), file=sys.stderr)
+    return 1 if report['invalid'] else 0
+
+
+def run_export(store, args):
+    start = time.perf_counter()
+    count = export_tasks(store, args.file, args.format)
+    seconds = time.perf_counter() - start
+    print(f"{count} tasks exported in {seconds:.1f}s", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export tasks as CSV or NDJSON")
+    parser.add_argument('--db', default=DB_PATH, help="database file (default: tasks.db)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="add tasks from a file")
+    add_arguments(import_parser)
+    import_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    import_parser.set_defaults(run=run_import)
+
+    export_parser = commands.add_parser('export', help="write all tasks to a file")
+    add_arguments(export_parser)
+    export_parser.set_defaults(run=run_export)
+
+    args = parser.parse_args(argv)
+    store = TaskStore(args.db)
+    try:
+        return args.run(store, args)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
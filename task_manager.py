@@ -1,20 +1,87 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from tkcalendar import DateEntry
 import sqlite3
+import time
+import gc
 from datetime import datetime
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import queue
+import recurrence
+from task_store import (TaskStore, DuplicateTitleError, JournalConflictError, PRIORITIES, STATUSES,
+                        PURGE_BATCH_SIZE, iso_date)
+from search_pipeline import SearchPipeline
+from virtual_list import VirtualTaskList
+from task_stats import TaskStatistics
+from db_worker import DBWorker
+from recycle_bin import RecycleBin
+from reminders import ReminderScheduler
+from profiling import PROFILER
+from profile_overlay import ProfileOverlay
+# tkcalendar, smtplib/email, filedialog and task_io are imported where they
+# are used, so they stay off the path to the first window
+
+# Recycle bin retention purge: pause between batches, and between runs
+PURGE_PAUSE_MS = 50
+PURGE_INTERVAL_MS = 60 * 60 * 1000
+# Task list headings that sort the list, and the task_store.SORT_KEYS
+# column behind each
+SORT_COLUMNS = {
+    'Title': 'title',
+    'Due Date': 'due_date',
+    'Priority': 'priority',
+    'Status': 'status',
+    'Categories': 'categories',
+}
+# How often the login window checks on mail being sent
+MAIL_POLL_MS = 100
+# Actions that can be undone
+UNDO_LIMIT = 50
+# How often to check whether another instance or program changed tasks.db
+CHANGE_POLL_MS = 1000
+# Repeat choices in the task form, and the recurrence frequency behind each
+REPEAT_CHOICES = {'Never': None, 'Daily': 'daily', 'Weekly': 'weekly', 'Monthly': 'monthly'}
+
+# Set by benchmarks/bench_startup.py: a file to append startup milestones to
+STARTUP_REPORT = os.environ.get('TASKMANAGER_STARTUP_REPORT')
+_startup_marks = set()
+
+
+def mark_startup(milestone):
+    """Record the first time a startup milestone is reached"""
+    if not STARTUP_REPORT or milestone in _startup_marks:
+        return
+    _startup_marks.add(milestone)
+    with open(STARTUP_REPORT, 'a') as file:
+        file.write(f'{milestone} {time.time():.6f}\n')
+
+
+def watch_startup(root, milestone, quit=False):
+    """Mark milestone once root has been drawn; with quit, close it then"""
+    if not STARTUP_REPORT:
+        return
+
+    def painted():
+        if milestone in _startup_marks:
+            return
+        mark_startup(milestone)
+        if quit:
+            root.destroy()
+
+    # Map fires before drawing; the idle callback runs after it
+    root.bind('<Map>', lambda event: root.after_idle(painted), add='+')
+
 
 class TaskManager:
+    IO_FILETYPES = [("CSV files", "*.csv"), ("JSON Lines", "*.ndjson *.jsonl"),
+                    ("All files", "*.*")]
+
     def __init__(self, root):
         self.root = root
         self.root.title("Task Manager")
         self.root.geometry("900x700")
         
-        # Initialize database first
+        # The schema is opened (and upgraded if needed) on the worker
+        # thread, after the window is built
         self.init_database()
         
         # Task variables
@@ -22,8 +89,31 @@ class TaskManager:
         self.task_description = tk.StringVar()
         self.task_priority = tk.StringVar(value="Medium")
         self.task_status = tk.StringVar(value="Pending")
+        self.task_repeat = tk.StringVar(value="Never")
+        self.repeat_every = tk.StringVar(value="1")
+        self.repeat_times = tk.StringVar()
+        self.repeat_until = tk.StringVar()
+        # Task whose repeat rule the form shows (None until get_rule has
+        # answered), with that rule, its due date and the repeat fields
+        # as they were filled in
+        self.rule_task_id = None
+        self.shown_rule = None
+        self.shown_due = None
+        self.shown_repeat = None
         self.search_var = tk.StringVar()
         self.search_var.trace('w', self.filter_tasks)
+        # Category picked in the category filter, None for all tasks
+        self.category = None
+        # Heading the list is sorted by, None for id order or search rank
+        self.sort_column = None
+        self.sort_descending = False
+        # Undoable actions as (label, (first, last) journal events), and the
+        # last journal entry the list and statistics reflect
+        self.undo_stack = []
+        self.redo_stack = []
+        self.journal_seq = 0
+        # PRAGMA data_version last seen on the worker's connection
+        self.data_version = None
         
         # Set color scheme - Modern and friendly colors
         self.colors = {
@@ -69,9 +159,45 @@ class TaskManager:
                            font=('Segoe UI', 11, 'bold'),
                            padding=5)
         
+        # Last text shown by the clock labels
+        self._clock_time = None
+        self._clock_date = None
+
         self.create_gui()
+        watch_startup(self.root, 'first_paint')
+
+        # Database work runs on a background thread; the busy bar shows it
+        self.worker = DBWorker(self.root, on_busy=self.show_busy)
+        self.root.protocol('WM_DELETE_WINDOW', self.close)
+        self.worker.submit(self.store.init_schema, errback=self.db_error("open the database"))
+        self.worker.submit(self.store.last_event, callback=self.set_journal_seq)
+
+        # Debounced search: one query per pause in typing, not per keystroke
+        self.search_pipeline = SearchPipeline(self.root,
+                                              search=self.task_pages,
+                                              render=self.show_tasks,
+                                              matches=self.matches,
+                                              worker=self.worker,
+                                              on_error=self.db_error("search tasks"))
+        self.recycle_bin = RecycleBin(self.root, self.store, self.worker,
+                                      on_restored=self.refresh_changes,
+                                      on_error=self.db_error)
+        # Due-date reminders, woken only at the next deadline
+        self.reminders = ReminderScheduler(self.root, self.store, self.worker,
+                                           on_error=self.db_error)
+        # Live timings, when started with TASKMANAGER_PROFILE set
+        self.profile_overlay = ProfileOverlay(self.root)
+        self.root.bind('<F12>', self.profile_overlay.toggle)
         self.load_tasks()
+        self.reminders.reload()
+        # Then the task cache, in batches behind the first page
+        self._cache_generation = 0
+        self._gc_frozen = False
+        self.load_cache()
         self.update_clock()
+        # Retention policy for the recycle bin, in small background batches
+        self.purge_expired()
+        self.watch_database()
         
     def create_gui(self):
         # Main container with padding
@@ -88,6 +214,13 @@ class TaskManager:
                                   foreground=self.colors['header'])
         self.time_label.pack(side=tk.RIGHT)
 
+        # Busy indicator, visible while the database worker has jobs queued
+        self.busy_bar = ttk.Progressbar(clock_frame, mode='indeterminate', length=120)
+
+        # Progress of a running import or export
+        self.status_label = ttk.Label(clock_frame, text="")
+        self.status_label.pack(side=tk.RIGHT, padx=10)
+
         # Date label
         self.date_label = ttk.Label(clock_frame, 
                                   text="", 
@@ -115,6 +248,8 @@ class TaskManager:
         desc_entry.pack(fill=tk.X, pady=(0, 15))
 
         ttk.Label(left_frame, text="Due Date:", font=('Segoe UI', 11)).pack(fill=tk.X)
+        # tkcalendar (and babel behind it) is only loaded once the task window opens
+        from tkcalendar import DateEntry
         self.due_date = DateEntry(left_frame, width=12, 
                                 background=self.colors['button'],
                                 foreground='white', 
@@ -125,19 +260,40 @@ class TaskManager:
         priority_combo = ttk.Combobox(left_frame, 
                                     textvariable=self.task_priority,
                                     font=('Segoe UI', 11))
-        priority_combo['values'] = ('High', 'Medium', 'Low')
+        priority_combo['values'] = PRIORITIES
         priority_combo.pack(fill=tk.X, pady=(0, 15))
 
         ttk.Label(left_frame, text="Status:", font=('Segoe UI', 11)).pack(fill=tk.X)
         status_combo = ttk.Combobox(left_frame, 
                                   textvariable=self.task_status,
                                   font=('Segoe UI', 11))
-        status_combo['values'] = ('Pending', 'In Progress', 'Complete')
+        status_combo['values'] = STATUSES
         status_combo.pack(fill=tk.X, pady=(0, 15))
 
         ttk.Label(left_frame, text="Categories:", font=('Segoe UI', 11)).pack(fill=tk.X)
         self.categories_entry = ttk.Entry(left_frame, font=('Segoe UI', 11))
-        self.categories_entry.pack(fill=tk.X, pady=(0, 20))
+        self.categories_entry.pack(fill=tk.X, pady=(0, 15))
+
+        # Repeat from the due date: every N days/weeks/months, optionally
+        # a number of times in all or until a date (both may be left empty)
+        ttk.Label(left_frame, text="Repeat:", font=('Segoe UI', 11)).pack(fill=tk.X)
+        repeat_frame = ttk.Frame(left_frame)
+        repeat_frame.pack(fill=tk.X, pady=(0, 5))
+        repeat_combo = ttk.Combobox(repeat_frame, textvariable=self.task_repeat,
+                                    values=list(REPEAT_CHOICES), state='readonly',
+                                    width=9, font=('Segoe UI', 11))
+        repeat_combo.pack(side=tk.LEFT)
+        ttk.Label(repeat_frame, text="every").pack(side=tk.LEFT, padx=(8, 2))
+        ttk.Spinbox(repeat_frame, from_=1, to=365, width=4,
+                    textvariable=self.repeat_every).pack(side=tk.LEFT)
+        until_frame = ttk.Frame(left_frame)
+        until_frame.pack(fill=tk.X, pady=(0, 20))
+        ttk.Label(until_frame, text="Times:").pack(side=tk.LEFT)
+        ttk.Entry(until_frame, textvariable=self.repeat_times, width=4).pack(side=tk.LEFT,
+                                                                            padx=(2, 8))
+        ttk.Label(until_frame, text="Until:").pack(side=tk.LEFT)
+        ttk.Entry(until_frame, textvariable=self.repeat_until, width=11).pack(side=tk.LEFT,
+                                                                             padx=(2, 0))
 
         # Action Buttons Section
         action_label = ttk.Label(left_frame, text="Task Actions", style='Header.TLabel')
@@ -149,6 +305,17 @@ class TaskManager:
         ttk.Button(left_frame, text="Delete Task", command=self.delete_task).pack(fill=tk.X, pady=2)
         ttk.Button(left_frame, text="Clear Completed", command=self.clear_completed_tasks).pack(fill=tk.X, pady=2)
 
+        # Undo/redo replay journal events; Ctrl+Z, Ctrl+Y (or Ctrl+Shift+Z)
+        undo_frame = ttk.Frame(left_frame)
+        undo_frame.pack(fill=tk.X, pady=2)
+        self.undo_button = ttk.Button(undo_frame, text="Undo", command=self.undo, state=tk.DISABLED)
+        self.undo_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 1))
+        self.redo_button = ttk.Button(undo_frame, text="Redo", command=self.redo, state=tk.DISABLED)
+        self.redo_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(1, 0))
+        self.root.bind('<Control-z>', self.undo)
+        self.root.bind('<Control-y>', self.redo)
+        self.root.bind('<Control-Z>', self.redo)
+
         # Separator
         ttk.Separator(left_frame, orient='horizontal').pack(fill=tk.X, pady=10)
 
@@ -156,6 +323,14 @@ class TaskManager:
         recycle_btn = ttk.Button(left_frame, text="Recycle Bin", command=self.show_recycle_bin)
         recycle_btn.pack(fill=tk.X, pady=2)
 
+        # Explicit full reload, e.g. after editing tasks.db elsewhere
+        ttk.Button(left_frame, text="Refresh", command=self.refresh).pack(fill=tk.X, pady=2)
+        self.root.bind('<F5>', self.refresh)
+
+        # Bulk import/export as CSV or NDJSON
+        ttk.Button(left_frame, text="Import...", command=self.import_tasks).pack(fill=tk.X, pady=2)
+        ttk.Button(left_frame, text="Export...", command=self.export_tasks).pack(fill=tk.X, pady=2)
+
         # Right Frame
         right_frame = ttk.Frame(main_container, padding="10")
         right_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -168,20 +343,39 @@ class TaskManager:
         ttk.Entry(search_frame, textvariable=self.search_var,
                  font=('Segoe UI', 11)).pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+        # Bulk actions on the selected tasks (Shift/Ctrl-click to select several)
+        bulk_frame = ttk.Frame(right_frame)
+        bulk_frame.pack(fill=tk.X, pady=(0, 10))
+        self.selection_label = ttk.Label(bulk_frame, text="0 selected", font=('Segoe UI', 11))
+        self.selection_label.pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(bulk_frame, text="Mark Complete",
+                   command=self.mark_selected_complete).pack(side=tk.LEFT, padx=2)
+        priority_button = ttk.Menubutton(bulk_frame, text="Set Priority")
+        priority_menu = tk.Menu(priority_button, tearoff=False)
+        for priority in PRIORITIES:
+            priority_menu.add_command(label=priority,
+                                      command=lambda p=priority: self.set_selected_priority(p))
+        priority_button['menu'] = priority_menu
+        priority_button.pack(side=tk.LEFT, padx=2)
+        ttk.Button(bulk_frame, text="Set Due Date...",
+                   command=self.set_selected_due_date).pack(side=tk.LEFT, padx=2)
+        ttk.Button(bulk_frame, text="Categories...",
+                   command=self.set_selected_categories).pack(side=tk.LEFT, padx=2)
+        ttk.Button(bulk_frame, text="Move to Recycle Bin",
+                   command=self.delete_task).pack(side=tk.LEFT, padx=2)
+
         # Task list with scrollbar
         self.tree = ttk.Treeview(right_frame, 
                                 columns=('Title', 'Description', 'Due Date', 'Priority', 'Status', 'Categories'),
                                 show='headings',
-                                selectmode='browse',
+                                selectmode='extended',
                                 style='Custom.Treeview')
 
-        # Configure column headings
-        self.tree.heading('Title', text='Title')
+        # Configure column headings; clicking one sorts by it in SQL
         self.tree.heading('Description', text='Description')
-        self.tree.heading('Due Date', text='Due Date')
-        self.tree.heading('Priority', text='Priority')
-        self.tree.heading('Status', text='Status')
-        self.tree.heading('Categories', text='Categories')
+        for column in SORT_COLUMNS:
+            self.tree.heading(column, text=column,
+                              command=lambda column=column: self.sort_by(column))
 
         # Configure column widths
         self.tree.column('Title', width=150)
@@ -191,16 +385,30 @@ class TaskManager:
         self.tree.column('Status', width=100)
         self.tree.column('Categories', width=150)
 
+        # Category filter with the number of tasks in each category
+        facet_frame = ttk.LabelFrame(right_frame, text="Categories", padding="5")
+        facet_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+        self.category_tree = ttk.Treeview(facet_frame, columns=('Category', 'Tasks'),
+                                          show='headings', selectmode='browse')
+        self.category_tree.heading('Category', text='Category')
+        self.category_tree.heading('Tasks', text='Tasks')
+        self.category_tree.column('Category', width=110)
+        self.category_tree.column('Tasks', width=50, anchor=tk.E)
+        self.category_tree.pack(fill=tk.BOTH, expand=True)
+        self.category_tree.bind('<<TreeviewSelect>>', self.category_selected)
+        self._category_items = {}   # category_tree item -> category name
+
         # Add scrollbar
-        scrollbar = ttk.Scrollbar(right_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(right_frame, orient=tk.VERTICAL)
 
         # Pack tree and scrollbar
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Bind selection event
-        self.tree.bind('<<TreeviewSelect>>', self.item_selected)
+        # Only the visible rows become Treeview items; the scrollbar pages
+        # through the full result set. Also handles the selection event.
+        self.task_list = VirtualTaskList(self.tree, scrollbar, on_select=self.item_selected)
+        self.set_tree_item_colors()
 
         # Statistics Frame
         stats_frame = ttk.LabelFrame(right_frame, text="Task Statistics", padding="10")
@@ -238,34 +446,9 @@ class TaskManager:
         self.overdue_label.pack(fill=tk.X, pady=2)
 
     def init_database(self):
-        with sqlite3.connect('tasks.db') as conn:
-            cursor = conn.cursor()
-            # Tasks table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    due_date TEXT,
-                    priority TEXT,
-                    status TEXT DEFAULT 'Pending',
-                    categories TEXT
-                )
-            ''')
-            # Recycle bin table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS deleted_tasks (
-                    id INTEGER PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    due_date TEXT,
-                    priority TEXT,
-                    status TEXT,
-                    categories TEXT,
-                    deleted_date TEXT
-                )
-            ''')
-            conn.commit()
+        # One long-lived store (and connection) for the lifetime of the window
+        self.store = TaskStore(init=False)
+        self.statistics = TaskStatistics(self.store)
 
     def add_task(self):
         """Add a new task with validation and feedback"""
@@ -277,76 +460,317 @@ class TaskManager:
             messagebox.showerror("Error", "Task title is required!")
             return
             
-        try:
-            with sqlite3.connect('tasks.db') as conn:
-                cursor = conn.cursor()
-                
-                # Check for duplicate title
-                cursor.execute('SELECT COUNT(*) FROM tasks WHERE title = ?', (title,))
-                if cursor.fetchone()[0] > 0:
-                    messagebox.showerror("Error", "A task with this title already exists!")
-                    return
-                
-                # Insert task with all fields
-                cursor.execute('''
-                    INSERT INTO tasks (title, description, due_date, priority, status, categories)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    title,
-                    description,
-                    self.due_date.get_date().strftime('%Y-%m-%d'),
-                    self.task_priority.get(),
-                    self.task_status.get(),
-                    self.categories_entry.get().strip()
-                ))
-                
-            self.task_title.set("")
-            self.task_description.set("")
-            self.due_date.set_date(datetime.now())
-            self.task_priority.set("Medium")
-            self.task_status.set("Pending")
-            self.categories_entry.delete(0, tk.END)
-            self.load_tasks()
+        def insert(*fields):
+            task_id, events = self.store.journaled(self.store.add_task, *fields)
+            return self.store.get_task(task_id), events
+
+        def added(result):
+            task, events = result
+            self.record("add task", events)
+            self.clear_form()
+            # Show the new row if it belongs to the current view; a sorted
+            # view is reloaded so the row lands in its place
+            if self.sort_column is not None:
+                self.load_tasks()
+            elif self.matches(task, self.search_var.get()):
+                self.task_list.append_row(task)
+            self.reminders.task_changed(task)
+            self.update_statistics()
+            span.done()
             messagebox.showinfo("Success", "✅ Task added successfully!")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to add task: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+
+        due_date = self.due_date.get_date().strftime('%Y-%m-%d')
+        try:
+            rule = self.form_rule(due_date)
+        except ValueError as error:
+            messagebox.showerror("Error", f"Invalid repeat: {error}")
+            return
+
+        # Insert task with all fields
+        span = PROFILER.start('add')
+        self.worker.submit(insert,
+                           title,
+                           description,
+                           due_date,
+                           self.task_priority.get(),
+                           self.task_status.get(),
+                           self.categories_entry.get().strip(),
+                           rule,
+                           callback=added,
+                           errback=self.db_error("add task"))
+
+    def clear_form(self):
+        self.task_title.set("")
+        self.task_description.set("")
+        self.due_date.set_date(datetime.now())
+        self.task_priority.set("Medium")
+        self.task_status.set("Pending")
+        self.categories_entry.delete(0, tk.END)
+        self.show_rule(None)
+
+    def form_rule(self, due_date):
+        """The recurrence.Rule set in the form for a task due on due_date,
+        or None; raises ValueError for an impossible one"""
+        freq = REPEAT_CHOICES[self.task_repeat.get()]
+        if freq is None:
+            return None
+        times = self.repeat_times.get().strip()
+        until = self.repeat_until.get().strip()
+        start = due_date
+        if self.shown_rule and self.shown_rule.freq == freq and self.shown_due == due_date:
+            # Same series: keep counting occurrences from its first one
+            start = self.shown_rule.start
+        return recurrence.make_rule(freq, self.repeat_every.get().strip() or 1, start,
+                                    iso_date(until) if until else None,
+                                    times or None)
+
+    def show_rule(self, rule, due_date=None, task_id=None):
+        """Fill the repeat fields of the form from task_id's rule"""
+        self.rule_task_id = task_id
+        self.shown_rule = rule
+        self.shown_due = due_date
+        names = {freq: name for name, freq in REPEAT_CHOICES.items()}
+        self.task_repeat.set(names[rule.freq] if rule else "Never")
+        self.repeat_every.set(str(rule.interval) if rule else "1")
+        self.repeat_times.set(str(rule.count) if rule and rule.count else "")
+        self.repeat_until.set(rule.until.isoformat() if rule and rule.until else "")
+        self.shown_repeat = self.repeat_fields()
+
+    def repeat_fields(self):
+        return (self.task_repeat.get(), self.repeat_every.get().strip(),
+                self.repeat_times.get().strip(), self.repeat_until.get().strip())
+
+    def db_error(self, action):
+        """Error callback for worker jobs, reporting failures like the rest of the UI"""
+        def report(error):
+            if isinstance(error, DuplicateTitleError):
+                messagebox.showerror("Error", "A task with this title already exists!")
+            elif isinstance(error, sqlite3.Error):
+                messagebox.showerror("Database Error", f"Failed to {action}: {str(error)}")
+            elif isinstance(error, (OSError, UnicodeError)):
+                messagebox.showerror("File Error", f"Failed to {action}: {str(error)}")
+            else:
+                messagebox.showerror("Error", f"An unexpected error occurred: {str(error)}")
+        return report
+
+    def show_busy(self, busy):
+        if busy:
+            self.busy_bar.pack(side=tk.RIGHT, padx=10)
+            self.busy_bar.start(15)
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+
+    def close(self):
+        self.reminders.stop()
+        # The worker closes its own connection after finishing queued jobs
+        self.worker.submit(self.store.release)
+        self.worker.stop()
+        self.store.close()
+        if PROFILER.dump_path:
+            try:
+                PROFILER.dump(PROFILER.dump_path)
+            except OSError as e:
+                print(f"Could not write the profile to {PROFILER.dump_path}: {e}")
+        self.root.destroy()
 
     def update_clock(self):
-        """Update the clock display"""
+        """Update the clock display, redrawing only the labels that changed"""
         current_time = datetime.now()
-        
+
         # Update time with seconds
         time_string = current_time.strftime("%I:%M:%S %p")
-        self.time_label.config(text=time_string)
-        
-        # Update date with day name
-        date_string = current_time.strftime("%A, %B %d, %Y")
-        self.date_label.config(text=date_string)
-        
-        # Schedule the next update
-        self.root.after(1000, self.update_clock)
-
-    def load_tasks(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if time_string != self._clock_time:
+            self._clock_time = time_string
+            self.time_label.config(text=time_string)
+
+        # Update date with day name, formatted only when the day changes
+        today = current_time.date()
+        if today != self._clock_date:
+            self._clock_date = today
+            self.date_label.config(text=current_time.strftime("%A, %B %d, %Y"))
+            # New day: due today / this week / overdue have moved
+            self.update_statistics()
+
+        # Schedule the next update just after the next whole second, so
+        # ticks do not drift or skip a second
+        self.root.after(1000 - current_time.microsecond // 1000 + 5, self.update_clock)
+
+    def reload_all(self, *args):
+        """After changes to many tasks at once: reload the list and the reminders"""
+        self.load_tasks()
+        self.reminders.reload()
+
+    def refresh(self, *args):
+        """Refresh button: reread everything, the task cache included, since
+        tasks.db may have been changed by another program"""
+        self.load_cache()
+        self.reload_all()
+        self.worker.submit(self.store.last_event, callback=self.set_journal_seq)
+
+    def set_journal_seq(self, seq):
+        self.journal_seq = seq
+
+    def refresh_changes(self, unjournaled=False):
+        """Catch up with the journal: patch the tasks changed since the last
+        entry seen, or reload everything if that is more than a few thousand
+        or the entries have been pruned. With unjournaled, finding no new
+        entries still rereads what the journal does not cover, the recycle
+        bin and the statistics: the database changed some other way."""
+        def caught_up(result):
+            if result is None:
+                self.refresh()
+                return
+            self.journal_seq, changes = result
+            if changes:
+                self.apply_changes(changes)
+            elif unjournaled:
+                self.recycle_bin.refresh()
+                self.update_statistics()
+
+        self.worker.submit(self.store.changes_since, self.journal_seq,
+                           callback=caught_up, errback=self.db_error("load tasks"))
+
+    def apply_changes(self, changes):
+        """Show {task id: row, or None if deleted} changes made in the database"""
+        if not changes:
+            return
+        # Cached search results are out of date once tasks change
+        self.search_pipeline.invalidate()
+        removed = [task_id for task_id, task in changes.items() if task is None]
+        changed = [task for task in changes.values() if task is not None]
+        if self.sort_column is not None and changed:
+            # Changed rows may belong somewhere else in the order
+            self.load_tasks()
+        else:
+            term = self.search_var.get()
+            self.task_list.apply_changes(changes, lambda task: self.matches(task, term))
+            self.selection_label.config(text=f"{len(self.task_list.selected_ids)} selected")
+        if removed:
+            self.recycle_bin.refresh()
+        self.reminders.tasks_removed(removed)
+        for task in changed:
+            self.reminders.task_changed(task)
+        self.update_statistics()
 
-        with sqlite3.connect('tasks.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM tasks')
-            tasks = cursor.fetchall()
+    def watch_database(self):
+        """Check every CHANGE_POLL_MS whether another instance (or task_cli.py)
+        committed to tasks.db, and if so patch in the tasks it changed"""
+        def checked(version):
+            if self.data_version is not None and version != self.data_version:
+                self.refresh_changes(unjournaled=True)
+            self.data_version = version
+            self.root.after(CHANGE_POLL_MS, self.watch_database)
+
+        def failed(error):
+            # Locked or unreadable for now; try again at the next tick
+            self.root.after(CHANGE_POLL_MS, self.watch_database)
+
+        # One PRAGMA, answered from memory; quiet so the busy bar stays hidden
+        self.worker.submit(self.store.data_version, callback=checked, errback=failed, quiet=True)
+
+    # ------------------------------------------------------------------
+    # Undo
+    # ------------------------------------------------------------------
+    def record(self, label, events, refresh=False):
+        """Make an action that journaled events undoable; with refresh, also
+        show its changes from the journal"""
+        if events is None:
+            return
+        if events[0] == self.journal_seq + 1 and not refresh:
+            # Nothing else was journaled in between, and the caller shows
+            # this action's changes itself
+            self.journal_seq = events[1]
+        self.undo_stack.append((label, events))
+        del self.undo_stack[:-UNDO_LIMIT]
+        self.redo_stack.clear()
+        self.update_undo_buttons()
+        if refresh:
+            self.refresh_changes()
+
+    def undo(self, event=None):
+        self.replay(event, self.undo_stack, self.redo_stack, self.store.undo_events, "undo")
+
+    def redo(self, event=None):
+        self.replay(event, self.redo_stack, self.undo_stack, self.store.redo_events, "redo")
+
+    def replay(self, event, source, target, replay_events, action):
+        """Undo or redo the latest action on source and move it to target"""
+        if event is not None and isinstance(event.widget, (tk.Entry, ttk.Entry, tk.Text)):
+            return  # keys typed in a text field
+        if not source:
+            return
+        label, events = source.pop()
+        self.update_undo_buttons()
+
+        def replayed(changes):
+            target.append((label, events))
+            self.update_undo_buttons()
+            # The replay's own events are picked up like any other change
+            self.refresh_changes()
+            self.recycle_bin.refresh()
+
+        def failed(error):
+            if isinstance(error, (JournalConflictError, DuplicateTitleError)):
+                messagebox.showwarning("Warning", f"Cannot {action} {label}: {error}")
+            else:
+                self.db_error(f"{action} {label}")(error)
 
-            for task in tasks:
-                self.tree.insert('', tk.END, values=task[1:7])  # Exclude ID from display
+        self.worker.submit(replay_events, *events, callback=replayed, errback=failed)
 
-        self.set_tree_item_colors()
+    def update_undo_buttons(self):
+        for button, stack, verb in ((self.undo_button, self.undo_stack, "Undo"),
+                                    (self.redo_button, self.redo_stack, "Redo")):
+            if stack:
+                button.config(state=tk.NORMAL, text=f"{verb} {stack[-1][0]}")
+            else:
+                button.config(state=tk.DISABLED, text=verb)
+
+    def load_cache(self, after_id=0):
+        """(Re)load the store's task cache one batch per worker job, so
+        other jobs are not held up behind it"""
+        if not after_id:
+            # A reload supersedes any load still in progress
+            self._cache_generation += 1
+        generation = self._cache_generation
+
+        def loaded(last_id):
+            if generation != self._cache_generation:
+                return
+            if last_id is not None:
+                self.load_cache(last_id)
+            elif self.store.cache is not None and not self._gc_frozen:
+                # The records live as long as the cache; keeping them out
+                # of the cyclic garbage collector spares every later full
+                # collection a walk over all of them (half a second at a
+                # million tasks). Only after the first load: whatever is
+                # frozen is never collected, so garbage is collected first
+                # and later reloads are left alone.
+                gc.collect()
+                gc.freeze()
+                self._gc_frozen = True
+
+        self.worker.submit(self.store.load_cache, after_id,
+                           callback=loaded, errback=self.db_error("load tasks"))
+
+    def load_tasks(self, *args):
+        """Full reload of the current view; single-task edits patch the list instead"""
+        # Cached search results are out of date once tasks change
+        self.search_pipeline.invalidate()
+        self.worker.submit(self.search_pipeline.query, self.search_var.get(),
+                           callback=self.show_tasks,
+                           errback=self.db_error("load tasks"))
         self.update_statistics()
 
+    def show_tasks(self, tasks):
+        """Replace the task list with the given rows"""
+        self.task_list.set_rows(tasks)
+        self.selection_label.config(text="0 selected")
+        if STARTUP_REPORT:
+            self.root.after_idle(mark_startup, 'interactive')
+
     def set_tree_item_colors(self):
-        # Configure tags for different states
+        # Configure tags for different states; rows get their tag when inserted
         self.tree.tag_configure('completed', 
                               background=self.colors['Complete_bg'],
                               foreground=self.colors['Complete'],
@@ -364,37 +788,35 @@ class TaskManager:
                               background=self.colors['Low'],
                               foreground='white')
 
-        for item in self.tree.get_children():
-            values = self.tree.item(item)['values']
-            priority = values[3]  # Priority column
-            status = values[4]    # Status column
-            
-            if status == 'Complete':
-                self.tree.item(item, tags=('completed',))
-            else:
-                # Apply priority-based tags for incomplete items
-                if priority == 'High':
-                    self.tree.item(item, tags=('high_priority',))
-                elif priority == 'Medium':
-                    self.tree.item(item, tags=('medium_priority',))
-                else:  # Low priority
-                    self.tree.item(item, tags=('low_priority',))
-
     def item_selected(self, event):
+        count = len(self.task_list.selected_ids)
+        self.selection_label.config(text=f"{count} selected")
         selected_item = self.tree.selection()
-        if not selected_item:
+        # The form edits one task; bulk actions cover multiple selections
+        if count != 1 or not selected_item:
             return
         
-        item = self.tree.item(selected_item[0])
-        values = item['values']
+        # Row as fetched from the database, no Tk round-trip
+        values = self.task_list.row(selected_item[0])[1:7]
         
         self.task_title.set(values[0])
-        self.task_description.set(values[1])
+        self.task_description.set(values[1] or '')
         self.due_date.set_date(values[2])
         self.task_priority.set(values[3])
         self.task_status.set(values[4])
         self.categories_entry.delete(0, tk.END)
-        self.categories_entry.insert(0, values[5])
+        self.categories_entry.insert(0, values[5] or '')
+
+        # The rule is not part of the row; fetch it unless another task
+        # has been picked by the time it arrives
+        task_id = self.task_list.row(selected_item[0])[0]
+
+        def loaded(rule):
+            if self.task_list.selected_ids == {task_id}:
+                self.show_rule(rule, values[2], task_id)
+        self.show_rule(None)
+        self.worker.submit(self.store.get_rule, task_id, callback=loaded,
+                           errback=self.db_error("load task"), quiet=True)
 
     def update_task(self):
         """Update selected task with validation and feedback"""
@@ -402,281 +824,385 @@ class TaskManager:
         if not selected_item:
             messagebox.showwarning("Warning", "Please select a task to update!")
             return
+        if len(self.task_list.selected_ids) > 1:
+            messagebox.showwarning("Warning", "Select a single task to edit it in the form!")
+            return
             
         title = self.task_title.get().strip()
         if not title:
             messagebox.showerror("Error", "Task title is required!")
             return
             
-        try:
-            with sqlite3.connect('tasks.db') as conn:
-                cursor = conn.cursor()
-                
-                # Get current task ID
-                current_values = self.tree.item(selected_item[0])['values']
-                cursor.execute('SELECT id FROM tasks WHERE title = ?', (current_values[0],))
-                task_id = cursor.fetchone()[0]
-                
-                # Check for duplicate title (excluding current task)
-                cursor.execute('SELECT COUNT(*) FROM tasks WHERE title = ? AND id != ?', 
-                             (title, task_id))
-                if cursor.fetchone()[0] > 0:
-                    messagebox.showerror("Error", "A task with this title already exists!")
-                    return
-                
-                # Update task
-                cursor.execute('''
-                    UPDATE tasks 
-                    SET title=?, description=?, due_date=?, priority=?, status=?, categories=?
-                    WHERE id=?
-                ''', (
-                    title,
-                    self.task_description.get().strip(),
-                    self.due_date.get_date().strftime('%Y-%m-%d'),
-                    self.task_priority.get(),
-                    self.task_status.get(),
-                    self.categories_entry.get().strip(),
-                    task_id
-                ))
-                
-            self.task_title.set("")
-            self.task_description.set("")
-            self.due_date.set_date(datetime.now())
-            self.task_priority.set("Medium")
-            self.task_status.set("Pending")
-            self.categories_entry.delete(0, tk.END)
-            self.load_tasks()
+        # Get current task ID
+        task_id = self.task_list.row(selected_item[0])[0]
+
+        due_date = self.due_date.get_date().strftime('%Y-%m-%d')
+        # The stored rule is only replaced once the form has shown it and
+        # the repeat fields were changed; before get_rule answers they
+        # read "Never" whatever the rule is
+        change_rule = (self.rule_task_id == task_id
+                       and self.repeat_fields() != self.shown_repeat)
+        if change_rule:
+            try:
+                rule = self.form_rule(due_date)
+            except ValueError as error:
+                messagebox.showerror("Error", f"Invalid repeat: {error}")
+                return
+
+        def save(*fields):
+            # The rule first, so completing the task moves it on by the new one
+            if change_rule:
+                self.store.set_rule(task_id, rule)
+            self.store.update_task(task_id, *fields)
+
+        def update(*fields):
+            _, events = self.store.journaled(save, *fields)
+            return self.store.get_task(task_id), events
+
+        def updated(result):
+            task, events = result
+            self.record("update task", events)
+            self.clear_form()
+            # Reloads a sorted view, and drops the row if it no longer
+            # matches the search or category
+            self.apply_changes({task[0]: task})
+            span.done()
             messagebox.showinfo("Success", "✅ Task updated successfully!")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to update task: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+
+        # Update task
+        span = PROFILER.start('update')
+        self.worker.submit(update,
+                           title,
+                           self.task_description.get().strip(),
+                           due_date,
+                           self.task_priority.get(),
+                           self.task_status.get(),
+                           self.categories_entry.get().strip(),
+                           callback=updated,
+                           errback=self.db_error("update task"))
 
     def delete_task(self):
-        """Move selected task to recycle bin"""
-        selected_item = self.tree.selection()
-        if not selected_item:
+        """Move the selected task(s) to the recycle bin"""
+        task_ids = sorted(self.task_list.selected_ids)
+        if not task_ids:
             messagebox.showwarning("Warning", "Please select a task to delete!")
             return
 
-        task_values = self.tree.item(selected_item[0])['values']
-        if not messagebox.askyesno("Confirm Delete", 
-                                 f"Move task to recycle bin:\n'{task_values[0]}'?"):
+        visible = self.task_list.selected_rows()
+        if len(task_ids) == 1 and visible:
+            question = f"Move task to recycle bin:\n'{visible[0][1]}'?"
+        else:
+            question = f"Move {len(task_ids)} tasks to the recycle bin?"
+        if not messagebox.askyesno("Confirm Delete", question):
+            return
+
+        def deleted(result):
+            count, events = result
+            self.record("delete", events)
+            self.clear_form()
+            if len(task_ids) == 1:
+                self.task_list.delete_row(task_ids[0])
+            else:
+                self.task_list.delete_rows(task_ids)
+            self.selection_label.config(text="0 selected")
+            self.reminders.tasks_removed(task_ids)
+            self.update_statistics()
+            span.done()
+            messagebox.showinfo("Success", f"Moved {count} task(s) to the recycle bin!")
+
+        # One INSERT ... SELECT and one DELETE, however many tasks
+        span = PROFILER.start('delete')
+        self.worker.submit(self.store.journaled, self.store.delete_tasks, task_ids,
+                           callback=deleted,
+                           errback=self.db_error("delete task"))
+
+    def update_selected(self, **fields):
+        """Set fields on every selected task with one UPDATE, then patch those rows"""
+        task_ids = sorted(self.task_list.selected_ids)
+        if not task_ids:
+            messagebox.showwarning("Warning", "Please select tasks to update!")
             return
 
+        def update():
+            _, events = self.store.journaled(self.store.update_tasks, task_ids, **fields)
+            return self.store.get_tasks(task_ids), events
+
+        def updated(result):
+            tasks, events = result
+            self.record("update tasks", events)
+            self.apply_changes({task[0]: task for task in tasks})
+            span.done()
+
+        span = PROFILER.start('bulk update')
+        self.worker.submit(update, callback=updated, errback=self.db_error("update tasks"))
+
+    def mark_selected_complete(self):
+        self.update_selected(status='Complete')
+
+    def set_selected_priority(self, priority):
+        self.update_selected(priority=priority)
+
+    def set_selected_due_date(self):
+        if not self.task_list.selected_ids:
+            messagebox.showwarning("Warning", "Please select tasks to update!")
+            return
+        value = simpledialog.askstring("Set Due Date",
+                                       "Due date (YYYY-MM-DD), empty to clear:",
+                                       initialvalue=datetime.now().strftime('%Y-%m-%d'))
+        if value is None:
+            return
         try:
-            with sqlite3.connect('tasks.db') as conn:
-                cursor = conn.cursor()
-                # Move to recycle bin
-                cursor.execute('''
-                    INSERT INTO deleted_tasks 
-                    (title, description, due_date, priority, status, categories, deleted_date)
-                    VALUES (?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
-                ''', task_values)
-                
-                # Remove from tasks
-                cursor.execute('DELETE FROM tasks WHERE title = ?', (task_values[0],))
-
-            self.task_title.set("")
-            self.task_description.set("")
-            self.due_date.set_date(datetime.now())
-            self.task_priority.set("Medium")
-            self.task_status.set("Pending")
-            self.categories_entry.delete(0, tk.END)
-            self.load_tasks()
-            messagebox.showinfo("Success", "Task moved to recycle bin!")
+            due_date = iso_date(value)
+        except ValueError:
+            messagebox.showerror("Error", f"'{value}' is not a date like 2024-12-31!")
+            return
+        self.update_selected(due_date=due_date)
 
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to delete task: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+    def set_selected_categories(self):
+        if not self.task_list.selected_ids:
+            messagebox.showwarning("Warning", "Please select tasks to update!")
+            return
+        value = simpledialog.askstring("Set Categories",
+                                       "Categories (comma-separated), replacing the current ones:")
+        if value is None:
+            return
+        self.update_selected(categories=value.strip())
 
     def clear_completed_tasks(self):
         """Clear all completed tasks with confirmation and feedback"""
-        try:
-            with sqlite3.connect('tasks.db') as conn:
-                cursor = conn.cursor()
-                
-                # Get count of completed tasks
-                cursor.execute('SELECT COUNT(*) FROM tasks WHERE status = "Complete"')
-                completed_count = cursor.fetchone()[0]
-                
-                if completed_count == 0:
-                    messagebox.showinfo("Info", "No completed tasks to clear!")
-                    return
-                
-                # Ask for confirmation
-                if not messagebox.askyesno("Confirm Clear", 
-                                         f"Are you sure you want to clear {completed_count} completed task(s)?"):
-                    return
-                
-                # Delete completed tasks
-                cursor.execute('DELETE FROM tasks WHERE status = "Complete"')
-                
-            self.load_tasks()
-            messagebox.showinfo("Success", 
-                              f"🧹 Successfully cleared {completed_count} completed task(s)!")
+        def confirm(completed_count):
+            if completed_count == 0:
+                messagebox.showinfo("Info", "No completed tasks to clear!")
+                return
+            
+            # Ask for confirmation
+            if not messagebox.askyesno("Confirm Clear", 
+                                     f"Move {completed_count} completed task(s) to the recycle bin?"):
+                return
             
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to clear tasks: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+            # Delete completed tasks in the background
+            self.worker.submit(self.store.journaled, self.store.clear_completed,
+                               callback=cleared,
+                               errback=self.db_error("clear tasks"))
+
+        def cleared(result):
+            completed_count, events = result
+            self.record("clear completed", events, refresh=True)
+            messagebox.showinfo("Success", 
+                              f"🧹 Moved {completed_count} completed task(s) to the recycle bin!")
 
-    def filter_tasks(self, *args):
-        search_term = self.search_var.get().lower()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # Get count of completed tasks
+        self.worker.submit(self.store.count_completed,
+                           callback=confirm,
+                           errback=self.db_error("clear tasks"))
 
-        with sqlite3.connect('tasks.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM tasks')
-            tasks = cursor.fetchall()
+    def import_tasks(self):
+        """Import tasks from a CSV or NDJSON file in the background"""
+        from tkinter import filedialog
+        import task_io
 
-            for task in tasks:
-                if (search_term in task[1].lower() or  # Title
-                    search_term in task[2].lower() or  # Description
-                    search_term in task[4].lower() or  # Priority
-                    search_term in task[6].lower()):   # Categories
-                    self.tree.insert('', tk.END, values=task[1:7])
+        path = filedialog.askopenfilename(
+            title="Import Tasks", filetypes=self.IO_FILETYPES)
+        if not path:
+            return
 
-        self.set_tree_item_colors()
-        self.update_statistics()
+        def progress(report):
+            self.status_label.config(
+                text=f"Importing: {report['read']} rows ({report['rows_per_second']:.0f} rows/s)")
+
+        def run():
+            return task_io.import_tasks(
+                self.store, path, progress=lambda report: self.worker.post(progress, report))
+
+        def imported(report):
+            self.status_label.config(text="")
+            self.refresh_changes()
+            messagebox.showinfo("Import Complete", task_io.format_report(report))
+
+        def failed(error):
+            self.status_label.config(text="")
+            self.db_error("import tasks")(error)
+
+        self.worker.submit(run, callback=imported, errback=failed)
+
+    def export_tasks(self):
+        """Export all tasks to a CSV or NDJSON file in the background"""
+        from tkinter import filedialog
+        import task_io
+
+        path = filedialog.asksaveasfilename(
+            title="Export Tasks", defaultextension='.csv', filetypes=self.IO_FILETYPES)
+        if not path:
+            return
+
+        def progress(count):
+            self.status_label.config(text=f"Exporting: {count} tasks")
+
+        def run():
+            return task_io.export_tasks(
+                self.store, path, progress=lambda count: self.worker.post(progress, count))
+
+        def exported(count):
+            self.status_label.config(text="")
+            messagebox.showinfo("Export Complete", f"Exported {count} task(s) to {path}")
+
+        def failed(error):
+            self.status_label.config(text="")
+            self.db_error("export tasks")(error)
+
+        self.worker.submit(run, callback=exported, errback=failed)
+
+    def task_pages(self, term):
+        """Rows for the search term within the selected category, in the chosen order"""
+        return self.store.task_pages(term, self.category,
+                                     SORT_COLUMNS.get(self.sort_column), self.sort_descending)
+
+    def sort_by(self, column):
+        """Heading click: ascending, then descending, then back to the default order"""
+        if column != self.sort_column:
+            self.sort_column, self.sort_descending = column, False
+        elif not self.sort_descending:
+            self.sort_descending = True
+        else:
+            self.sort_column, self.sort_descending = None, False
+        for name in SORT_COLUMNS:
+            arrow = ''
+            if name == self.sort_column:
+                arrow = ' ▼' if self.sort_descending else ' ▲'
+            self.tree.heading(name, text=name + arrow)
+        self.load_tasks()
+
+    def matches(self, task, term):
+        return self.store.matches(task, term, self.category)
+
+    def category_selected(self, event):
+        selection = self.category_tree.selection()
+        if not selection:
+            return
+        category = self._category_items.get(selection[0])
+        if category == self.category:
+            return
+        self.category = category
+        self.load_tasks()
+
+    def show_categories(self, total, counts):
+        """Fill the category filter from (name, count) pairs"""
+        names = [name for name, count in counts]
+        if self.category is not None and self.category not in names:
+            counts = counts + [(self.category, 0)]
+        self.category_tree.delete(*self.category_tree.get_children())
+        self._category_items = {}
+        item = self.category_tree.insert('', tk.END, values=("All", total))
+        self._category_items[item] = None
+        selected = item
+        for name, count in counts:
+            item = self.category_tree.insert('', tk.END, values=(name, count))
+            self._category_items[item] = name
+            if name == self.category:
+                selected = item
+        self.category_tree.selection_set(selected)
+
+    def filter_tasks(self, *args):
+        # FTS5 prefix search, debounced; only matching rows are fetched
+        self.search_pipeline.submit(self.search_var.get())
 
     def update_statistics(self):
-        """Update all statistics in real-time"""
-        with sqlite3.connect('tasks.db') as conn:
-            cursor = conn.cursor()
-            
-            current_time = datetime.now()
-            current_date = current_time.strftime('%Y-%m-%d')
-            
-            # Basic statistics
-            cursor.execute('SELECT COUNT(*) FROM tasks')
-            total_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM tasks WHERE status = "Complete"')
-            completed_count = cursor.fetchone()[0]
-            
-            pending_count = total_count - completed_count
-            
-            # Time-based queries
-            cursor.execute('''
-                SELECT COUNT(*) FROM tasks 
-                WHERE date(due_date) = date(?) 
-                AND status != "Complete"
-            ''', (current_date,))
-            due_today = cursor.fetchone()[0]
-            
-            cursor.execute('''
-                SELECT COUNT(*) FROM tasks 
-                WHERE date(due_date) BETWEEN date(?) AND date(?, '+6 days')
-                AND status != "Complete"
-            ''', (current_date, current_date))
-            due_week = cursor.fetchone()[0]
-            
-            cursor.execute('''
-                SELECT COUNT(*) FROM tasks 
-                WHERE date(due_date) < date(?) 
-                AND status != "Complete"
-            ''', (current_date,))
-            overdue = cursor.fetchone()[0]
-
-            # Update statistics labels with emoji and color coding
-            self.total_label.config(
-                text=f"Total Tasks: {total_count}")
-            
-            self.completed_label.config(
-                text=f"Completed: {completed_count}")
-            
-            self.pending_label.config(
-                text=f"Pending: {pending_count}")
-            
-            self.due_today_label.config(
-                text=f"Due Today: {due_today}")
-            
-            self.due_week_label.config(
-                text=f"Due This Week: {due_week}")
-            
-            # Add warning emoji if there are overdue tasks
-            overdue_text = f"Overdue: {overdue}" if overdue > 0 else f"No Overdue Tasks"
-            self.overdue_label.config(text=overdue_text)
+        """Update the statistics labels if tasks or the date changed"""
+        def refreshed(stats):
+            self.show_statistics(stats)
+            span.done()
+
+        span = PROFILER.start('stats refresh')
+        self.worker.submit(self.statistics.refresh,
+                           callback=refreshed,
+                           errback=self.db_error("update statistics"))
+
+    def show_statistics(self, stats):
+        if stats is None:
+            return  # unchanged
+        
+        total_count = stats['total']
+        completed_count = stats['completed']
+        pending_count = stats['pending']
+        due_today = stats['due_today']
+        due_week = stats['due_week']
+        overdue = stats['overdue']
+
+        self.show_categories(total_count, stats['categories'])
+
+        # Update statistics labels with emoji and color coding
+        self.total_label.config(
+            text=f"Total Tasks: {total_count}")
+        
+        self.completed_label.config(
+            text=f"Completed: {completed_count}")
+        
+        self.pending_label.config(
+            text=f"Pending: {pending_count}")
+        
+        self.due_today_label.config(
+            text=f"Due Today: {due_today}")
+        
+        self.due_week_label.config(
+            text=f"Due This Week: {due_week}")
+        
+        # Add warning emoji if there are overdue tasks
+        overdue_text = f"Overdue: {overdue}" if overdue > 0 else f"No Overdue Tasks"
+        self.overdue_label.config(text=overdue_text)
 
-            # Update label colors based on values
-            if overdue > 0:
-                self.overdue_label.config(foreground=self.colors['High'])
-            else:
-                self.overdue_label.config(foreground=self.colors['Complete'])
-                
-            # Call this method whenever tasks are modified
-            self.root.update_idletasks()
-
-    def load_deleted_tasks(self):
-        """Load deleted tasks from the database and display them."""
-        # Create a new window for deleted tasks
-        recycle_bin_window = tk.Toplevel(self.root)
-        recycle_bin_window.title("Recycle Bin")
-        recycle_bin_window.geometry("600x400")
-
-        # Create a Treeview to display deleted tasks
-        deleted_tree = ttk.Treeview(recycle_bin_window, columns=('Title', 'Description', 'Due Date', 'Priority', 'Status', 'Categories'), show='headings')
-        deleted_tree.heading('Title', text='Title')
-        deleted_tree.heading('Description', text='Description')
-        deleted_tree.heading('Due Date', text='Due Date')
-        deleted_tree.heading('Priority', text='Priority')
-        deleted_tree.heading('Status', text='Status')
-        deleted_tree.heading('Categories', text='Categories')
-
-        deleted_tree.pack(fill=tk.BOTH, expand=True)
-
-        # Fetch deleted tasks from the database
-        with sqlite3.connect('tasks.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT title, description, due_date, priority, status, categories FROM deleted_tasks')
-            deleted_tasks = cursor.fetchall()
-
-            for task in deleted_tasks:
-                deleted_tree.insert('', tk.END, values=task)
+        # Update label colors based on values
+        if overdue > 0:
+            self.overdue_label.config(foreground=self.colors['High'])
+        else:
+            self.overdue_label.config(foreground=self.colors['Complete'])
+            
+        # Call this method whenever tasks are modified
+        self.root.update_idletasks()
 
     def show_recycle_bin(self):
-        """Show recycle bin window with deleted tasks."""
-        self.load_deleted_tasks()
+        """Show the recycle bin window, reusing it if it was opened before"""
+        self.recycle_bin.show()
+
+    def purge_expired(self):
+        """Apply the recycle bin retention policy and trim the change journal,
+        one small batch of each per job"""
+        def purge():
+            return (self.store.purge_expired(),
+                    self.store.prune_events(limit=PURGE_BATCH_SIZE))
+
+        def purged(counts):
+            count, pruned = counts
+            if count:
+                self.recycle_bin.refresh()
+            # A full batch means there may be more; other queued work runs in between
+            full = count >= PURGE_BATCH_SIZE or pruned >= PURGE_BATCH_SIZE
+            self.root.after(PURGE_PAUSE_MS if full else PURGE_INTERVAL_MS, self.purge_expired)
+
+        def failed(error):
+            # Not worth a dialog; try again at the next interval
+            self.root.after(PURGE_INTERVAL_MS, self.purge_expired)
+
+        self.worker.submit(purge, callback=purged, errback=failed)
 
     def load_stored_tasks(self):
-        connection = sqlite3.connect('tasks.db')  # Connect to the database
-        cursor = connection.cursor()
-        cursor.execute('SELECT * FROM tasks')  # Assuming 'tasks' is the table name
-        tasks = cursor.fetchall()
-        connection.close()
-        return tasks
+        return self.store.list_tasks()
 
     def display_tasks(self):
         tasks = self.load_stored_tasks()
         for task in tasks:
             print(task)  # You can format this as needed
 
-# Store user credentials in a simple list for demonstration
-user_credentials = []
-
-# Load credentials from a file
-def load_credentials():
-    if os.path.exists('credentials.txt'):
-        with open('credentials.txt', 'r') as file:
-            for line in file:
-                username, password = line.strip().split(',')
-                user_credentials.append((username, password))
-
-# Save credentials to a file
-def save_credentials(username, password):
-    with open('credentials.txt', 'a') as file:
-        file.write(f'{username},{password}\n')
-
 class AuthPage:
     def __init__(self, master):
         self.master = master
         self.master.title('Login / Register')
-        self.master.geometry('300x300')
+        self.master.geometry('300x330')
+        # Opened on the first login or register, not before the window is up
+        self.store = None
+        # Sends queued mail in the background; reports land in mail_statuses
+        self.mailer = None
+        self.mail_statuses = queue.Queue()
+        self.mail_pending = set()
 
         self.label_username = tk.Label(master, text='Username:')
         self.label_username.pack(pady=5)
@@ -697,6 +1223,9 @@ class AuthPage:
         self.button_forgot_password = tk.Button(master, text='Forgot Password?', command=self.forgot_password)
         self.button_forgot_password.pack(pady=5)
 
+        self.label_mail_status = tk.Label(master, text='', wraplength=280)
+        self.label_mail_status.pack(pady=5)
+
     def forgot_password(self):
         email = simpledialog.askstring('Forgot Password', 'Enter your registered email:')
         if email:
@@ -704,42 +1233,76 @@ class AuthPage:
             self.send_reset_email(email)
 
     def send_reset_email(self, email):
-        # Set up your email server and credentials
-        sender_email = 'your_email@example.com'
-        sender_password = 'your_password'
         subject = 'Password Reset Request'
         body = 'Click the link to reset your password: <reset_link>'
-
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        try:
-            with smtplib.SMTP('smtp.example.com', 587) as server:
-                server.starttls()
-                server.login(sender_email, sender_password)
-                server.send_message(msg)
-            messagebox.showinfo('Success', 'Password reset email sent!')
-        except Exception as e:
-            messagebox.showerror('Error', f'Failed to send email: {str(e)}')
+        # Queued in the outbox; the mail sender thread does the SMTP work
+        polling = bool(self.mail_pending)
+        self.mail_pending.add(self.get_mailer().send(email, subject, body))
+        self.label_mail_status.config(text=f'Sending password reset email to {email}...')
+        if not polling:
+            self.poll_mail()
+
+    def get_mailer(self):
+        if self.mailer is None:
+            # Only needed here, so not imported at startup
+            from mailer import MailSender
+            self.mailer = MailSender(self.get_store(), on_status=self.mail_statuses.put).start()
+        return self.mailer
+
+    def poll_mail(self):
+        """Show reports from the mail sender until the queued mail is settled"""
+        while True:
+            try:
+                message_id, status, detail = self.mail_statuses.get_nowait()
+            except queue.Empty:
+                break
+            if message_id not in self.mail_pending:
+                continue
+            if status == 'sent':
+                self.mail_pending.discard(message_id)
+                self.label_mail_status.config(text='')
+                messagebox.showinfo('Success', 'Password reset email sent!')
+            elif status == 'failed':
+                self.mail_pending.discard(message_id)
+                self.label_mail_status.config(text='')
+                messagebox.showerror('Error', f'Failed to send email: {detail}')
+            else:
+                self.label_mail_status.config(text=f'Email not sent yet: {detail}')
+        if self.mail_pending:
+            self.master.after(MAIL_POLL_MS, self.poll_mail)
+
+    def get_store(self):
+        if self.store is None:
+            import accounts
+            self.store = TaskStore()
+            accounts.import_credentials(self.store)
+            if self.store.next_mail_time() is not None:
+                # Mail left in the outbox by an earlier run
+                self.get_mailer()
+        return self.store
 
     def register(self):
+        import accounts
         username = self.entry_username.get()
         password = self.entry_password.get()
-        if any(user[0] == username for user in user_credentials):
+        try:
+            accounts.register(self.get_store(), username, password)
+        except accounts.DuplicateUsernameError:
             messagebox.showerror('Error', 'Username already exists. Please choose another.')
             return
-        user_credentials.append((username, password))  # Store as tuple
-        save_credentials(username, password)  # Save to file
+        except ValueError:
+            messagebox.showerror('Error', 'Please enter a username and password.')
+            return
         messagebox.showinfo('Success', 'Registration successful! You can now log in.')
         self.toggle_to_login()
 
     def login(self):
+        import accounts
         username = self.entry_username.get()
         password = self.entry_password.get()
-        if (username, password) in user_credentials:
+        if accounts.authenticate(self.get_store(), username, password):
+            # Only this thread's connection: the mail sender keeps its own
+            self.store.release()
             self.master.destroy()  # Close auth window
             self.open_task_manager()
         else:
@@ -761,12 +1324,11 @@ class AuthPage:
 
     def open_task_manager(self):
         root = tk.Tk()
-        app = TaskManager(root)
-        app.load_tasks()  # Load tasks after successful login
+        TaskManager(root)  # loads the tasks itself once the window is up
         root.mainloop()
 
 if __name__ == '__main__':
-    load_credentials()  # Load credentials on startup
     auth_root = tk.Tk()
     auth_app = AuthPage(auth_root)
+    watch_startup(auth_root, 'login_paint', quit=True)
     auth_root.mainloop()
@@ -0,0 +1,499 @@
+"""HTTP/JSON API over tasks.db, so a team can share one task list.
+
+    python task_cli.py serve [--host 127.0.0.1] [--port 8080] [--readers 4]
+
+Standard library only: an asyncio server speaking just enough HTTP/1.1
+(keep-alive, Content-Length request bodies, chunked streaming). No
+database work runs on the event loop. Reads go to a pool of reader
+threads, each with its own TaskStore connection, which WAL lets read while
+a write commits; every write goes to a single writer thread, so the
+server's writes queue up in order instead of contending for SQLite's
+write lock.
+
+    GET    /tasks                 ?q= &category= &sort= &desc=1 &offset= &limit=
+    GET    /tasks.ndjson          ?status= &category=   every task, streamed
+    GET    /tasks/<id>
+    POST   /tasks                 {"title": ..., "due_date": ..., ...}
+    PATCH  /tasks/<id>            only the fields to change
+    DELETE /tasks/<id>            move to the recycle bin
+    GET    /stats                 ?date=YYYY-MM-DD
+    GET    /categories
+    GET    /recycle-bin           ?offset= &limit=
+    POST   /recycle-bin/restore   {"ids": [...]}
+    POST   /recycle-bin/delete    {"ids": [...]}
+
+Tasks are JSON objects with the id and the TASK_COLUMNS; q is a search
+as typed in the window and sort a column name (title, due_date, priority,
+status, categories). Errors come back as {"error": message}.
+
+GET responses carry an ETag made from the task_events journal, which every
+change to the tasks bumps whichever program makes it. A request whose
+If-None-Match still matches gets 304 Not Modified without the list being
+queried, and until the tag changes the server answers other clients
+asking for the same URL from the response it already built.
+
+The task cache is not loaded: other programs writing tasks.db would
+leave it stale.
+
+There is no authentication. Bind to localhost, or put the server behind a
+proxy that does it.
+"""
+import asyncio
+import json
+import re
+import sys
+import threading
+import traceback
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from task_store import (PRIORITIES, SORT_KEYS, STATUSES, TASK_COLUMNS, DuplicateTitleError,
+                        iso_date)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_READERS = 4
+
+# Tasks per /tasks response unless ?limit= says otherwise, and at most
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+# Tasks read per query while streaming /tasks.ndjson
+STREAM_BATCH = 1000
+MAX_BODY = 1024 * 1024
+MAX_HEADERS = 100
+# Seconds a keep-alive connection may sit idle
+IDLE_TIMEOUT = 60
+# GET responses kept for reuse while the journal has not moved
+RESPONSE_CACHE_SIZE = 256
+
+TASK_DEFAULTS = {'description': '', 'due_date': None, 'priority': 'Medium',
+                 'status': 'Pending', 'categories': ''}
+
+Request = namedtuple('Request', 'method path query headers body keep_alive')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+def task_json(task):
+    """A TASK_SELECT row as a JSON object (extra columns such as a sort key are dropped)"""
+    return dict(zip(('id',) + TASK_COLUMNS, task))
+
+
+def json_response(data, status=200, headers=None):
+    body = json.dumps(data, ensure_ascii=False).encode()
+    return status, dict(headers or (), **{'Content-Type': 'application/json'}), body
+
+
+def error_response(error):
+    return json_response({'error': str(error)}, error.status)
+
+
+def journal_tag(*parts):
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def not_modified(request, tag):
+    """304 response if the client's If-None-Match still matches tag, else None"""
+    header = request.headers.get('if-none-match')
+    if header is None:
+        return None
+    tags = [value.strip().removeprefix('W/') for value in header.split(',')]
+    if tag in tags or '*' in tags:
+        return HTTPStatus.NOT_MODIFIED, {'ETag': tag}, b''
+    return None
+
+
+# ----------------------------------------------------------------------
+# Request parameters
+# ----------------------------------------------------------------------
+def int_param(request, name, default, maximum=None):
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a number")
+    if number < 0:
+        raise HTTPError(400, f"{name} must not be negative")
+    return number if maximum is None else min(number, maximum)
+
+
+def paging(request):
+    return (int_param(request, 'offset', 0),
+            int_param(request, 'limit', DEFAULT_LIMIT, MAX_LIMIT))
+
+
+def choice_param(request, name, choices):
+    value = request.query.get(name)
+    if value is not None and value not in choices:
+        raise HTTPError(400, f"{name} must be one of {', '.join(choices)}")
+    return value
+
+
+def json_body(request):
+    try:
+        return json.loads(request.body)
+    except (UnicodeDecodeError, ValueError):
+        raise HTTPError(400, "the request body must be JSON")
+
+
+def task_fields(data, partial):
+    """Validated task fields from a request object; without partial the
+    title is required and the other fields get their defaults"""
+    if not isinstance(data, dict):
+        raise HTTPError(400, "expected a JSON object")
+    unknown = set(data) - set(TASK_COLUMNS)
+    if unknown:
+        raise HTTPError(400, f"unknown fields: {', '.join(sorted(unknown))}")
+    fields = {} if partial else dict(TASK_DEFAULTS)
+    for name, value in data.items():
+        if name == 'due_date':
+            try:
+                value = iso_date(value)
+            except (TypeError, ValueError):
+                raise HTTPError(400, "due_date must be a YYYY-MM-DD date")
+        elif name == 'priority' and value not in PRIORITIES:
+            raise HTTPError(400, f"priority must be one of {', '.join(PRIORITIES)}")
+        elif name == 'status' and value not in STATUSES:
+            raise HTTPError(400, f"status must be one of {', '.join(STATUSES)}")
+        elif name in ('title', 'description', 'categories'):
+            if value is None and name != 'title':
+                value = ''
+            if not isinstance(value, str):
+                raise HTTPError(400, f"{name} must be a string")
+        fields[name] = value
+    if 'title' in fields and not fields['title'].strip():
+        raise HTTPError(400, "title must not be empty")
+    if not partial and 'title' not in fields:
+        raise HTTPError(400, "title is required")
+    return fields
+
+
+def id_list_body(request):
+    data = json_body(request)
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not all(type(task_id) is int for task_id in ids):
+        raise HTTPError(400, 'expected {"ids": [id, ...]}')
+    return ids
+
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+async def read_request(reader):
+    """The next request on a connection, or None once the client is done"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(431)
+    if 'transfer-encoding' in headers:
+        raise HTTPError(411, "send the request body with Content-Length")
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413)
+    body = await reader.readexactly(length) if length else b''
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    return Request(method.upper(), unquote(url.path), query, headers, body, keep_alive)
+
+
+def response_head(status, headers, keep_alive):
+    lines = [f'HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}',
+             f'Connection: {"keep-alive" if keep_alive else "close"}']
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+class TaskServer:
+    # (method, path pattern, handler, 'read', 'write' or 'stream')
+    ROUTES = (
+        ('GET', r'/tasks', 'list_tasks', 'read'),
+        ('POST', r'/tasks', 'create_task', 'write'),
+        ('GET', r'/tasks\.ndjson', 'stream_tasks', 'stream'),
+        ('GET', r'/tasks/(\d+)', 'get_task', 'read'),
+        ('PATCH', r'/tasks/(\d+)', 'update_task', 'write'),
+        ('DELETE', r'/tasks/(\d+)', 'delete_task', 'write'),
+        ('GET', r'/stats', 'stats', 'read'),
+        ('GET', r'/categories', 'categories', 'read'),
+        ('GET', r'/recycle-bin', 'recycle_bin', 'read'),
+        ('POST', r'/recycle-bin/restore', 'restore', 'write'),
+        ('POST', r'/recycle-bin/delete', 'delete_permanently', 'write'),
+    )
+
+    def __init__(self, store, readers=DEFAULT_READERS):
+        self.store = store
+        # Each pool thread gets its own connection from the TaskStore
+        self._pools = {
+            'read': ThreadPoolExecutor(readers, thread_name_prefix='reader'),
+            'write': ThreadPoolExecutor(1, thread_name_prefix='writer'),
+        }
+        # Latest GET responses by URL, with the tag they were built for
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+        self._routes = [(method, re.compile(pattern + '/?'), getattr(self, handler), kind)
+                        for method, pattern, handler, kind in self.ROUTES]
+
+    async def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        port = server.sockets[0].getsockname()[1]
+        print(f"serving tasks on http://{host}:{port}", file=sys.stderr, flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.shutdown()
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one connection"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except HTTPError as e:
+                    status, headers, body = error_response(e)
+                    headers['Content-Length'] = len(body)
+                    writer.write(response_head(status, headers, False) + body)
+                    await writer.drain()
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    break  # idle, gone mid-request, or a line over the stream limit
+                if request is None:
+                    break
+                await self.respond(request, writer)
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, request, writer):
+        try:
+            handler, args, kind = self.route(request)
+            if kind == 'stream':
+                await handler(request, writer, *args)
+                return
+            loop = asyncio.get_running_loop()
+            status, headers, body = await loop.run_in_executor(self._pools[kind], handler,
+                                                               request, *args)
+        except HTTPError as e:
+            status, headers, body = error_response(e)
+        except ConnectionError:
+            raise
+        except Exception:
+            traceback.print_exc()
+            status, headers, body = error_response(HTTPError(500))
+        if status not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+            headers['Content-Length'] = len(body)
+        writer.write(response_head(status, headers, request.keep_alive) + body)
+        await writer.drain()
+
+    def route(self, request):
+        allowed = []
+        for method, pattern, handler, kind in self._routes:
+            match = pattern.fullmatch(request.path)
+            if match:
+                if method == request.method:
+                    return handler, [int(group) for group in match.groups()], kind
+                allowed.append(method)
+        if allowed:
+            raise HTTPError(405, f"use {' or '.join(allowed)}")
+        raise HTTPError(404)
+
+    # ------------------------------------------------------------------
+    # Tasks; read and write handlers run on the pool threads
+    # ------------------------------------------------------------------
+    def tagged(self, request, tag, build):
+        """Answer a GET whose content only changes with tag: 304 if the
+        client already has it, else the JSON of build(), which is kept and
+        served to every client asking for the same URL until the tag changes"""
+        cached = not_modified(request, tag)
+        if cached:
+            return cached
+        key = (request.path, tuple(sorted(request.query.items())))
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None and response[0] == tag:
+                self._responses.move_to_end(key)
+                return 200, dict(response[1]), response[2]
+        status, headers, body = json_response(build(), headers={'ETag': tag})
+        with self._lock:
+            self._responses[key] = (tag, headers, body)
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return status, dict(headers), body
+
+    def list_tasks(self, request):
+        term, category = request.query.get('q', ''), request.query.get('category')
+        sort = choice_param(request, 'sort', tuple(SORT_KEYS))
+        offset, limit = paging(request)
+
+        def build():
+            if sort is None:
+                # One query for exactly the rows asked for
+                total = self.store.count_search(term, category)
+                tasks = self.store.search_tasks(term, limit, offset, category)
+            else:
+                rows = self.store.sorted_pages(sort, request.query.get('desc') in ('1', 'true'),
+                                               term, category)
+                total, tasks = len(rows), rows[offset:offset + limit]
+            return {'total': total, 'offset': offset, 'tasks': [task_json(task) for task in tasks]}
+
+        return self.tagged(request, journal_tag(self.store.last_event()), build)
+
+    async def stream_tasks(self, request, writer):
+        """Every task (with a status and/or in a category) as one JSON object
+        per line, read in batches of STREAM_BATCH short queries"""
+        status = choice_param(request, 'status', STATUSES)
+        category = request.query.get('category')
+        loop = asyncio.get_running_loop()
+        readers = self._pools['read']
+        tag = journal_tag(await loop.run_in_executor(readers, self.store.last_event))
+        cached = not_modified(request, tag)
+        if cached:
+            status, headers, body = cached
+            writer.write(response_head(status, headers, request.keep_alive))
+            await writer.drain()
+            return
+
+        def batch(after_id):
+            rows = self.store.iter_tasks(status, category, after_id, STREAM_BATCH).fetchall()
+            lines = ''.join(json.dumps(task_json(task), ensure_ascii=False) + '\n' for task in rows)
+            return (rows[-1][0] if rows else None), len(rows), lines.encode()
+
+        writer.write(response_head(200, {'Content-Type': 'application/x-ndjson', 'ETag': tag,
+                                         'Transfer-Encoding': 'chunked'}, request.keep_alive))
+        after_id = 0
+        try:
+            while after_id is not None:
+                after_id, count, data = await loop.run_in_executor(readers, batch, after_id)
+                if data:
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    # Wait for a slow client instead of buffering the whole list
+                    await writer.drain()
+                if count < STREAM_BATCH:
+                    break
+        except ConnectionError:
+            raise
+        except Exception:
+            # Too late for an error status; cutting the stream short tells the client
+            traceback.print_exc()
+            raise ConnectionAbortedError
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def get_task(self, request, task_id):
+        # The tag is read first so it is never newer than the row; a
+        # missing task is a 404 whatever If-None-Match the client sends
+        tag = journal_tag(self.store.last_event())
+        task = self.store.get_task(task_id)
+        if task is None:
+            raise HTTPError(404, f"no task with id {task_id}")
+        return self.tagged(request, tag, lambda: task_json(task))
+
+    def create_task(self, request):
+        fields = task_fields(json_body(request), partial=False)
+        try:
+            task_id = self.store.add_task(*(fields[name] for name in TASK_COLUMNS))
+        except DuplicateTitleError:
+            raise HTTPError(409, f"a task titled {fields['title']!r} already exists")
+        return json_response(task_json(self.store.get_task(task_id)), 201,
+                             {'Location': f'/tasks/{task_id}'})
+
+    def update_task(self, request, task_id):
+        changes = task_fields(json_body(request), partial=True)
+        # Read and write in one transaction, so a change made by another
+        # program in between is not overwritten
+        with self.store.transaction():
+            task = self.store.get_task(task_id)
+            if task is None:
+                raise HTTPError(404, f"no task with id {task_id}")
+            fields = dict(zip(TASK_COLUMNS, task[1:]), **changes)
+            try:
+                self.store.update_task(task_id, *(fields[name] for name in TASK_COLUMNS))
+            except DuplicateTitleError:
+                raise HTTPError(409, f"a task titled {fields['title']!r} already exists")
+        return json_response(task_json(self.store.get_task(task_id)))
+
+    def delete_task(self, request, task_id):
+        with self.store.transaction():
+            if self.store.get_task(task_id) is None:
+                raise HTTPError(404, f"no task with id {task_id}")
+            self.store.delete_tasks([task_id])
+        return HTTPStatus.NO_CONTENT, {}, b''
+
+    # ------------------------------------------------------------------
+    # Statistics and the recycle bin
+    # ------------------------------------------------------------------
+    def stats(self, request):
+        try:
+            day = iso_date(request.query.get('date')) or date.today().isoformat()
+        except ValueError:
+            raise HTTPError(400, "date must be a YYYY-MM-DD date")
+        # Counts relative to a date change with it as well as with the tasks
+        return self.tagged(request, journal_tag(self.store.last_event(), day),
+                           lambda: self.store.statistics(day))
+
+    def categories(self, request):
+        return self.tagged(request, journal_tag(self.store.last_event()),
+                           lambda: [{'name': name, 'count': count}
+                                    for name, count in self.store.category_counts()])
+
+    def recycle_bin(self, request):
+        # Entries arrive with a journaled delete; only permanent deletion
+        # and purging change the bin alone, and those lower its count
+        total = self.store.count_deleted()
+        offset, limit = paging(request)
+
+        def build():
+            entries = [dict(task_json(row), deleted_date=row[-1])
+                       for row in self.store.page_deleted(offset, limit)]
+            return {'total': total, 'offset': offset, 'entries': entries}
+
+        return self.tagged(request, journal_tag(self.store.last_event(), total), build)
+
+    def restore(self, request):
+        return json_response({'restored': self.store.restore_deleted(id_list_body(request))})
+
+    def delete_permanently(self, request):
+        return json_response({'deleted': self.store.delete_permanently(id_list_body(request))})
+
+
+def serve(store, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=DEFAULT_READERS):
+    """Run the server until interrupted"""
+    store.init_schema()
+    server = TaskServer(store, readers)
+    try:
+        asyncio.run(server.run(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
@@ -0,0 +1,25 @@
+"""Statistics panel data, recomputed only when it can have changed.
+
+The numbers depend on the tasks and on today's date, so they are cached
+against the store's write counter and the calendar day. Searching and
+scrolling never trigger a recount. The per-category task counts for the
+category filter are refreshed along with them.
+"""
+from datetime import datetime
+
+
+class TaskStatistics:
+    def __init__(self, store):
+        self.store = store
+        self._key = None
+        self.current = None
+
+    def refresh(self, force=False):
+        """Return the statistics if they changed since the last call, else None"""
+        key = (self.store.write_count, datetime.now().strftime('%Y-%m-%d'))
+        if key == self._key and not force:
+            return None
+        self._key = key
+        self.current = self.store.statistics(key[1])
+        self.current['categories'] = self.store.category_counts()
+        return self.current
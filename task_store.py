@@ -0,0 +1,1290 @@
+"""Data-access layer for tasks.db.
+
+Every read and write the task manager performs goes through a TaskStore.
+The store keeps one long-lived connection per thread instead of opening
+a new one for each query, and configures each connection once (WAL
+journal, relaxed fsync, busy timeout and a prepared statement cache). Once
+load_cache() has run, reads of tasks by id and the statistics are
+answered from a write-through TaskCache (task_cache.py).
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import recurrence
+from migrations import migrate
+from profiling import PROFILER, connection_factory
+from task_cache import TaskCache
+
+DB_PATH = 'tasks.db'
+
+# Columns shown in the task list, in display order
+TASK_COLUMNS = ('title', 'description', 'due_date', 'priority', 'status', 'categories')
+TASK_SELECT = 'SELECT id, ' + ', '.join(TASK_COLUMNS) + ' FROM tasks'
+
+# Values offered by the task form and the command line
+PRIORITIES = ('High', 'Medium', 'Low')
+STATUSES = ('Pending', 'In Progress', 'Complete')
+
+# Positions of the FTS_COLUMNS in rows returned by TASK_SELECT
+FTS_ROW_INDEXES = (1, 2, 4, 6)
+# Token characters of the unicode61 tokenizer: letters and digits
+WORD_RE = re.compile(r'[^\W_]+')
+# bm25 has to visit every matching row, so larger result sets are
+# returned newest first instead of ranked
+RANK_LIMIT = 1000
+
+# Substring match used when SQLite has no FTS5; binds the lowercased term
+# four times
+SCAN_CONDITION = ('''(instr(lower(title), ?) OR instr(lower(ifnull(description, '')), ?)
+               OR instr(lower(ifnull(priority, '')), ?) OR instr(lower(ifnull(categories, '')), ?))''')
+
+# Paging of large result sets
+PAGE_SIZE = 200
+MAX_CACHED_PAGES = 16
+
+# Ids of the tasks in a category given by name, through the
+# (category_id, task_id) primary key of task_categories
+CATEGORY_TASK_IDS = ('(SELECT task_id FROM task_categories WHERE category_id = '
+                     '(SELECT id FROM categories WHERE name = ?))')
+# The same restriction as a per-task probe of the primary key, for walking
+# another index and skipping tasks outside the category
+CATEGORY_HAS_TASK = ('EXISTS (SELECT 1 FROM task_categories WHERE category_id = '
+                     '(SELECT id FROM categories WHERE name = ?) AND task_id = tasks.id)')
+# A sorted category list walks the sort index with CATEGORY_HAS_TASK when
+# at least 1 in this many tasks is in the category; smaller categories are
+# sorted whole
+SORTED_CATEGORY_RATIO = 50
+# The same restriction on full-text matches. CROSS JOIN keeps SQLite from
+# probing the FTS index once per task in the category; instead each match
+# is looked up in task_categories.
+CATEGORY_FTS_JOIN = ('CROSS JOIN task_categories tc ON tc.task_id = tasks_fts.rowid '
+                     'AND tc.category_id = (SELECT id FROM categories WHERE name = ?)')
+
+# Sortable columns of the task list and the indexed expression each one
+# sorts by, with the task id breaking ties (see index_sort_columns)
+SORT_KEYS = {
+    'title': 'title',
+    'due_date': "ifnull(due_date, '')",
+    'priority': 'priority_rank',
+    'status': "ifnull(status, '')",
+    'categories': "ifnull(categories, '')",
+}
+
+# Columns that can be set on many tasks at once (titles are unique)
+BULK_FIELDS = ('due_date', 'priority', 'status', 'categories')
+
+# Recycle bin
+DELETED_SELECT = 'SELECT id, ' + ', '.join(TASK_COLUMNS) + ', deleted_date FROM deleted_tasks'
+# Rows removed per transaction by the retention purge
+PURGE_BATCH_SIZE = 500
+
+# Defaults for the settings table; retention_days is how long deleted
+# tasks are kept (0 keeps them forever)
+DEFAULT_SETTINGS = {'retention_days': 30}
+
+# A list of ids bound as one JSON parameter: WHERE id IN {ID_LIST}
+ID_LIST = '(SELECT value FROM json_each(?))'
+
+# Change journal (task_events): events kept by prune_events(), and the
+# most events changes_since() collapses before telling the caller to reload
+JOURNAL_KEEP_EVENTS = 100000
+CHANGES_LIMIT = 5000
+# Repeat rule of a journal entry written before rules were journaled
+NOT_JOURNALED = object()
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000
+# Another instance can hold the write lock past the busy timeout, e.g.
+# while importing; starting a write transaction is then retried this many
+# times, waiting BUSY_RETRY_MS, twice as long each time
+BUSY_RETRIES = 3
+BUSY_RETRY_MS = 250
+STATEMENT_CACHE_SIZE = 256
+
+# Tasks read per load_cache() call
+CACHE_LOAD_BATCH = 10000
+# Larger databases are not cached (about 480 bytes per task)
+CACHE_MAX_TASKS = 250000
+
+
+class DuplicateTitleError(ValueError):
+    """Raised when a task title is already used by another task"""
+
+
+class DuplicateUsernameError(ValueError):
+    """Raised when registering a username that is already taken"""
+
+
+class JournalConflictError(ValueError):
+    """Raised when undoing or redoing journal events whose tasks have been
+    changed since, or whose events have been pruned"""
+
+
+def is_locked(error):
+    """Whether an OperationalError means another connection holds a lock"""
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def iso_date(value):
+    """Normalize a due date (date, datetime or string) to YYYY-MM-DD, or None"""
+    if value is None or value == '':
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return date.fromisoformat(str(value).strip()[:10]).isoformat()
+
+
+def id_list(ids):
+    """Encode task ids for an ID_LIST parameter, however many there are"""
+    return json.dumps([int(task_id) for task_id in ids])
+
+
+@contextmanager
+def unique_title(title):
+    """Turn a violation of the unique title index into DuplicateTitleError"""
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        if 'tasks.title' in str(e):
+            raise DuplicateTitleError(title) from e
+        raise
+
+
+def fts_query(term):
+    """Turn free text typed in the search box into an FTS5 query.
+
+    Every word must match. Only the last word is treated as a prefix,
+    since it is the one still being typed.
+    """
+    words = WORD_RE.findall(term.lower())
+    if not words:
+        return ''
+    phrases = [f'"{word}"' for word in words]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def event_row(task_id, image):
+    """A task_events image (JSON array of TASK_COLUMNS, then the repeat rule
+    in later entries) as a TASK_SELECT row"""
+    return None if image is None else (task_id, *json.loads(image)[:len(TASK_COLUMNS)])
+
+
+def event_rule(image):
+    """The recurrence column in a task_events image, or NOT_JOURNALED for
+    no image or one journaled before repeat rules were"""
+    values = () if image is None else json.loads(image)
+    return values[len(TASK_COLUMNS)] if len(values) > len(TASK_COLUMNS) else NOT_JOURNALED
+
+
+def split_categories(text):
+    """Category names in a comma-separated categories string, as the
+    task_categories triggers split it"""
+    return [name.strip() for name in (text or '').split(',') if name.strip()]
+
+
+def fold(text):
+    """Lowercase text and strip diacritics, like the unicode61 tokenizer"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class PagedRows:
+    """Read-only sequence of rows fetched from the database a page at a time.
+
+    count() returns the total number of rows and fetch(offset, limit) one
+    page of them. The most recently used pages are kept in memory.
+    """
+
+    def __init__(self, count, fetch, page_size=PAGE_SIZE, max_pages=MAX_CACHED_PAGES):
+        self._count = count
+        self._fetch = fetch
+        self._length = None
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        if self._length is None:
+            self._length = self._count()
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        page = self._page(index // self.page_size)
+        return page[index % self.page_size]
+
+    def prefetch(self):
+        """Fetch the length and first page now, e.g. on a background thread"""
+        if len(self):
+            self._page(0)
+        return self
+
+    def __iter__(self):
+        for number in range((len(self) + self.page_size - 1) // self.page_size):
+            yield from self._page(number)
+
+    # The edits below keep the sequence in step with a single-row change
+    # already made in the database, without refetching everything.
+    def __setitem__(self, index, row):
+        number, offset = divmod(index, self.page_size)
+        page = self._pages.get(number)
+        if page is not None:
+            page[offset] = row
+
+    def insert(self, index, row):
+        """Insert a row; only appending is done in memory"""
+        length = len(self)
+        self._length = length + 1
+        number, offset = divmod(index, self.page_size)
+        if index == length:
+            page = self._pages.get(number)
+            if page is not None:
+                page.append(row)
+            elif offset == 0:
+                self._pages[number] = [row]
+            return
+        self._drop_pages_from(number)
+
+    def pop(self, index):
+        row = self[index]
+        self._length = len(self) - 1
+        # Later rows shift down by one, so cached pages from here on are stale
+        self._drop_pages_from(index // self.page_size)
+        return row
+
+    def replace_rows(self, rows_by_id):
+        """Swap in updated rows, matched by id, wherever they are cached"""
+        for page in self._pages.values():
+            for offset, row in enumerate(page):
+                if row[0] in rows_by_id:
+                    page[offset] = rows_by_id[row[0]]
+
+    def invalidate(self):
+        """Forget the length and cached pages, e.g. after rows were removed"""
+        self._length = None
+        self._pages.clear()
+
+    def index_of(self, row_id):
+        """Index of the row with this id among the cached pages, or None"""
+        for number, page in self._pages.items():
+            for offset, row in enumerate(page):
+                if row[0] == row_id:
+                    return number * self.page_size + offset
+        return None
+
+    def _drop_pages_from(self, number):
+        for cached in [n for n in self._pages if n >= number]:
+            del self._pages[cached]
+
+    def _page(self, number):
+        page = self._pages.get(number)
+        if page is None:
+            page = self._fetch(number * self.page_size, self.page_size)
+            self._pages[number] = page
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page
+
+
+class KeysetRows(PagedRows):
+    """PagedRows in a sort order, fetched by keyset (seek) pagination.
+
+    seek(after, limit, backward) returns up to limit rows following the
+    (sort key, id) pair after, or preceding it with backward, each with
+    its sort key as an extra last column. A page next to a cached one is
+    read by seeking from that page's first or last key, so scrolling
+    costs one index seek per page however deep into the list it goes.
+    Only a jump to a page with no cached neighbour has to locate(index)
+    its starting key, by counting along the sort index.
+    """
+
+    def __init__(self, count, seek, locate, page_size=PAGE_SIZE, max_pages=MAX_CACHED_PAGES):
+        super().__init__(count, self._fetch_page, page_size, max_pages)
+        self._seek = seek
+        self._locate = locate
+        # page number -> ((key, id) of its first row, (key, id) of its last row)
+        self._bounds = {}
+
+    def _fetch_page(self, offset, limit):
+        number = offset // self.page_size
+        if number - 1 in self._pages:
+            rows = self._seek(self._bounds[number - 1][1], limit, False)
+        elif number + 1 in self._pages:
+            rows = self._seek(self._bounds[number + 1][0], limit, True)[::-1]
+        elif number == 0:
+            rows = self._seek(None, limit, False)
+        else:
+            rows = self._seek(self._locate(offset - 1), limit, False)
+        if rows:
+            self._bounds[number] = ((rows[0][-1], rows[0][0]), (rows[-1][-1], rows[-1][0]))
+        return [row[:-1] for row in rows]
+
+
+class TaskStore:
+    def __init__(self, path=DB_PATH, init=True):
+        """With init=False the caller runs init_schema() itself, e.g. on a
+        background thread so a window can be drawn first"""
+        self.path = path
+        self.has_fts = False
+        # Bumped on every committed write, so caches can tell when data changed
+        self.write_count = 0
+        # TaskCache, created by load_cache()
+        self.cache = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        if init:
+            self.init_schema()
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+    def _open(self):
+        conn = sqlite3.connect(self.path,
+                               timeout=BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=STATEMENT_CACHE_SIZE,
+                               isolation_level=None,  # we issue BEGIN ourselves
+                               factory=connection_factory())
+        if PROFILER.enabled:
+            conn.set_trace_callback(PROFILER.trace_statement)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    @property
+    def conn(self):
+        """Connection owned by the calling thread, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.cache_ops = []
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def release(self):
+        """Close the calling thread's connection, e.g. before a worker thread exits"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        with self._lock:
+            self._connections.remove(conn)
+        conn.close()
+        self._local.conn = None
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Connections created in other threads can only be closed there
+                pass
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of statements as one transaction.
+
+        Nested use joins the outer transaction, so store methods can be
+        combined freely by callers.
+        """
+        conn = self.conn
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn.cursor()
+            finally:
+                self._local.depth -= 1
+            return
+
+        self._begin(conn)
+        self._local.depth = 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+            self.write_count += 1
+            # Only committed writes reach the cache
+            if self.cache is not None:
+                for op, args in self._local.cache_ops:
+                    op(self.cache, *args)
+        finally:
+            self._local.depth = 0
+            self._local.cache_ops = []
+
+    def _begin(self, conn):
+        """Start a write transaction, retrying while another connection
+        keeps the database locked past the busy timeout"""
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                return
+            except sqlite3.OperationalError as e:
+                if attempt == BUSY_RETRIES or not is_locked(e):
+                    raise
+            time.sleep(BUSY_RETRY_MS / 1000 * 2 ** attempt)
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def data_version(self):
+        """Changes whenever another connection, in this process or another
+        one, commits to the database; commits made on the calling thread's
+        connection leave it alone"""
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Task cache
+    # ------------------------------------------------------------------
+    def load_cache(self, after_id=0, limit=CACHE_LOAD_BATCH, max_tasks=CACHE_MAX_TASKS):
+        """Load the next limit tasks after after_id into the task cache;
+        returns the last id loaded, or None once every task is cached.
+
+        Start at 0 to (re)load from scratch. Batches keep each call short
+        so other worker jobs run in between; writes made meanwhile are
+        applied as usual and later batches read the committed rows. With
+        more than max_tasks tasks the cache is dropped and reads stay on SQL.
+        """
+        if not after_id:
+            if max_tasks is not None and self.counter('total') > max_tasks:
+                self.cache = None
+                return None
+            if self.cache is None:
+                self.cache = TaskCache()
+            self.cache.clear()
+        elif self.cache is None:
+            return None
+        rows = self.execute(TASK_SELECT + ' WHERE id > ? ORDER BY id LIMIT ?',
+                            (after_id, limit)).fetchall()
+        self.cache.add_rows(rows)
+        if len(rows) < limit:
+            self.cache.loaded = True
+            return None
+        return rows[-1][0]
+
+    def _cached(self):
+        """The task cache if it can answer reads on this thread: fully
+        loaded, and no transaction open whose writes it has not seen yet"""
+        cache = self.cache
+        if cache is None or not cache.loaded or getattr(self._local, 'depth', 0):
+            return None
+        return cache
+
+    def _cache_write(self, op, *args):
+        """Apply op(cache, *args) when the current transaction commits"""
+        if self.cache is not None:
+            self._local.cache_ops.append((op, args))
+
+    def last_task_id(self):
+        return self.execute('SELECT ifnull(max(id), 0) FROM tasks').fetchone()[0]
+
+    def tasks_added_after(self, task_id):
+        """Inside a transaction that inserted tasks with SQL of its own (e.g.
+        an import): cache the tasks with ids above task_id on commit"""
+        if self.cache is not None:
+            rows = self.execute(TASK_SELECT + ' WHERE id > ?', (task_id,)).fetchall()
+            self._cache_write(TaskCache.add_rows, rows)
+
+    # ------------------------------------------------------------------
+    # Schema
+    # ------------------------------------------------------------------
+    def init_schema(self):
+        """Create or upgrade the schema (see migrations.py)"""
+        migrate(self)
+        self.has_fts = self.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+        ).fetchone() is not None
+
+    # ------------------------------------------------------------------
+    # Tasks
+    # ------------------------------------------------------------------
+    def title_exists(self, title, exclude_id=None):
+        if exclude_id is None:
+            row = self.execute('SELECT 1 FROM tasks WHERE title = ? LIMIT 1', (title,)).fetchone()
+        else:
+            row = self.execute('SELECT 1 FROM tasks WHERE title = ? AND id != ? LIMIT 1',
+                               (title, exclude_id)).fetchone()
+        return row is not None
+
+    def get_task(self, task_id):
+        cache = self._cached()
+        if cache is not None:
+            return cache.get(task_id)
+        return self.execute(TASK_SELECT + ' WHERE id = ?', (task_id,)).fetchone()
+
+    def list_tasks(self):
+        """Return every task as (id, title, description, due_date, priority, status, categories)"""
+        cache = self._cached()
+        if cache is not None:
+            return cache.all()
+        return self.execute(TASK_SELECT).fetchall()
+
+    def iter_tasks(self, status=None, category=None, after_id=None, limit=None):
+        """Iterate over every task (or those with a status and/or in a
+        category) in id order, straight from the cursor. after_id and limit
+        select one batch, for reading a large list in short queries."""
+        conditions, params = [], []
+        if after_id is not None:
+            conditions.append('id > ?')
+            params.append(after_id)
+        if status is not None:
+            conditions.append('status = ?')
+            params.append(status)
+        if category is not None:
+            conditions.append(f'id IN {CATEGORY_TASK_IDS}')
+            params.append(category)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        sql = TASK_SELECT + where + ' ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        cursor = self.execute(sql, params)
+        cursor.arraysize = PAGE_SIZE
+        return cursor
+
+    def count_tasks(self):
+        cache = self._cached()
+        if cache is not None:
+            return cache.count()
+        return self.counter('total')
+
+    def page_tasks(self, offset, limit):
+        return self.execute(TASK_SELECT + ' ORDER BY id LIMIT ? OFFSET ?',
+                            (limit, offset)).fetchall()
+
+    def task_pages(self, term='', category=None, sort=None, descending=False):
+        """Return all tasks, or the tasks matching term and/or in a
+        category, as lazily fetched PagedRows. With sort (a SORT_KEYS
+        name) they are in that column's order instead of by id or rank."""
+        if sort is not None:
+            return self.sorted_pages(sort, descending, term, category)
+        if not term.strip() and category is None:
+            return PagedRows(self.count_tasks, self.page_tasks)
+        return PagedRows(lambda: self.count_search(term, category),
+                         lambda offset, limit: self.search_tasks(term, limit, offset, category))
+
+    def sorted_pages(self, sort, descending=False, term='', category=None):
+        """Tasks ordered by SORT_KEYS[sort], then id, as KeysetRows"""
+        key = SORT_KEYS[sort]
+        conditions, params = [], []
+        if term.strip():
+            if not self.has_fts:
+                conditions.append(SCAN_CONDITION)
+                params.extend((term.lower(),) * 4)
+            elif fts_query(term):
+                conditions.append('id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)')
+                params.append(fts_query(term))
+            else:
+                conditions.append('0')  # nothing searchable, as in search_tasks
+        if category is not None:
+            if (not term.strip()
+                    and self.count_category(category) * SORTED_CATEGORY_RATIO >= self.count_tasks()):
+                # Common enough that walking the sort index finds a page quickly
+                conditions.append(CATEGORY_HAS_TASK)
+            else:
+                # Few enough to collect and sort
+                conditions.append(f'id IN {CATEGORY_TASK_IDS}')
+            params.append(category)
+
+        def select(where, order):
+            return (f'SELECT id, {", ".join(TASK_COLUMNS)}, {key} AS sort_key FROM tasks'
+                    + (' WHERE ' + ' AND '.join(where) if where else '')
+                    + f' ORDER BY {order} LIMIT ?')
+
+        def seek(after, limit, backward):
+            reverse = descending != backward
+            direction = 'DESC' if reverse else 'ASC'
+            if after is None:
+                return self.execute(select(conditions, f'{key} {direction}, id {direction}'),
+                                    params + [limit]).fetchall()
+            # Rows after (key, id) in two index seeks: the rest of the rows
+            # sharing its key, then the rows with the next keys. A single
+            # (key, id) > (?, ?) would scan all rows with the same key,
+            # which for status or priority is most of the table.
+            op = '<' if reverse else '>'
+            return self.execute(f'''
+                SELECT * FROM ({select(conditions + [f'{key} = ?', f'id {op} ?'], f'id {direction}')})
+                UNION ALL
+                SELECT * FROM ({select(conditions + [f'{key} {op} ?'], f'{key} {direction}, id {direction}')})
+                ORDER BY sort_key {direction}, id {direction}
+                LIMIT ?
+            ''', params + [after[0], after[1], limit] + params + [after[0], limit, limit]).fetchall()
+
+        def locate(index):
+            # Count along whichever end of the index is nearer
+            length = len(pages)
+            reverse = descending != (index >= length // 2)
+            offset = length - 1 - index if index >= length // 2 else index
+            direction = 'DESC' if reverse else 'ASC'
+            # Only ids in the inner query, so counting reads just the index
+            return self.execute(f'''
+                SELECT {key}, id FROM tasks WHERE id = (
+                    SELECT id FROM tasks
+                    {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+                    ORDER BY {key} {direction}, id {direction}
+                    LIMIT 1 OFFSET ?)
+            ''', params + [offset]).fetchone()
+
+        pages = KeysetRows(lambda: self.count_search(term, category), seek, locate)
+        return pages
+
+    def count_search(self, term, category=None):
+        if not term.strip():
+            if category is not None:
+                return self.count_category(category)
+            return self.count_tasks()
+        if not self.has_fts:
+            return len(self._scan_tasks(term, category=category))
+        query = fts_query(term)
+        if not query:
+            return 0
+        if category is None:
+            return self.execute('SELECT COUNT(*) FROM tasks_fts WHERE tasks_fts MATCH ?',
+                                (query,)).fetchone()[0]
+        return self.execute(f'''
+            SELECT COUNT(*) FROM tasks_fts {CATEGORY_FTS_JOIN} WHERE tasks_fts MATCH ?
+        ''', (category, query)).fetchone()[0]
+
+    def search_tasks(self, term, limit=None, offset=0, category=None):
+        """Return tasks matching every word of term, best matches first.
+
+        Each word is a prefix query against title, description, priority
+        and categories. Up to RANK_LIMIT matches are ranked by bm25; broader
+        queries (a single typed letter, say) come back newest first. With a
+        category name, only tasks in that category are returned.
+        """
+        if limit is None:
+            limit = -1  # no limit in SQLite
+        if not term.strip():
+            if category is not None:
+                return self.page_category(category, offset, limit)
+            return self.page_tasks(offset, limit)
+        if not self.has_fts:
+            return self._scan_tasks(term, limit, offset, category)
+
+        query = fts_query(term)
+        if not query:
+            return []
+        matches = self.execute('''
+            SELECT COUNT(*) FROM (SELECT 1 FROM tasks_fts WHERE tasks_fts MATCH ? LIMIT ?)
+        ''', (query, RANK_LIMIT + 1)).fetchone()[0]
+        order = 'bm25(tasks_fts), t.id' if matches <= RANK_LIMIT else 'tasks_fts.rowid DESC'
+        in_category = '' if category is None else CATEGORY_FTS_JOIN
+        params = (() if category is None else (category,)) + (query, limit, offset)
+        return self.execute(f'''
+            SELECT t.id, t.title, t.description, t.due_date, t.priority, t.status, t.categories
+            FROM tasks_fts {in_category} JOIN tasks t ON t.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH ?
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        ''', params).fetchall()
+
+    def matches(self, task, term, category=None):
+        """Return True if a task row would be returned by search_tasks(term, category=category).
+
+        Lets callers narrow an earlier result set in memory instead of
+        querying again.
+        """
+        if category is not None and category.casefold() not in {
+                name.casefold() for name in split_categories(task[6])}:
+            return False
+        fields = [task[i] or '' for i in FTS_ROW_INDEXES]
+        if not self.has_fts:
+            term = term.lower()
+            return any(term in field.lower() for field in fields)
+
+        words = WORD_RE.findall(fold(term))
+        if not words:
+            return not term.strip()
+        tokens = set(WORD_RE.findall(fold(' '.join(fields))))
+        *whole, last = words
+        return (all(word in tokens for word in whole)
+                and any(token.startswith(last) for token in tokens))
+
+    def _scan_tasks(self, term, limit=-1, offset=0, category=None):
+        term = term.lower()
+        in_category = '' if category is None else f'AND id IN {CATEGORY_TASK_IDS}'
+        params = (term,) * 4 + (() if category is None else (category,)) + (limit, offset)
+        return self.execute(TASK_SELECT + f'''
+            WHERE {SCAN_CONDITION} {in_category}
+            ORDER BY id LIMIT ? OFFSET ?
+        ''', params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Categories
+    # ------------------------------------------------------------------
+    def category_counts(self):
+        """(name, number of tasks) for every category in use, by name,
+        from one GROUP BY over the task_categories primary key"""
+        return self.execute('''
+            SELECT c.name, n.tasks
+            FROM (SELECT category_id, COUNT(*) AS tasks
+                  FROM task_categories GROUP BY category_id) n
+            JOIN categories c ON c.id = n.category_id
+            ORDER BY c.name
+        ''').fetchall()
+
+    def count_category(self, category):
+        return self.execute(f'SELECT COUNT(*) FROM {CATEGORY_TASK_IDS}',
+                            (category,)).fetchone()[0]
+
+    def page_category(self, category, offset, limit):
+        """Tasks in a category in id order, read along the task_categories index"""
+        return self.execute('''
+            SELECT t.id, t.title, t.description, t.due_date, t.priority, t.status, t.categories
+            FROM task_categories tc JOIN tasks t ON t.id = tc.task_id
+            WHERE tc.category_id = (SELECT id FROM categories WHERE name = ?)
+            ORDER BY tc.task_id
+            LIMIT ? OFFSET ?
+        ''', (category, limit, offset)).fetchall()
+
+    def add_task(self, title, description='', due_date=None, priority='Medium',
+                 status='Pending', categories='', rule=None):
+        """Insert a task and return its id; rule makes it repeat (a recurrence.Rule)"""
+        row = (title, description, iso_date(due_date), priority, status, categories)
+        with self.transaction() as cursor, unique_title(title):
+            cursor.execute('''
+                INSERT INTO tasks (title, description, due_date, priority, status, categories,
+                                   recurrence)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', row + (recurrence.dumps(rule),))
+            self._cache_write(TaskCache.add_rows, [(cursor.lastrowid,) + row])
+            return cursor.lastrowid
+
+    def update_task(self, task_id, title, description, due_date, priority, status, categories):
+        """Save a task's fields. Completing an open recurring task moves it
+        on to its next occurrence instead, while the series lasts."""
+        due_date = iso_date(due_date)
+        with self.transaction() as cursor, unique_title(title):
+            if status == 'Complete':
+                due_date, status = self._advance(task_id, due_date).get(task_id,
+                                                                        (due_date, status))
+            row = (title, description, due_date, priority, status, categories)
+            cursor.execute('''
+                UPDATE tasks
+                SET title=?, description=?, due_date=?, priority=?, status=?, categories=?
+                WHERE id=?
+            ''', row + (task_id,))
+            if cursor.rowcount:
+                self._cache_write(TaskCache.add_rows, [(task_id,) + row])
+
+    def get_tasks(self, ids):
+        """Return the tasks with these ids, in id order"""
+        cache = self._cached()
+        if cache is not None:
+            return cache.get_many(ids)
+        return self.execute(TASK_SELECT + f' WHERE id IN {ID_LIST} ORDER BY id',
+                            (id_list(ids),)).fetchall()
+
+    def update_tasks(self, ids, **fields):
+        """Set the same BULK_FIELDS (e.g. status='Complete') on many tasks
+        with one UPDATE; returns how many were changed"""
+        unknown = set(fields) - set(BULK_FIELDS)
+        if unknown or not fields:
+            raise ValueError(f"cannot bulk update {', '.join(sorted(unknown)) or 'nothing'}")
+        if 'due_date' in fields:
+            fields['due_date'] = iso_date(fields['due_date'])
+        ids = [int(task_id) for task_id in ids]
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self.transaction() as cursor:
+            advanced = 0
+            if fields.get('status') == 'Complete':
+                # Open recurring tasks move on to their next occurrence one
+                # by one; the rest are completed together
+                for task_id, (due_date, status) in self._advance(ids, fields.get('due_date')).items():
+                    moved = dict(fields, due_date=due_date, status=status)
+                    columns = ', '.join(f'{name} = ?' for name in moved)
+                    cursor.execute(f'UPDATE tasks SET {columns} WHERE id = ?',
+                                   (*moved.values(), task_id))
+                    self._cache_write(TaskCache.update, [task_id], moved)
+                    ids.remove(task_id)
+                    advanced += 1
+            cursor.execute(f'UPDATE tasks SET {assignments} WHERE id IN {ID_LIST}',
+                           (*fields.values(), id_list(ids)))
+            self._cache_write(TaskCache.update, ids, fields)
+            return cursor.rowcount + advanced
+
+    def _advance(self, ids, due_date=None):
+        """Next occurrences of the open recurring tasks among ids (one id or
+        a list) when they are completed: {task id: (due date, status)},
+        with status 'Pending' while the series goes on. due_date, if
+        given, replaces the tasks' own as the occurrence being completed."""
+        ids = [ids] if isinstance(ids, int) else ids
+        advanced = {}
+        for task_id, current, rule in self.execute(f'''
+                SELECT id, due_date, recurrence FROM tasks
+                WHERE id IN {ID_LIST} AND recurrence IS NOT NULL AND status != 'Complete'
+                ''', (id_list(ids),)).fetchall():
+            current = due_date or current
+            following = current and recurrence.next_after(recurrence.loads(rule),
+                                                          date.fromisoformat(current))
+            if following:
+                advanced[task_id] = (following.isoformat(), 'Pending')
+        return advanced
+
+    def get_rule(self, task_id):
+        """The task's recurrence.Rule, or None if it does not repeat"""
+        return recurrence.loads(self.get_rule_text(task_id))
+
+    def get_rule_text(self, task_id):
+        """The task's recurrence column as stored: JSON, or None"""
+        row = self.execute('SELECT recurrence FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_rule(self, task_id, rule):
+        """Make a task repeat by rule, or stop it repeating with None;
+        journaled like any other change to the task"""
+        with self.transaction() as cursor:
+            cursor.execute('UPDATE tasks SET recurrence = ? WHERE id = ?',
+                           (recurrence.dumps(rule), task_id))
+
+    def delete_task(self, task_id):
+        """Move a task to the recycle bin"""
+        self.delete_tasks([task_id])
+
+    def delete_tasks(self, ids):
+        """Move tasks to the recycle bin in one transaction; returns how many"""
+        with self.transaction():
+            self._cache_write(TaskCache.remove, [int(task_id) for task_id in ids])
+            return self._move_to_recycle_bin(f'id IN {ID_LIST}', (id_list(ids),))
+
+    def _move_to_recycle_bin(self, where, params):
+        with self.transaction() as cursor:
+            cursor.execute(f'''
+                INSERT INTO deleted_tasks
+                (title, description, due_date, priority, status, categories, deleted_date, task_id,
+                 recurrence)
+                SELECT title, description, due_date, priority, status, categories,
+                       datetime('now', 'localtime'), id, recurrence
+                FROM tasks WHERE {where}
+            ''', params)
+            cursor.execute(f'DELETE FROM tasks WHERE {where}', params)
+            return cursor.rowcount
+
+    def count_completed(self):
+        return self.counter('completed')
+
+    def counter(self, name):
+        return self.execute('SELECT value FROM task_counters WHERE name = ?', (name,)).fetchone()[0]
+
+    def clear_completed(self):
+        """Move all completed tasks to the recycle bin and return how many"""
+        with self.transaction():
+            self._cache_write(TaskCache.remove_status, 'Complete')
+            return self._move_to_recycle_bin("status = 'Complete'", ())
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+    def statistics(self, current_date):
+        """Return task counts for the statistics panel.
+
+        current_date is an ISO 'YYYY-MM-DD' string. Total and completed
+        come from the trigger-maintained counters; the due date windows
+        are one range scan over idx_tasks_open_due, or both come from the
+        task cache. Due dates compare as text, so the windows are half-open
+        ranges of ISO dates. Recurring tasks count once more for each later
+        occurrence in the week ahead.
+        """
+        today = date.fromisoformat(current_date)
+        tomorrow = (today + timedelta(days=1)).isoformat()
+        week_end = (today + timedelta(days=7)).isoformat()
+        cache = self._cached()
+        if cache is not None:
+            total = cache.count()
+            completed = cache.count(status='Complete')
+            overdue, due_today, due_week = cache.due_counts(current_date, tomorrow, week_end)
+        else:
+            total = self.counter('total')
+            completed = self.counter('completed')
+            overdue, due_today, due_week = self.execute('''
+                SELECT ifnull(SUM(due_date < :today), 0),
+                       ifnull(SUM(due_date >= :today AND due_date < :tomorrow), 0),
+                       ifnull(SUM(due_date >= :today), 0)
+                FROM tasks
+                WHERE due_date < :week_end AND status != 'Complete'
+            ''', {'today': current_date, 'tomorrow': tomorrow, 'week_end': week_end}).fetchone()
+        for _, _, due_date in self.recurring_occurrences(today, today + timedelta(days=7)):
+            due_week += 1
+            due_today += due_date == current_date
+        return {
+            'total': total,
+            'completed': completed,
+            'pending': total - completed,
+            'due_today': due_today,
+            'due_week': due_week,
+            'overdue': overdue,
+        }
+
+    def open_due_between(self, start, end):
+        """Open tasks due on or after start and before end (ISO dates), as
+        (id, title, due_date) in due date order; a range scan of idx_tasks_open_due"""
+        return self.execute('''
+            SELECT id, title, due_date FROM tasks
+            WHERE due_date >= ? AND due_date < ? AND status != 'Complete'
+            ORDER BY due_date
+        ''', (start, end)).fetchall()
+
+    def recurring_occurrences(self, start, end):
+        """(id, title, due date) of the occurrences after the current one of
+        open recurring tasks, on or after start and before end (dates),
+        generated for that window only; the current occurrence of each
+        task is its due_date, found by open_due_between"""
+        rows = self.execute('''
+            SELECT id, title, due_date, recurrence FROM tasks
+            WHERE recurrence IS NOT NULL AND due_date < ? AND status != 'Complete'
+        ''', (end.isoformat(),)).fetchall()
+        for task_id, title, due_date, rule in rows:
+            after = max(date.fromisoformat(due_date) + timedelta(days=1), start)
+            for day in recurrence.occurrences(recurrence.loads(rule), after, end):
+                yield task_id, title, day.isoformat()
+
+    def count_overdue(self, current_date):
+        cache = self._cached()
+        if cache is not None:
+            return cache.due_counts(current_date, current_date, current_date)[0]
+        return self.execute('''
+            SELECT COUNT(*) FROM tasks WHERE due_date < ? AND status != 'Complete'
+        ''', (current_date,)).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+    def last_event(self):
+        """Sequence number of the latest task_events entry, 0 if none"""
+        row = self.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'task_events'").fetchone()
+        return row[0] if row else 0
+
+    def journaled(self, action, *args, **kwargs):
+        """Run action(*args, **kwargs) in one transaction; returns its result
+        and the (first, last) sequence numbers of the events it journaled,
+        or None if it changed nothing"""
+        with self.transaction():
+            before = self.last_event()
+            result = action(*args, **kwargs)
+            last = self.last_event()
+        return result, ((before + 1, last) if last > before else None)
+
+    def events(self, first, last):
+        """Journal entries first..last as (seq, task_id, kind, old row, new
+        row), the rows in TASK_SELECT form or None"""
+        return [(seq, task_id, kind, event_row(task_id, old), event_row(task_id, new))
+                for seq, task_id, kind, old, new in self.execute('''
+                    SELECT seq, task_id, kind, old, new FROM task_events
+                    WHERE seq BETWEEN ? AND ? ORDER BY seq
+                ''', (first, last))]
+
+    def changes_since(self, seq, limit=CHANGES_LIMIT):
+        """What changed after journal entry seq: (last seq, {task id: current
+        row, or None if it was deleted}). Returns None when that cannot be
+        told cheaply, because more than limit events followed or some were
+        pruned; the caller then reloads everything.
+
+        The task cache is brought up to date too, so changes made by other
+        programs reach it.
+        """
+        last = self.last_event()
+        if last <= seq:
+            return last, {}
+        if last - seq > limit:
+            return None
+        changes = {}
+        count = 0
+        # Bounded by last: other programs may be adding events meanwhile
+        for task_id, new in self.execute('''
+                SELECT task_id, new FROM task_events WHERE seq > ? AND seq <= ? ORDER BY seq
+                ''', (seq, last)):
+            changes[task_id] = event_row(task_id, new)
+            count += 1
+        if count != last - seq:
+            return None  # pruned
+        cache = self.cache
+        if cache is not None:
+            cache.remove([task_id for task_id, row in changes.items() if row is None])
+            cache.add_rows([row for row in changes.values() if row is not None])
+        # Other programs' writes invalidate whatever is keyed on write_count
+        self.write_count += 1
+        return last, changes
+
+    def undo_events(self, first, last):
+        """Revert journal entries first..last, latest first, in one
+        transaction; returns {task id: row now, or None}. Tasks that are no
+        longer as the events left them raise JournalConflictError."""
+        events = self._journal_range(first, last)
+        return self._replay((task_id, new, old) for task_id, old, new in reversed(events))
+
+    def redo_events(self, first, last):
+        """Apply journal entries first..last again after undo_events()"""
+        events = self._journal_range(first, last)
+        return self._replay((task_id, old, new) for task_id, old, new in events)
+
+    def prune_events(self, keep=JOURNAL_KEEP_EVENTS, limit=None):
+        """Delete all but the latest keep journal entries, oldest first and
+        at most limit of them; returns how many"""
+        with self.transaction() as cursor:
+            cutoff = self.last_event() - keep
+            if limit is not None:
+                oldest = cursor.execute('SELECT min(seq) FROM task_events').fetchone()[0]
+                cutoff = min(cutoff, (oldest or 0) + limit - 1)
+            cursor.execute('DELETE FROM task_events WHERE seq <= ?', (cutoff,))
+            return cursor.rowcount
+
+    def _journal_range(self, first, last):
+        """(task id, old image, new image) of journal entries first..last"""
+        events = self.execute('''
+            SELECT task_id, old, new FROM task_events WHERE seq BETWEEN ? AND ? ORDER BY seq
+        ''', (first, last)).fetchall()
+        if len(events) != last - first + 1:
+            raise JournalConflictError("these changes are no longer in the journal")
+        return events
+
+    def _replay(self, steps):
+        """Change each task from one journal image to another, its repeat
+        rule included where the journal has it; steps are (task id,
+        expected image or None, target image or None)"""
+        changes = {}
+        with self.transaction() as cursor:
+            for task_id, expected_image, target_image in steps:
+                expected = event_row(task_id, expected_image)
+                target = event_row(task_id, target_image)
+                expected_rule = event_rule(expected_image)
+                if self.get_task(task_id) != expected or (
+                        expected_rule is not NOT_JOURNALED
+                        and self.get_rule_text(task_id) != expected_rule):
+                    raise JournalConflictError(f"task {task_id} has been changed since")
+                if target is None:
+                    self._cache_write(TaskCache.remove, [task_id])
+                    self._move_to_recycle_bin('id = ?', (task_id,))
+                else:
+                    with unique_title(target[1]):
+                        if expected is None:
+                            cursor.execute(f'''
+                                INSERT INTO tasks (id, {', '.join(TASK_COLUMNS)})
+                                VALUES (?, ?, ?, ?, ?, ?, ?)
+                            ''', target)
+                        else:
+                            cursor.execute(f'''
+                                UPDATE tasks SET {', '.join(f'{name} = ?' for name in TASK_COLUMNS)}
+                                WHERE id = ?
+                            ''', target[1:] + (task_id,))
+                    rule = event_rule(target_image)
+                    if rule is not NOT_JOURNALED:
+                        cursor.execute('UPDATE tasks SET recurrence = ? WHERE id = ?',
+                                       (rule, task_id))
+                    elif expected is None:
+                        # Journaled without its rule: take the recycle bin's
+                        cursor.execute('''
+                            UPDATE tasks SET recurrence = (
+                                SELECT recurrence FROM deleted_tasks WHERE task_id = ?
+                                ORDER BY id DESC LIMIT 1)
+                            WHERE id = ?
+                        ''', (task_id, task_id))
+                    if expected is None:
+                        # Back from the recycle bin
+                        cursor.execute('''
+                            DELETE FROM deleted_tasks WHERE id =
+                                (SELECT max(id) FROM deleted_tasks WHERE task_id = ?)
+                        ''', (task_id,))
+                    self._cache_write(TaskCache.add_rows, [target])
+                changes[task_id] = target
+        return changes
+
+    # ------------------------------------------------------------------
+    # Settings
+    # ------------------------------------------------------------------
+    def get_setting(self, name):
+        row = self.execute('SELECT value FROM settings WHERE name = ?', (name,)).fetchone()
+        return DEFAULT_SETTINGS.get(name) if row is None else row[0]
+
+    def set_setting(self, name, value):
+        with self.transaction() as cursor:
+            cursor.execute('INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)',
+                           (name, value))
+
+    # ------------------------------------------------------------------
+    # Recycle bin
+    # ------------------------------------------------------------------
+    def count_deleted(self):
+        return self.execute('SELECT COUNT(*) FROM deleted_tasks').fetchone()[0]
+
+    def page_deleted(self, offset, limit):
+        """Recycle bin rows, most recently deleted first (idx_deleted_tasks_deleted_date)"""
+        return self.execute(DELETED_SELECT + ' ORDER BY deleted_date DESC, id DESC LIMIT ? OFFSET ?',
+                            (limit, offset)).fetchall()
+
+    def deleted_pages(self):
+        """The recycle bin as lazily fetched PagedRows"""
+        return PagedRows(self.count_deleted, self.page_deleted)
+
+    def restore_deleted(self, ids):
+        """Move recycle bin entries back to the task list; returns how many.
+
+        One INSERT ... SELECT and one DELETE in a single transaction. A
+        title that is taken (by a task, or by an earlier entry being
+        restored with it) gets the entry's id appended.
+        """
+        ids = id_list(ids)
+        columns = ', '.join(TASK_COLUMNS)
+        with self.transaction() as cursor:
+            last_id = self.last_task_id() if self.cache is not None else 0
+            cursor.execute(f'''
+                INSERT INTO tasks ({columns}, recurrence)
+                SELECT CASE WHEN copy > 1 OR EXISTS (SELECT 1 FROM tasks t WHERE t.title = c.title)
+                            THEN c.title || ' (' || c.id || ')'
+                            ELSE c.title END,
+                       c.description, c.due_date, c.priority, c.status, c.categories,
+                       c.recurrence
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY title ORDER BY id) AS copy
+                    FROM deleted_tasks WHERE id IN {ID_LIST}
+                ) c
+                ORDER BY c.id
+            ''', (ids,))
+            restored = cursor.rowcount
+            cursor.execute(f'DELETE FROM deleted_tasks WHERE id IN {ID_LIST}', (ids,))
+            self.tasks_added_after(last_id)
+            return restored
+
+    def delete_permanently(self, ids):
+        """Remove recycle bin entries for good; returns how many"""
+        with self.transaction() as cursor:
+            cursor.execute(f'DELETE FROM deleted_tasks WHERE id IN {ID_LIST}', (id_list(ids),))
+            return cursor.rowcount
+
+    def purge_deleted(self, before=None, limit=None):
+        """Permanently remove recycle bin entries, or only those deleted
+        before a 'YYYY-MM-DD HH:MM:SS' timestamp, oldest first and at most
+        limit of them; returns how many"""
+        where = '' if before is None else 'WHERE deleted_date < ?'
+        params = () if before is None else (before,)
+        with self.transaction() as cursor:
+            cursor.execute(f'''
+                DELETE FROM deleted_tasks WHERE id IN (
+                    SELECT id FROM deleted_tasks {where}
+                    ORDER BY deleted_date LIMIT ?
+                )
+            ''', params + (-1 if limit is None else limit,))
+            return cursor.rowcount
+
+    def purge_expired(self, limit=PURGE_BATCH_SIZE):
+        """Apply the retention_days setting to at most limit entries; returns how many"""
+        days = int(self.get_setting('retention_days') or 0)
+        if days <= 0:
+            return 0
+        cutoff = datetime.now() - timedelta(days=days)
+        return self.purge_deleted(cutoff.strftime('%Y-%m-%d %H:%M:%S'), limit)
+
+    # ------------------------------------------------------------------
+    # Users
+    # ------------------------------------------------------------------
+    def add_user(self, username, password_hash):
+        try:
+            with self.transaction() as cursor:
+                cursor.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)',
+                               (username, password_hash))
+        except sqlite3.IntegrityError as e:
+            if 'users.username' in str(e):
+                raise DuplicateUsernameError(username) from e
+            raise
+
+    def add_users(self, users):
+        """Insert (username, password_hash) pairs, skipping taken usernames;
+        returns how many were added"""
+        with self.transaction() as cursor:
+            cursor.executemany('INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)',
+                               users)
+            return cursor.rowcount
+
+    def get_password_hash(self, username):
+        """Stored hash for a username (one unique index lookup), or None"""
+        row = self.execute('SELECT password_hash FROM users WHERE username = ?',
+                           (username,)).fetchone()
+        return row[0] if row else None
+
+    def set_password_hash(self, username, password_hash):
+        with self.transaction() as cursor:
+            cursor.execute('UPDATE users SET password_hash = ? WHERE username = ?',
+                           (password_hash, username))
+
+    def count_users(self):
+        return self.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Outbox
+    # ------------------------------------------------------------------
+    def queue_mail(self, recipient, subject, body):
+        """Add a message to the outbox and return its id"""
+        with self.transaction() as cursor:
+            cursor.execute('INSERT INTO outbox (recipient, subject, body) VALUES (?, ?, ?)',
+                           (recipient, subject, body))
+            return cursor.lastrowid
+
+    def due_mail(self, now):
+        """Pending messages whose next attempt is at or before now (a Unix
+        time), oldest first, as (id, recipient, subject, body, attempts)"""
+        return self.execute('''
+            SELECT id, recipient, subject, body, attempts FROM outbox
+            WHERE status = 'pending' AND next_attempt <= ?
+            ORDER BY next_attempt, id
+        ''', (now,)).fetchall()
+
+    def next_mail_time(self):
+        """Unix time of the next pending attempt, or None if nothing is pending"""
+        return self.execute("SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'"
+                            ).fetchone()[0]
+
+    def mark_mail_sent(self, message_id):
+        with self.transaction() as cursor:
+            cursor.execute('''
+                UPDATE outbox SET status = 'sent', attempts = attempts + 1, last_error = NULL,
+                       sent = datetime('now', 'localtime')
+                WHERE id = ?
+            ''', (message_id,))
+
+    def retry_mail(self, message_id, error, next_attempt):
+        """Count a failed attempt and schedule the next one"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt = ?
+                WHERE id = ?
+            ''', (error, next_attempt, message_id))
+
+    def fail_mail(self, message_id, error):
+        """Give up on a message"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ?
+                WHERE id = ?
+            ''', (error, message_id))
+
+    def mail_status(self, message_id):
+        """(status, attempts, last_error) of a message, or None"""
+        return self.execute('SELECT status, attempts, last_error FROM outbox WHERE id = ?',
+                            (message_id,)).fetchone()
@@ -0,0 +1,296 @@
+"""Windowed task list on top of ttk.Treeview.
+
+Only the rows inside the visible viewport (plus a small buffer) exist as
+Treeview items, keyed by task id. The rows themselves come from any
+sequence, typically a task_store.PagedRows that fetches pages from SQLite
+as the user scrolls, and the scrollbar tracks the position within the
+whole sequence rather than within the Treeview.
+
+Rendering only touches items that differ from what is on screen, so
+scrolling by a row or changing a single task costs one or two Treeview
+operations.
+"""
+from tkinter import ttk
+
+from profiling import PROFILER
+
+# Extra rows materialized below the viewport so partially visible rows
+# and small resizes do not need a refresh
+BUFFER_ROWS = 2
+DEFAULT_ROW_HEIGHT = 30
+DEFAULT_HEADING_HEIGHT = 30
+
+
+def task_tag(task):
+    """Treeview tag for a (id, title, description, due_date, priority, status, categories) row"""
+    priority, status = task[4], task[5]
+    if status == 'Complete':
+        return 'completed'
+    # Apply priority-based tags for incomplete items
+    if priority == 'High':
+        return 'high_priority'
+    if priority == 'Medium':
+        return 'medium_priority'
+    return 'low_priority'
+
+
+class VirtualTaskList:
+    def __init__(self, tree, scrollbar, on_select=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.on_select = on_select
+        # Rows are (id, value, value, ...) with one value per Treeview column
+        self.width = len(tree.cget('columns'))
+
+        self.rows = []
+        self.first = 0              # index of the first visible row
+        self.selected_ids = set()   # survives scrolling rows out of view
+        self._cursor = None         # index of the keyboard focus row
+        self._items = {}            # item id -> row, for materialized rows only
+        self._reported_selection = ()
+
+        row_height = ttk.Style().lookup(tree.cget('style') or 'Treeview', 'rowheight')
+        self.row_height = int(row_height or DEFAULT_ROW_HEIGHT)
+        self.heading_height = DEFAULT_HEADING_HEIGHT
+
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<Configure>', lambda event: self.render())
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda event: self._scroll_by(3))
+        self.tree.bind('<Up>', lambda event: self._move_cursor(-1))
+        self.tree.bind('<Down>', lambda event: self._move_cursor(1))
+        self.tree.bind('<Prior>', lambda event: self._move_cursor(-self.visible_count()))
+        self.tree.bind('<Next>', lambda event: self._move_cursor(self.visible_count()))
+        self.tree.bind('<Home>', lambda event: self._move_cursor(-len(self.rows)))
+        self.tree.bind('<End>', lambda event: self._move_cursor(len(self.rows)))
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def set_rows(self, rows, keep_position=False):
+        """Show a new sequence of task rows"""
+        self.rows = rows
+        if not keep_position:
+            self.first = 0
+            self._cursor = None
+            # Bulk actions act on the selection, so it must not include
+            # rows that are no longer listed
+            self.selected_ids.clear()
+        self.render()
+
+    def row(self, item):
+        """Return the task row for a Treeview item id"""
+        return self._items.get(item)
+
+    def index_of(self, task_id):
+        """Position of a task in the current rows, or None if unknown"""
+        for position, task in enumerate(self._items.values()):
+            if task[0] == task_id:
+                return self.first + position
+        if hasattr(self.rows, 'index_of'):
+            return self.rows.index_of(task_id)
+        for index, task in enumerate(self.rows):
+            if task[0] == task_id:
+                return index
+        return None
+
+    def append_row(self, task):
+        self.rows.insert(len(self.rows), task)
+        self.render()
+
+    def update_row(self, task):
+        index = self.index_of(task[0])
+        if index is not None:
+            self.rows[index] = task
+            self.render()
+
+    def delete_row(self, task_id):
+        index = self.index_of(task_id)
+        if index is not None:
+            self.rows.pop(index)
+            self.selected_ids.discard(task_id)
+            if self._cursor is not None and self._cursor >= len(self.rows):
+                self._cursor = None
+            self.render()
+
+    def update_rows(self, tasks):
+        """Replace several rows, matched by id, and render once"""
+        by_id = {task[0]: task for task in tasks}
+        if hasattr(self.rows, 'replace_rows'):
+            self.rows.replace_rows(by_id)
+        else:
+            for index, task in enumerate(self.rows):
+                if task[0] in by_id:
+                    self.rows[index] = by_id[task[0]]
+        self.render()
+
+    def delete_rows(self, task_ids):
+        """Remove several rows and render once"""
+        task_ids = set(task_ids)
+        if hasattr(self.rows, 'invalidate'):
+            # Positions of uncached rows are unknown: recount and refetch the view
+            self.rows.invalidate()
+        else:
+            self.rows[:] = [task for task in self.rows if task[0] not in task_ids]
+        self.selected_ids -= task_ids
+        self._cursor = None
+        self.render()
+
+    def apply_changes(self, changes, belongs):
+        """Patch in {task id: row, or None if deleted} changes made elsewhere;
+        belongs(row) tells whether a changed row is part of this view"""
+        removed = {task_id for task_id, task in changes.items()
+                   if task is None or not belongs(task)}
+        kept = {task_id: task for task_id, task in changes.items() if task_id not in removed}
+        if hasattr(self.rows, 'invalidate'):
+            if removed or any(self.rows.index_of(task_id) is None for task_id in kept):
+                # Rows came or went somewhere in the view: recount and refetch
+                self.rows.invalidate()
+                self._cursor = None
+            else:
+                self.rows.replace_rows(kept)
+        else:
+            rows = [kept.pop(task[0], task) for task in self.rows if task[0] not in removed]
+            if kept:
+                # New to this view; the list is in id order
+                rows.extend(kept.values())
+                rows.sort(key=lambda task: task[0])
+            self.rows[:] = rows
+            if self._cursor is not None and self._cursor >= len(self.rows):
+                self._cursor = None
+        self.selected_ids -= removed
+        self.render()
+
+    def selected_rows(self):
+        """Task rows of the visible selected items"""
+        return [self._items[item] for item in self.tree.selection() if item in self._items]
+
+    def visible_count(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # Not mapped yet: fall back to the requested height in rows
+            return int(self.tree.cget('height'))
+        return max(1, (height - self.heading_height) // self.row_height)
+
+    def render(self):
+        """Bring the Treeview items in line with the rows around the viewport"""
+        span = PROFILER.start('render')
+        total = len(self.rows)
+        visible = self.visible_count()
+        self.first = max(0, min(self.first, total - visible))
+
+        window = self.rows[self.first:self.first + visible + BUFFER_ROWS]
+        wanted = {str(task[0]) for task in window}
+        stale = [item for item in self._items if item not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+
+        # Mirror of the Treeview children while we insert and move items
+        current = [item for item in self._items if item in wanted]
+        items = {}
+        selection = []
+        for position, task in enumerate(window):
+            item = str(task[0])
+            old = self._items.get(item)
+            if old is None:
+                self.tree.insert('', position, iid=item, values=task[1:1 + self.width],
+                                 tags=(task_tag(task),))
+                current.insert(position, item)
+            else:
+                if old != task:
+                    self.tree.item(item, values=task[1:1 + self.width], tags=(task_tag(task),))
+                if current[position] != item:
+                    self.tree.move(item, '', position)
+                    current.remove(item)
+                    current.insert(position, item)
+            items[item] = task
+            if task[0] in self.selected_ids:
+                selection.append(item)
+        self._items = items
+
+        if tuple(selection) != self.tree.selection():
+            self._reported_selection = tuple(selection)
+            self.tree.selection_set(selection)
+        if self._cursor is not None and self.first <= self._cursor < self.first + len(window):
+            self.tree.focus(str(window[self._cursor - self.first][0]))
+        self._measure()
+
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        span.done()
+
+    def scroll_to(self, index):
+        self.first = max(0, index)
+        self.render()
+
+    # ------------------------------------------------------------------
+    # Event handlers
+    # ------------------------------------------------------------------
+    def _measure(self):
+        """Pick up the real heading and row heights once items are drawn"""
+        children = self.tree.get_children()
+        if not children:
+            return
+        bbox = self.tree.bbox(children[0])
+        if bbox:
+            self.heading_height = bbox[1]
+            self.row_height = bbox[3]
+
+    def _on_tree_select(self, event):
+        visible = set(self._items)
+        current = tuple(self.tree.selection())
+        self.selected_ids = {task_id for task_id in self.selected_ids
+                             if str(task_id) not in visible}
+        self.selected_ids.update(self._items[item][0] for item in current)
+        if current:
+            self._cursor = self.first + list(self._items).index(current[-1])
+
+        # render() re-selects rows after scrolling; only real changes are reported
+        if current == self._reported_selection:
+            return
+        self._reported_selection = current
+        if self.on_select:
+            self.on_select(event)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        total = len(self.rows)
+        if action == 'moveto':
+            self.first = int(float(amount) * total)
+        elif unit == 'pages':
+            self.first += int(amount) * self.visible_count()
+        else:
+            self.first += int(amount)
+        self.render()
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def _scroll_by(self, rows):
+        self.first += rows
+        self.render()
+        return 'break'
+
+    def _move_cursor(self, step):
+        """Keyboard navigation that scrolls the window instead of the Treeview"""
+        total = len(self.rows)
+        if not total:
+            return 'break'
+        current = self.first if self._cursor is None else self._cursor
+        self._cursor = max(0, min(total - 1, current + step))
+
+        visible = self.visible_count()
+        if self._cursor < self.first:
+            self.first = self._cursor
+        elif self._cursor >= self.first + visible:
+            self.first = self._cursor - visible + 1
+
+        self.selected_ids = {self.rows[self._cursor][0]}
+        self.render()
+        # The selection really changed, so let the Select event through
+        self._reported_selection = ()
+        return 'break'